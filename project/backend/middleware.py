@@ -0,0 +1,86 @@
+import logging
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from backend.services.metrics import observe_request
+from backend.services.timing import end_request, get_request_id, get_timings, server_timing_header, start_request
+
+logger = logging.getLogger(__name__)
+
+# accept a caller's X-Request-ID (load balancer, client) if it looks sane
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdLogFilter(logging.Filter):
+    """
+    Adds `request_id` to every log record, "-" outside a request.
+    """
+
+    def filter(self, record):
+        record.request_id = get_request_id() or "-"
+        return True
+
+
+class StageTimingMiddleware:
+    """
+    Collects per-stage timings for each request and reports them in a
+    Server-Timing header (not for streaming responses, whose headers go out
+    before the stages run). Sync and async capable, so async views under
+    ASGI are not pushed onto a thread.
+
+    Each request gets an id (X-Request-ID, taken from the request if given),
+    its latency goes to the rag_request_seconds histogram and its stage
+    breakdown is logged. Stage times are summed across threads, so stages
+    run in parallel can add up to more than the request's wall time
+    (reported as `total` in Server-Timing).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start_request(self._incoming_id(request))
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, time.perf_counter() - start)
+        finally:
+            end_request()
+
+    async def __acall__(self, request):
+        start_request(self._incoming_id(request))
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, time.perf_counter() - start)
+        finally:
+            end_request()
+
+    @staticmethod
+    def _incoming_id(request):
+        request_id = request.META.get("HTTP_X_REQUEST_ID", "")
+        return request_id if _REQUEST_ID.match(request_id) else None
+
+    @staticmethod
+    def _finish(request, response, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"  # route names, not paths: bounded label values
+        observe_request(view, request.method, elapsed)
+        response["X-Request-ID"] = get_request_id()
+        timings = get_timings()
+        if timings and not response.streaming:
+            response["Server-Timing"] = server_timing_header(timings, elapsed)
+        # stage times are summed across threads: parallel stages can add up to more than the wall time
+        logger.info(
+            "%s %s %s %.1fms stages(summed): %s",
+            request.method, request.path, response.status_code, elapsed * 1000,
+            " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items()) or "-",
+        )
+        return response
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import math
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, List
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from .cache_service import LoopLocal, LRUCache
+from .embedding_service import embed_query, normalize_query
+
+# exact tier: (user, generation, chunk ids, normalized query) -> answer
+_exact = None
+# semantic tier: (user, generation, chunk ids) -> [(unit query vector, answer), ...]
+_semantic = None
+_init_lock = threading.Lock()
+
+# single-flight: key -> Future of the answer currently being generated
+_inflight = {}
+_inflight_lock = threading.Lock()
+# same for the async views, per event loop (futures can't be awaited from another loop);
+# only touched from that loop, so no lock
+_ainflight = LoopLocal(dict)
+
+_stats_lock = threading.Lock()
+_stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "coalesced": 0}
+
+
+def _caches():
+    global _exact, _semantic
+    if _exact is None:
+        with _init_lock:
+            if _exact is None:
+                _semantic = LRUCache(maxsize=settings.ANSWER_CACHE_SIZE, ttl=settings.ANSWER_CACHE_TTL)
+                _exact = LRUCache(maxsize=settings.ANSWER_CACHE_SIZE, ttl=settings.ANSWER_CACHE_TTL)
+    return _exact, _semantic
+
+
+def _count(stat: str):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def stats() -> dict:
+    with _stats_lock:
+        result = dict(_stats)
+    lookups = result["exact_hits"] + result["semantic_hits"] + result["misses"]
+    result["hit_rate"] = (result["exact_hits"] + result["semantic_hits"]) / lookups if lookups else 0.0
+    return result
+
+
+# -------------------------
+# 1️⃣ Invalidation
+# -------------------------
+def _generation_key(user_id) -> str:
+    return f"answer-cache-generation:{user_id}"
+
+
+def _generation(user_id) -> int:
+    return shared_cache.get(_generation_key(user_id), 0)
+
+
+def invalidate_user(user_id):
+    """
+    Drops every cached answer of a user by moving them to a new generation.
+    The counter lives in the Django cache, so with REDIS_URL the ingestion
+    worker's invalidations reach the web processes too. Without it, keying on
+    the retrieved chunk ids still keeps answers from going stale.
+    """
+    if user_id is None:
+        return
+    key = _generation_key(user_id)
+    try:
+        shared_cache.incr(key)
+    except ValueError:
+        shared_cache.set(key, 1, None)
+
+
+# -------------------------
+# 2️⃣ Lookup / store
+# -------------------------
+def _group_key(user_id, results: List[dict]) -> str:
+    chunk_ids = ",".join(sorted(str(r["chunk_id"]) for r in results))
+    digest = hashlib.sha256(chunk_ids.encode("utf-8")).hexdigest()
+    return f"{user_id}:{_generation(user_id)}:{digest}"
+
+
+def _exact_key(group: str, query: str) -> str:
+    return f"{group}:{hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()}"
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _semantic_enabled() -> bool:
+    return settings.ANSWER_CACHE_SEMANTIC_THRESHOLD > 0
+
+
+def lookup(user_id, query: str, results: List[dict]):
+    """
+    Returns a cached answer for this question over these chunks, or None.
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    exact, semantic = _caches()
+    group = _group_key(user_id, results)
+    answer = exact.get(_exact_key(group, query))
+    if answer is not None:
+        _count("exact_hits")
+        return answer
+
+    if _semantic_enabled():
+        entries = semantic.get(group) or []
+        if entries:
+            vector = _unit(embed_query(query))  # served from the query embedding cache
+            best_score, best_answer = max(
+                ((sum(a * b for a, b in zip(vector, cached)), cached_answer) for cached, cached_answer in entries),
+                key=lambda item: item[0],
+            )
+            if best_score >= settings.ANSWER_CACHE_SEMANTIC_THRESHOLD:
+                _count("semantic_hits")
+                return best_answer
+
+    _count("misses")
+    return None
+
+
+def store(user_id, query: str, results: List[dict], answer: str):
+    if not settings.ANSWER_CACHE_ENABLED or not answer:
+        return
+    exact, semantic = _caches()
+    group = _group_key(user_id, results)
+    exact.set(_exact_key(group, query), answer)
+    if _semantic_enabled():
+        entries = list(semantic.get(group) or [])
+        entries.append((_unit(embed_query(query)), answer))
+        semantic.set(group, entries[-settings.ANSWER_CACHE_SEMANTIC_PER_GROUP:])
+
+
+# -------------------------
+# 3️⃣ Cached generation with single-flight
+# -------------------------
+def get_or_generate(user_id, query: str, results: List[dict], generate: Callable[[], str]) -> str:
+    """
+    Returns a cached answer or calls `generate()`. Concurrent identical
+    requests share one upstream call: the first caller generates, the others
+    wait for its result (or its exception).
+    """
+    answer = lookup(user_id, query, results)
+    if answer is not None:
+        return answer
+    if not settings.ANSWER_CACHE_ENABLED:
+        return generate()
+
+    key = _exact_key(_group_key(user_id, results), query)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        _count("coalesced")
+        return future.result()
+
+    try:
+        answer = generate()
+        store(user_id, query, results, answer)
+        future.set_result(answer)
+        return answer
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+async def aget_or_generate(user_id, query: str, results: List[dict], generate: Callable[[], Awaitable[str]]) -> str:
+    """
+    get_or_generate for coroutines: `generate()` returns an awaitable, and
+    followers await the leader's asyncio future instead of blocking a thread.
+    """
+    answer = await sync_to_async(lookup, thread_sensitive=False)(user_id, query, results)
+    if answer is not None:
+        return answer
+    if not settings.ANSWER_CACHE_ENABLED:
+        return await generate()
+
+    group = await sync_to_async(_group_key, thread_sensitive=False)(user_id, results)
+    key = _exact_key(group, query)
+    inflight = _ainflight.get()
+    future = inflight.get(key)
+    if future is not None:
+        _count("coalesced")
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # this request was cancelled, not the leader
+            return await generate()
+
+    future = inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        answer = await generate()
+        await sync_to_async(store, thread_sensitive=False)(user_id, query, results, answer)
+        future.set_result(answer)
+        return answer
+    except asyncio.CancelledError:
+        # the leader's client went away; followers generate for themselves
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark it retrieved, there may be no followers
+        raise
+    finally:
+        inflight.pop(key, None)
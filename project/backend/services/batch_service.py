@@ -0,0 +1,57 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from django.conf import settings
+from . import answer_cache
+from .context_service import build_context
+from .document_service import retrieve_chunks_batch
+from .rag_service import LLMError, generate_answer
+from .timing import stage
+
+
+def _sources(results: List[dict]) -> List[dict]:
+    return [
+        {"chunk_id": str(r["chunk_id"]), "document_id": r["document_id"], "chunk_index": r["chunk_index"]}
+        for r in results
+    ]
+
+
+def _answer(user_id, question: str, results: List[dict]) -> dict:
+    with stage("context"):
+        context = build_context(results)
+    if not context:
+        return {
+            "question": question,
+            "answer": f"No relevant documents found for '{question}'. Try uploading some documents first.",
+            "sources": [],
+        }
+    try:
+        with stage("llm"):
+            answer = answer_cache.get_or_generate(
+                user_id, question, results, lambda: generate_answer(question, context)
+            )
+    except LLMError as e:
+        return {"question": question, "error": str(e), "sources": _sources(results)}
+    return {"question": question, "answer": answer, "sources": _sources(results)}
+
+
+def answer_questions(user_id, questions: List[str], top_k: int = 5, concurrency: int = None) -> List[dict]:
+    """
+    Answers many questions from one user: retrieval runs once for the whole
+    batch (retrieve_chunks_batch), then answers are generated on up to
+    `concurrency` (BATCH_LLM_CONCURRENCY) threads, still subject to the
+    process-wide LLM limiter and the answer cache. Results are in question
+    order; a question whose completion failed gets an `error` instead of
+    an `answer`.
+    """
+    if not questions:
+        return []
+    concurrency = concurrency or settings.BATCH_LLM_CONCURRENCY
+    rankings = retrieve_chunks_batch(questions, user_id, top_k=top_k)
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(questions)), thread_name_prefix="batch-answer") as pool:
+        # copy_context per task: each thread records its stage timings into this request
+        futures = [
+            pool.submit(contextvars.copy_context().run, _answer, user_id, question, results)
+            for question, results in zip(questions, rankings)
+        ]
+        return [future.result() for future in futures]
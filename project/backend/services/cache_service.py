@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU cache with hit/miss counters and an
+    optional per-entry time to live (seconds).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SharedCache:
+    """
+    Same interface as LRUCache, backed by a Django cache alias (e.g. Redis) so
+    every worker process shares one cache. Eviction is left to the backend;
+    hit/miss counters are per process.
+    """
+
+    def __init__(self, alias: str = "default", prefix: str = "", timeout: int = None):
+        from django.core.cache import caches
+        self._cache = caches[alias]
+        self.prefix = prefix
+        self.timeout = timeout
+        self.maxsize = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self._cache.get(self.prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if value is None else value
+
+    def set(self, key, value):
+        self._cache.set(self.prefix + key, value, self.timeout)
+
+    def delete(self, key):
+        self._cache.delete(self.prefix + key)
+
+    def clear(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": None,
+            "maxsize": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class LoopLocal:
+    """
+    One value per running event loop, made by `factory()` on first use there.
+    asyncio objects (connection pools, semaphores, futures) belong to the loop
+    that used them first. Under uvicorn each process has a single loop. Under
+    WSGI, Django runs every async view on a new loop (async_to_sync) that is
+    closed afterwards. Values of closed loops are dropped.
+    """
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self._values = {}  # loop -> value
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._values if other.is_closed()]:
+                del self._values[closed]
+            value = self._values.get(loop)
+            if value is None:
+                value = self._values[loop] = self.factory()
+            return value
@@ -0,0 +1,174 @@
+import re
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List
+from django.conf import settings
+
+Chunker = Callable[[Iterable[str]], Iterator[str]]
+
+# name -> factory returning a chunker; select one with settings.CHUNKER
+CHUNKERS: Dict[str, Callable[[], Chunker]] = {}
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+# an unterminated "sentence" (tables, lists) is not carried into the next page past this size
+_MAX_CARRY_CHARS = 4000
+
+
+def register_chunker(name: str):
+    def decorator(factory):
+        CHUNKERS[name] = factory
+        return factory
+    return decorator
+
+
+def get_chunker(name: str = None) -> Chunker:
+    """
+    Returns the chunker registered under `name` (default: settings.CHUNKER).
+    """
+    name = name or settings.CHUNKER
+    try:
+        return CHUNKERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown chunker {name!r}; available: {', '.join(sorted(CHUNKERS))}")
+
+
+def iter_chunks(pages: Iterable[str], chunker: str = None) -> Iterator[str]:
+    """
+    Chunks a stream of page texts with the configured chunker.
+    """
+    return get_chunker(chunker)(pages)
+
+
+# -------------------------
+# 1️⃣ Word chunker
+# -------------------------
+def iter_word_chunks(pages: Iterable[str], chunk_size: int = 500) -> Iterator[str]:
+    """
+    Yields chunks of `chunk_size` words from a stream of page texts. Words are
+    carried over page boundaries, so only one chunk plus one page is held in
+    memory at a time.
+    """
+    buffer = []
+    for page in pages:
+        buffer.extend(page.split())
+        while len(buffer) >= chunk_size:
+            yield " ".join(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield " ".join(buffer)
+
+
+@register_chunker("words")
+def _word_chunker() -> Chunker:
+    return lambda pages: iter_word_chunks(pages, settings.CHUNK_SIZE_WORDS)
+
+
+# -------------------------
+# 2️⃣ Token-aware sentence chunker
+# -------------------------
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits text on paragraph breaks and sentence-ending punctuation. Single
+    newlines (PDF line wraps) are treated as spaces.
+    """
+    sentences = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            sentences.extend(_SENTENCE_BREAK.split(paragraph))
+    return sentences
+
+
+def _iter_sentence_batches(pages: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Yields the sentences of each page. The last sentence of a page is held
+    back and joined with the start of the next page, since it may continue there.
+    """
+    carry = ""
+    for page in pages:
+        sentences = split_sentences(f"{carry} {page}" if carry else page)
+        if not sentences:
+            continue
+        carry = sentences.pop()
+        if len(carry) > _MAX_CARRY_CHARS:
+            sentences.append(carry)
+            carry = ""
+        if sentences:
+            yield sentences
+    if carry:
+        yield [carry]
+
+
+class TokenChunker:
+    """
+    Packs whole sentences into chunks of at most `max_tokens` tokens, as
+    measured by the embedding model's tokenizer, repeating up to
+    `overlap_tokens` worth of trailing sentences at the start of the next
+    chunk. Sentences longer than a chunk are cut at token boundaries.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    def _count(self, sentences: List[str]) -> List[int]:
+        encoded = self.tokenizer(sentences, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_long(self, sentence: str) -> Iterator[str]:
+        offsets = self.tokenizer(
+            sentence, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+        step = self.max_tokens - self.overlap_tokens
+        for start in range(0, len(offsets), step):
+            window = offsets[start:start + self.max_tokens]
+            yield sentence[window[0][0]:window[-1][1]]
+            if start + self.max_tokens >= len(offsets):
+                break
+
+    def __call__(self, pages: Iterable[str]) -> Iterator[str]:
+        window = deque()  # (sentence, token count) of the chunk being built
+        window_tokens = 0
+        has_new = False  # whether the window holds anything not yet emitted
+
+        for sentences in _iter_sentence_batches(pages):
+            for sentence, count in zip(sentences, self._count(sentences)):
+                if count > self.max_tokens:
+                    if has_new:
+                        yield " ".join(s for s, _ in window)
+                    window.clear()
+                    window_tokens = 0
+                    has_new = False
+                    yield from self._split_long(sentence)
+                    continue
+
+                if window_tokens + count > self.max_tokens:
+                    if has_new:
+                        yield " ".join(s for s, _ in window)
+                    # keep the tail as overlap, then make room for the new sentence
+                    kept = deque()
+                    kept_tokens = 0
+                    while window and kept_tokens + window[-1][1] <= self.overlap_tokens:
+                        item = window.pop()
+                        kept.appendleft(item)
+                        kept_tokens += item[1]
+                    window, window_tokens = kept, kept_tokens
+                    while window and window_tokens + count > self.max_tokens:
+                        window_tokens -= window.popleft()[1]
+
+                window.append((sentence, count))
+                window_tokens += count
+                has_new = True
+
+        if has_new:
+            yield " ".join(s for s, _ in window)
+
+
+@register_chunker("tokens")
+def _token_chunker() -> Chunker:
+    from .embedding_service import get_model
+    model = get_model()
+    # leave room for the [CLS]/[SEP] tokens the model adds
+    max_tokens = settings.CHUNK_MAX_TOKENS or model.max_seq_length - 2
+    return TokenChunker(model.tokenizer, max_tokens, settings.CHUNK_OVERLAP_TOKENS)
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+from typing import Callable, Dict, List
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# an overlap must be at least this long to be recognised (shorter repeats are kept)
+_MIN_OVERLAP_CHARS = 32
+# a block cut to fit the budget must keep at least this many tokens, else it is dropped
+_MIN_TRUNCATED_TOKENS = 32
+
+_counter = None
+
+
+# -------------------------
+# 1️⃣ Token counting
+# -------------------------
+def _estimate_tokens(text: str) -> int:
+    # English averages ~4 characters per token; counting 3 keeps the budget on the safe side
+    return (len(text) + 2) // 3
+
+
+def _get_counter() -> Callable[[str], int]:
+    """
+    Counts prompt tokens with tiktoken for OPENAI_MODEL. Without tiktoken, or
+    when its encoding can't be loaded (it is downloaded on first use), falls
+    back to a deliberately high estimate of one token per 3 characters.
+    """
+    global _counter
+    if _counter is None:
+        try:
+            import tiktoken
+        except ImportError:
+            _counter = _estimate_tokens
+        else:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                logger.warning("Could not load the tiktoken encoding; estimating prompt tokens", exc_info=True)
+                _counter = _estimate_tokens
+            else:
+                _counter = lambda text: len(encoding.encode(text, disallowed_special=()))
+    return _counter
+
+
+def count_tokens(text: str) -> int:
+    return _get_counter()(text)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    # cut at a word boundary, shrinking until the estimate/tokenizer agrees it fits
+    cut = text[:max_tokens * 4]
+    while cut and count_tokens(cut) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+    if len(cut) < len(text) and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut
+
+
+# -------------------------
+# 2️⃣ Relevance and merging
+# -------------------------
+def is_relevant(result: Dict, min_score: float) -> bool:
+    """
+    A hit is dropped only when its vector similarity is known and below
+    `min_score` and it did not also match the full-text search.
+    """
+    score = result.get("vector_score")
+    return score is None or score >= min_score or result.get("lexical_score") is not None
+
+
+def _overlap(previous: str, text: str) -> int:
+    """
+    Length of the longest suffix of `previous` that `text` starts with
+    (the sentences the token chunker repeats between adjacent chunks).
+    """
+    probe = text[:_MIN_OVERLAP_CHARS]
+    if len(probe) < _MIN_OVERLAP_CHARS:
+        return 0
+    tail = previous[-len(text):]
+    position = tail.find(probe)
+    while position != -1:
+        if text.startswith(tail[position:]):
+            return len(tail) - position
+        position = tail.find(probe, position + 1)
+    return 0
+
+
+def _join(previous: str, text: str) -> str:
+    overlap = _overlap(previous, text)
+    if overlap:
+        return previous + text[overlap:]
+    return f"{previous}\n{text}"
+
+
+def _blocks(results: List[Dict]) -> List[Dict]:
+    """
+    Groups hits into blocks of consecutive chunks of one document, text
+    merged without the repeated overlap. A block's rank is that of its best
+    hit; identical texts (the same passage in two documents) are kept once.
+    """
+    seen = set()
+    by_document = {}
+    for rank, result in enumerate(results):
+        text = (result.get("text") or "").strip()
+        digest = hashlib.sha1(" ".join(text.split()).encode()).digest()
+        if not text or digest in seen:
+            continue
+        seen.add(digest)
+        by_document.setdefault(result.get("document_id"), []).append((result.get("chunk_index"), rank, text))
+
+    blocks = []
+    for document_id, hits in by_document.items():
+        hits.sort(key=lambda hit: (hit[0] is None, hit[0] or 0))
+        block = None
+        for chunk_index, rank, text in hits:
+            if (block is not None and chunk_index is not None and block["last_index"] is not None
+                    and chunk_index == block["last_index"] + 1):
+                block["text"] = _join(block["text"], text)
+                block["rank"] = min(block["rank"], rank)
+            else:
+                block = {"document_id": document_id, "first_index": chunk_index, "rank": rank, "text": text}
+                blocks.append(block)
+            block["last_index"] = chunk_index
+    return blocks
+
+
+# -------------------------
+# 3️⃣ Context
+# -------------------------
+def build_context(results: List[Dict], max_tokens: int = None, min_score: float = None) -> str:
+    """
+    Builds the prompt context from retrieved hits:
+
+    1. drops hits below `min_score` (CONTEXT_MIN_SCORE), see is_relevant;
+    2. merges consecutive chunks of a document, removing their overlap,
+       and skips duplicate passages;
+    3. keeps the best-ranked blocks that fit in `max_tokens`
+       (CONTEXT_MAX_TOKENS, 0 = no limit), cutting the last one if needed;
+    4. orders them by document (best hit first), then position in it.
+
+    Returns "" when nothing is relevant; callers should not ask the LLM then.
+    """
+    max_tokens = settings.CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    min_score = settings.CONTEXT_MIN_SCORE if min_score is None else min_score
+
+    blocks = _blocks([result for result in results if is_relevant(result, min_score)])
+    separator_tokens = count_tokens("\n\n")
+    kept = []
+    remaining = max_tokens
+    for block in sorted(blocks, key=lambda block: block["rank"]):
+        if not max_tokens:
+            kept.append(block)
+            continue
+        tokens = count_tokens(block["text"]) + (separator_tokens if kept else 0)
+        if tokens <= remaining:
+            kept.append(block)
+            remaining -= tokens
+        elif remaining - separator_tokens >= _MIN_TRUNCATED_TOKENS:
+            block["text"] = _truncate(block["text"], remaining - separator_tokens)
+            kept.append(block)
+            break
+        else:
+            break
+
+    document_rank = {}
+    for block in kept:
+        document_rank[block["document_id"]] = min(document_rank.get(block["document_id"], block["rank"]), block["rank"])
+    kept.sort(key=lambda block: (
+        document_rank[block["document_id"]], block["first_index"] is None, block["first_index"] or 0
+    ))
+    return "\n\n".join(block["text"] for block in kept)
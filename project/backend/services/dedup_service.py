@@ -0,0 +1,50 @@
+import hashlib
+from typing import Optional
+from django.db.models import Exists, OuterRef
+from documents.models import Document, DocumentChunk, IngestionJob
+
+
+def file_hash(file) -> str:
+    """
+    Hex sha256 of an uploaded or stored file. Uploads already carry it from
+    the hashing upload handlers; anything else is read in chunks.
+    """
+    digest = getattr(file, "content_hash", None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def find_duplicate(user_id, content_hash: str) -> Optional[Document]:
+    """
+    The user's earliest document with this content, if any.
+    """
+    return (
+        Document.objects.filter(uploaded_by_id=user_id, content_hash=content_hash)
+        .order_by("uploaded_at")
+        .first()
+    )
+
+
+def find_indexed_copy(document: Document) -> Optional[Document]:
+    """
+    Another document with the same content whose ingestion has finished (and
+    isn't being redone), so its chunks and vectors can be copied instead of
+    extracting and embedding the file again.
+    """
+    if not document.content_hash:
+        return None
+    busy = IngestionJob.objects.filter(
+        document=OuterRef("pk"), status__in=[IngestionJob.QUEUED, IngestionJob.RUNNING]
+    )
+    return (
+        Document.objects.filter(content_hash=document.content_hash, jobs__status=IngestionJob.DONE)
+        .exclude(pk=document.pk)
+        .filter(Exists(DocumentChunk.objects.filter(document=OuterRef("pk"))))
+        .exclude(Exists(busy))
+        .order_by("uploaded_at")
+        .first()
+    )
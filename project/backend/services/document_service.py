@@ -1,8 +1,45 @@
-from typing import List
-from .qdrant_service import qdrant_client
-from .embedding_service import embed_text
+import asyncio
+import contextvars
+import threading
+import uuid
+from typing import Iterable, List, Union
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchValue, PointStruct, SearchRequest
+from .qdrant_service import get_async_client, qdrant_client
+from .tenant_service import collection_for_user
+from .reindex_service import active_model
+from .embedding_service import embed_queries, embed_query
+from .embedding_cache import embed_chunks
+from .chunking import iter_chunks
+from .timing import TimedIterator, stage
+from .lexical_search import reciprocal_rank_fusion, search_lexical
 from documents.models import DocumentChunk, Document
 
+_retrieval_pool = None
+_retrieval_pool_lock = threading.Lock()
+
+
+def _build_point(chunk: DocumentChunk, vector: List[float], user_id) -> PointStruct:
+    payload = {
+        "document_id": str(chunk.document_id),
+        "chunk_index": chunk.chunk_index,
+        "user_id": user_id,
+    }
+    # lean payloads keep only ids and filter fields; the text is read back from Postgres
+    if not settings.QDRANT_LEAN_PAYLOAD:
+        payload["text"] = chunk.text
+    return PointStruct(
+        id=str(chunk.id),  # use chunk UUID
+        vector=vector,
+        payload=payload,
+    )
+
+
 # -------------------------
 # 1️⃣ Save a single chunk to Qdrant
 # -------------------------
@@ -10,90 +47,426 @@ def save_chunk_to_qdrant(chunk: DocumentChunk):
     """
     takes chunk of text, converts it to embeddings using your embedding service, then stores both the vector and metadata in Qdrant vector database
     """
-    embedding = embed_text(chunk.text)
+    user_id = chunk.document.uploaded_by_id
+    collection_name = collection_for_user(user_id)
+    embedding = embed_chunks([chunk.text], model_name=active_model(collection_name))[0]
 
     qdrant_client.upsert(
-        collection_name="document_chunks",
-        points=[
-            {
-                "id": str(chunk.id),  # use chunk UUID
-                "vector": embedding,
-                "payload": {
-                    "document_id": str(chunk.document.id),
-                    "chunk_index": chunk.chunk_index,
-                    "text": chunk.text,
-                    "user_id": chunk.document.uploaded_by.id  # Add this line
-
-                }
-            }
-        ]
+        collection_name=collection_name,
+        points=[_build_point(chunk, embedding, user_id)]
     )
 
     # store Qdrant ID back in Django
     chunk.qdrant_id = str(chunk.id)
-    chunk.save()
+    chunk.save(update_fields=["qdrant_id"])
 
 
 # -------------------------
-# 2️⃣ Split document text into chunks
+# 2️⃣ Upsert many points to Qdrant in batches
 # -------------------------
-def split_text_into_chunks(text: str, chunk_size: int = 500) -> List[str]:
+def upsert_points(points: List[PointStruct], collection_name: str, batch_size: int = None, parallel: int = None):
     """
-    Splits text into chunks of approximately `chunk_size` (500-word) words.
+    Sends points to a Qdrant collection in fixed-size batches, `parallel` requests at a time.
     """
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size):
-        chunk_text = " ".join(words[i:i+chunk_size])
-        chunks.append(chunk_text)
-    return chunks
+    batch_size = batch_size or settings.QDRANT_UPSERT_BATCH_SIZE
+    parallel = parallel or settings.QDRANT_UPSERT_PARALLEL
+    batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+    def _upsert(batch):
+        with stage("upsert"):
+            qdrant_client.upsert(collection_name=collection_name, points=batch, wait=True)
+
+    if parallel <= 1 or len(batches) <= 1:
+        for batch in batches:
+            _upsert(batch)
+        return
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        # list() re-raises the first failed upsert
+        list(pool.map(_upsert, batches))
 
 
 # -------------------------
-# 3️⃣ Process a document (create chunks, save to DB + Qdrant)
+# 3️⃣ Split document text into chunks
 # -------------------------
-def process_document(document: Document, text: str, chunk_size: int = 500):
+def split_text_into_chunks(text: str, chunker: str = None) -> List[str]:
     """
-    Given a Document instance and full text, split it into chunks,
-    create DocumentChunk objects, and save embeddings to Qdrant.
+    Splits text into chunks with the configured chunker (see chunking.py).
     """
-    chunks_text = split_text_into_chunks(text, chunk_size)
-    
-    for index, chunk_text in enumerate(chunks_text):
-        chunk = DocumentChunk.objects.create(
-            document=document,
-            text=chunk_text,
-            chunk_index=index
-        )
-        save_chunk_to_qdrant(chunk)
+    return list(iter_chunks([text], chunker))
 
 
 # -------------------------
-# 4️⃣ Search for similar chunks
+# 4️⃣ Process a document (create chunks, save to DB + Qdrant)
 # -------------------------
-def search_similar_chunks(query: str, user_id: str, top_k: int = 5):
+def process_document(document: Document, text: Union[str, Iterable[str]], chunker: str = None, on_progress=None):
     """
-    Embeds the query, searches Qdrant, and returns top-k relevant chunks.
+    Given a Document instance and its text (a string, or an iterable of page
+    texts such as pdf_service.iter_pdf_pages), split it into chunks with
+    the configured chunker (settings.CHUNKER unless `chunker` is given),
+    create DocumentChunk objects, and save embeddings to Qdrant.
+
+    Chunks are consumed as they are produced, in batches of
+    EMBEDDING_BATCH_SIZE: each batch is inserted with one bulk INSERT and
+    embedded in one forward pass (skipping text already in the embedding
+    cache), then upserted to Qdrant in the background while the next batch
+    is embedded. Memory stays bounded by the batch size, whatever the
+    document size. `on_progress(done, total)` is called after every batch
+    that reaches Qdrant; `total` is None until all chunks are known.
+    Returns the number of chunks.
+    """
+    # both streams are lazy: extraction happens as the chunker pulls pages
+    pages = TimedIterator([text] if isinstance(text, str) else text, "extract")
+    chunk_stream = TimedIterator(iter_chunks(pages, chunker), "chunk", inner=pages)
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    max_in_flight = max(1, settings.QDRANT_UPSERT_PARALLEL)
+    user_id = document.uploaded_by_id
+    collection_name = collection_for_user(user_id)
+    done = 0
+    total = None
+    in_flight = deque()
+
+    def _finish_oldest():
+        nonlocal done
+        future, size = in_flight.popleft()
+        future.result()
+        done += size
+        if on_progress:
+            on_progress(done, total)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        index = 0
+        while True:
+            chunks_text = list(islice(chunk_stream, batch_size))
+            if not chunks_text:
+                break
+            # UUIDs are assigned on instantiation, so qdrant_id is known before the INSERT
+            batch = []
+            for chunk_text in chunks_text:
+                chunk = DocumentChunk(document=document, text=chunk_text, chunk_index=index)
+                chunk.qdrant_id = str(chunk.id)
+                batch.append(chunk)
+                index += 1
+            DocumentChunk.objects.bulk_create(batch)
+
+            # resolved per batch, so a long ingestion follows a reindex that switches models
+            with stage("embed_chunks"):
+                vectors = embed_chunks([chunk.text for chunk in batch], model_name=active_model(collection_name))
+            points = [_build_point(chunk, vector, user_id) for chunk, vector in zip(batch, vectors)]
+            in_flight.append((pool.submit(upsert_points, points, collection_name, parallel=1), len(batch)))
+            while len(in_flight) >= max_in_flight:
+                _finish_oldest()
+        total = index
+        while in_flight:
+            _finish_oldest()
+    return total
+
+
+def delete_document_chunks(document: Document):
+    """
+    Removes a document's chunks from Postgres and its points from Qdrant,
+    so a document can be re-ingested without duplicates.
     """
-    query_vector = embed_text(query)
-    results = qdrant_client.search(
-        collection_name="document_chunks",
-        query_vector=query_vector,
-        query_filter={
-            "must": [{"key": "user_id", "match": {"value": user_id}}]
-        },
-        limit=top_k
+    qdrant_client.delete(
+        collection_name=collection_for_user(document.uploaded_by_id),
+        points_selector=FilterSelector(filter=Filter(must=[
+            FieldCondition(key="document_id", match=MatchValue(value=str(document.id)))
+        ])),
     )
+    DocumentChunk.objects.filter(document=document).delete()
 
-    # Return simplified info
-    simplified_results = [
+
+def copy_document(source: Document, target: Document, on_progress=None) -> int:
+    """
+    Indexes `target` by copying the chunks of `source` (same file content,
+    possibly another user's) without extracting or embedding the file:
+    the vectors are read back from Qdrant (re-embedded only if the two
+    collections serve different models). This saves CPU, not storage: the
+    target gets its own chunk rows and points, owned by its user, so
+    deletes, tenant moves and reindexing treat it like any other document.
+    `on_progress(done, total)` as in process_document. Returns the number
+    of chunks.
+    """
+    source_collection = collection_for_user(source.uploaded_by_id)
+    target_collection = collection_for_user(target.uploaded_by_id)
+    model_name = active_model(target_collection)
+    same_model = active_model(source_collection) == model_name
+    source_chunks = DocumentChunk.objects.filter(document=source).order_by("chunk_index").only("id", "text", "chunk_index")
+    total = source_chunks.count()
+    done = 0
+    for start in range(0, total, settings.EMBEDDING_BATCH_SIZE):
+        originals = list(source_chunks[start:start + settings.EMBEDDING_BATCH_SIZE])
+        vectors = {}
+        if same_model:
+            points = qdrant_client.retrieve(
+                collection_name=source_collection, ids=[str(chunk.id) for chunk in originals], with_vectors=True
+            )
+            vectors = {str(point.id): point.vector for point in points}
+        missing = [chunk for chunk in originals if str(chunk.id) not in vectors]
+        if missing:
+            embedded = embed_chunks([chunk.text for chunk in missing], model_name=model_name)
+            vectors.update((str(chunk.id), vector) for chunk, vector in zip(missing, embedded))
+
+        batch = []
+        for original in originals:
+            chunk = DocumentChunk(document=target, text=original.text, chunk_index=original.chunk_index)
+            chunk.qdrant_id = str(chunk.id)
+            batch.append(chunk)
+        DocumentChunk.objects.bulk_create(batch)
+        upsert_points(
+            [
+                _build_point(chunk, vectors[str(original.id)], target.uploaded_by_id)
+                for chunk, original in zip(batch, originals)
+            ],
+            target_collection,
+        )
+        done += len(batch)
+        if on_progress:
+            on_progress(done, total)
+    return total
+
+
+# -------------------------
+# 5️⃣ Search for similar chunks
+# -------------------------
+def _user_filter(user_id) -> Filter:
+    return Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+
+
+def _simplify(points) -> List[dict]:
+    return [
         {
-            "chunk_id": point.id,
+            "chunk_id": str(point.id),
             "document_id": point.payload.get("document_id"),
             "chunk_index": point.payload.get("chunk_index"),
-            "text": point.payload.get("text")
+            "text": point.payload.get("text"),
+            "vector_score": point.score,
         }
-        for point in results
+        for point in points
     ]
-    return simplified_results
 
+
+def hydrate_texts(results: List[dict]) -> List[dict]:
+    """
+    Fills in the text of results that came back without it (lean payloads)
+    with a single in_bulk query.
+    """
+    missing = [result["chunk_id"] for result in results if result.get("text") is None]
+    if missing:
+        with stage("hydrate"):
+            chunks = DocumentChunk.objects.only("id", "text").in_bulk(missing)
+        for result in results:
+            if result.get("text") is None:
+                chunk = chunks.get(uuid.UUID(result["chunk_id"]))
+                result["text"] = chunk.text if chunk else ""
+    return results
+
+
+def _vector_search(query: str, user_id, limit: int) -> List[dict]:
+    collection_name = collection_for_user(user_id)
+    with stage("embed"):
+        query_vector = embed_query(query, active_model(collection_name))
+    with stage("search"):
+        points = qdrant_client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            query_filter=_user_filter(user_id),
+            limit=limit
+        )
+    return _simplify(points)
+
+
+def _lexical_search(query: str, user_id, limit: int) -> List[dict]:
+    with stage("lexical"):
+        return search_lexical(query, user_id, limit)
+
+
+def _pooled_lexical_search(query: str, user_id, limit: int) -> List[dict]:
+    """
+    _lexical_search on a retrieval pool thread. The thread keeps its
+    database connection between queries (CONN_MAX_AGE is only applied at the
+    end of requests), reconnecting once if the server dropped it.
+    """
+    try:
+        return _lexical_search(query, user_id, limit)
+    except (InterfaceError, OperationalError):
+        connection.close()
+        return _lexical_search(query, user_id, limit)
+
+
+def _get_retrieval_pool() -> ThreadPoolExecutor:
+    global _retrieval_pool
+    if _retrieval_pool is None:
+        with _retrieval_pool_lock:
+            if _retrieval_pool is None:
+                _retrieval_pool = ThreadPoolExecutor(
+                    max_workers=settings.HYBRID_SEARCH_THREADS, thread_name_prefix="lexical-search"
+                )
+    return _retrieval_pool
+
+
+def search_similar_chunks(query: str, user_id: str, top_k: int = 5):
+    """
+    Embeds the query (through the query cache), searches Qdrant, and returns top-k relevant chunks.
+
+    With RETRIEVAL_MODE='hybrid', a Postgres full-text search over the same
+    user's chunks runs concurrently in a worker thread, and both rankings
+    are merged with reciprocal rank fusion.
+    """
+    if settings.RETRIEVAL_MODE != "hybrid":
+        results = _vector_search(query, user_id, top_k)
+        for result in results:
+            result["score"] = result["vector_score"]
+        return hydrate_texts(results)
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    # copy_context: the pool thread records its stage timing into this request
+    lexical = _get_retrieval_pool().submit(
+        contextvars.copy_context().run, _pooled_lexical_search, query, user_id, candidates
+    )
+    vector_results = _vector_search(query, user_id, candidates)
+    fused = reciprocal_rank_fusion([vector_results, lexical.result()], k=settings.RRF_K, limit=top_k)
+    return hydrate_texts(fused)
+
+
+# -------------------------
+# 6️⃣ Retrieve the chunks for a prompt
+# -------------------------
+def retrieve_chunks(query: str, user_id, top_k: int = 5):
+    """
+    search_similar_chunks plus the optional rerank stage: with RERANK_ENABLED,
+    over-fetches RERANK_CANDIDATES hits and keeps the RERANK_TOP_K best
+    according to the cross-encoder.
+    """
+    if not settings.RERANK_ENABLED:
+        return search_similar_chunks(query, user_id, top_k=top_k)
+
+    from .rerank_service import rerank
+    candidates = search_similar_chunks(query, user_id, top_k=settings.RERANK_CANDIDATES)
+    with stage("rerank"):
+        return rerank(query, candidates, top_k=settings.RERANK_TOP_K)
+
+
+# -------------------------
+# 7️⃣ Async retrieval (ASGI views)
+# -------------------------
+async def _avector_search(query: str, user_id, limit: int) -> List[dict]:
+    # the model forward pass is CPU-bound: run it on a worker thread, not the event loop
+    collection_name = await sync_to_async(collection_for_user)(user_id)
+    model_name = await sync_to_async(active_model)(collection_name)
+    with stage("embed"):
+        query_vector = await sync_to_async(embed_query, thread_sensitive=False)(query, model_name)
+    client = get_async_client()
+    with stage("search"):
+        if client is None:
+            points = await sync_to_async(qdrant_client.search, thread_sensitive=False)(
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=_user_filter(user_id),
+                limit=limit
+            )
+        else:
+            points = await client.search(
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=_user_filter(user_id),
+                limit=limit
+            )
+    return _simplify(points)
+
+
+async def asearch_similar_chunks(query: str, user_id, top_k: int = 5):
+    """
+    Async search_similar_chunks: the vector and lexical searches run
+    concurrently, and no thread is held while waiting on Qdrant.
+    """
+    if settings.RETRIEVAL_MODE != "hybrid":
+        results = await _avector_search(query, user_id, top_k)
+        for result in results:
+            result["score"] = result["vector_score"]
+        return await sync_to_async(hydrate_texts)(results)
+
+    candidates = max(top_k, settings.HYBRID_CANDIDATES)
+    vector_results, lexical_results = await asyncio.gather(
+        _avector_search(query, user_id, candidates),
+        sync_to_async(_lexical_search)(query, user_id, candidates),
+    )
+    fused = reciprocal_rank_fusion([vector_results, lexical_results], k=settings.RRF_K, limit=top_k)
+    return await sync_to_async(hydrate_texts)(fused)
+
+
+async def aretrieve_chunks(query: str, user_id, top_k: int = 5):
+    """
+    Async retrieve_chunks; the cross-encoder runs on a worker thread.
+    """
+    if not settings.RERANK_ENABLED:
+        return await asearch_similar_chunks(query, user_id, top_k=top_k)
+
+    from .rerank_service import rerank
+    candidates = await asearch_similar_chunks(query, user_id, top_k=settings.RERANK_CANDIDATES)
+    with stage("rerank"):
+        return await sync_to_async(rerank, thread_sensitive=False)(query, candidates, top_k=settings.RERANK_TOP_K)
+
+
+# -------------------------
+# 8️⃣ Batch retrieval (many questions from one user)
+# -------------------------
+def _vector_search_batch(queries: List[str], user_id, limit: int) -> List[List[dict]]:
+    collection_name = collection_for_user(user_id)
+    with stage("embed"):
+        query_vectors = embed_queries(queries, active_model(collection_name))
+    with stage("search"):
+        responses = qdrant_client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                SearchRequest(vector=vector, filter=_user_filter(user_id), limit=limit, with_payload=True)
+                for vector in query_vectors
+            ],
+        )
+    return [_simplify(points) for points in responses]
+
+
+def search_similar_chunks_batch(queries: List[str], user_id, top_k: int = 5) -> List[List[dict]]:
+    """
+    search_similar_chunks for many queries at once: one model call for the
+    uncached query vectors, one Qdrant search_batch request and one hydrate
+    query. In hybrid mode the full-text searches run on the retrieval pool
+    meanwhile. Returns one result list per query, in order.
+    """
+    if not queries:
+        return []
+    if settings.RETRIEVAL_MODE != "hybrid":
+        rankings = _vector_search_batch(queries, user_id, top_k)
+        for results in rankings:
+            for result in results:
+                result["score"] = result["vector_score"]
+    else:
+        candidates = max(top_k, settings.HYBRID_CANDIDATES)
+        pool = _get_retrieval_pool()
+        lexical = [
+            pool.submit(contextvars.copy_context().run, _pooled_lexical_search, query, user_id, candidates)
+            for query in queries
+        ]
+        vector_rankings = _vector_search_batch(queries, user_id, candidates)
+        rankings = [
+            reciprocal_rank_fusion([vector_results, future.result()], k=settings.RRF_K, limit=top_k)
+            for vector_results, future in zip(vector_rankings, lexical)
+        ]
+    hydrate_texts([result for results in rankings for result in results])
+    return rankings
+
+
+def retrieve_chunks_batch(queries: List[str], user_id, top_k: int = 5) -> List[List[dict]]:
+    """
+    retrieve_chunks for many queries; the optional rerank runs per query.
+    """
+    if not settings.RERANK_ENABLED:
+        return search_similar_chunks_batch(queries, user_id, top_k=top_k)
+
+    from .rerank_service import rerank
+    rankings = search_similar_chunks_batch(queries, user_id, top_k=settings.RERANK_CANDIDATES)
+    with stage("rerank"):
+        return [
+            rerank(query, candidates, top_k=settings.RERANK_TOP_K)
+            for query, candidates in zip(queries, rankings)
+        ]
@@ -0,0 +1,82 @@
+import hashlib
+import logging
+import threading
+from array import array
+from typing import List
+from django.conf import settings
+from documents.models import EmbeddingCacheEntry
+from .embedding_service import embed_texts
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(data) -> List[float]:
+    vector = array("f")
+    vector.frombytes(bytes(data))
+    return vector.tolist()
+
+
+def stats() -> dict:
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def embed_chunks(texts: List[str], model_name: str = None) -> List[List[float]]:
+    """
+    Embeds chunk texts, reusing stored vectors for text already embedded with
+    the same model. Only unseen texts go through the model, and their vectors
+    are written back to the cache.
+    """
+    if not texts:
+        return []
+    if not settings.CHUNK_EMBEDDING_CACHE:
+        return embed_texts(texts, model_name=model_name)
+
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    hashes = [content_hash(text) for text in texts]
+    cached = {
+        entry.content_hash: _unpack(entry.vector)
+        for entry in EmbeddingCacheEntry.objects.filter(
+            model_name=model_name, content_hash__in=set(hashes)
+        ).only("content_hash", "vector")
+    }
+
+    # embed each unseen text once, even if it repeats within this batch
+    missing = {}
+    for text, digest in zip(texts, hashes):
+        if digest not in cached and digest not in missing:
+            missing[digest] = text
+    if missing:
+        new_vectors = embed_texts(list(missing.values()), model_name=model_name)
+        fresh = dict(zip(missing.keys(), new_vectors))
+        EmbeddingCacheEntry.objects.bulk_create(
+            [
+                EmbeddingCacheEntry(content_hash=digest, model_name=model_name, vector=_pack(vector))
+                for digest, vector in fresh.items()
+            ],
+            batch_size=500,
+            ignore_conflicts=True,  # another worker may have cached the same text meanwhile
+        )
+        cached.update(fresh)
+
+    hits = len(texts) - len(missing)
+    with _stats_lock:
+        _stats["hits"] += hits
+        _stats["misses"] += len(missing)
+    logger.info(
+        "Chunk embedding cache: %d/%d hits (%.0f%%)", hits, len(texts), 100.0 * hits / len(texts)
+    )
+    return [cached[digest] for digest in hashes]
@@ -1,8 +1,130 @@
 ##all-MiniLM-L6-v2
 
-from sentence_transformers import SentenceTransformer
+import hashlib
+import logging
+import threading
+import time
+from typing import List
+from django.conf import settings
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+logger = logging.getLogger(__name__)
 
-def embed_text(text: str):
-    return model.encode(text).tolist()  # return as list (Qdrant expects list[float])
+_models = {}
+_model_lock = threading.Lock()
+_query_cache = None
+
+
+def get_model(model_name: str = None):
+    """
+    Returns the process-wide SentenceTransformer, loading it on first use.
+    Importing this module stays cheap, so migrate/shell/tests don't pay for torch.
+    `model_name` defaults to EMBEDDING_MODEL_NAME; other models are only
+    loaded while a reindex moves a collection to them.
+    """
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    model = _models.get(model_name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                from sentence_transformers import SentenceTransformer
+                model = _models[model_name] = SentenceTransformer(model_name)
+                logger.info(
+                    "Loaded embedding model %s in %.2fs",
+                    model_name, time.perf_counter() - start,
+                )
+    return model
+
+
+def warm_up() -> float:
+    """
+    Loads the model and runs one forward pass so the first user request is not slow.
+    Returns the time spent in seconds.
+    """
+    start = time.perf_counter()
+    get_model().encode("warm-up")
+    elapsed = time.perf_counter() - start
+    logger.info("Embedding model warm-up took %.2fs", elapsed)
+    return elapsed
+
+
+def embed_text(text: str, model_name: str = None):
+    return get_model(model_name).encode(text).tolist()  # return as list (Qdrant expects list[float])
+
+def embed_texts(texts: List[str], batch_size: int = None, model_name: str = None) -> List[List[float]]:
+    """
+    Embeds many texts with a single encode call (the model batches internally).
+    """
+    if not texts:
+        return []
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    return get_model(model_name).encode(texts, batch_size=batch_size).tolist()
+
+
+# -------------------------
+# Query embedding cache
+# -------------------------
+def get_query_cache():
+    """
+    Returns the query-vector cache selected by QUERY_EMBEDDING_CACHE_BACKEND.
+    """
+    global _query_cache
+    if _query_cache is None:
+        from .cache_service import LRUCache, SharedCache
+        if settings.QUERY_EMBEDDING_CACHE_BACKEND == "shared":
+            _query_cache = SharedCache(
+                alias=settings.QUERY_EMBEDDING_CACHE_ALIAS,
+                prefix="qemb:",
+                timeout=settings.QUERY_EMBEDDING_CACHE_TTL,
+            )
+        else:
+            _query_cache = LRUCache(maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE)
+    return _query_cache
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapses whitespace, case and trailing punctuation so trivially different
+    phrasings of the same question share one cache entry.
+    """
+    return " ".join(query.split()).casefold().rstrip("?!. ")
+
+
+def _query_cache_key(normalized: str, model_name: str = None) -> str:
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{model_name or settings.EMBEDDING_MODEL_NAME}:{digest}"
+
+
+def embed_query(query: str, model_name: str = None) -> List[float]:
+    """
+    Embeds a search query, serving repeated questions from the cache without
+    running the model.
+    """
+    normalized = normalize_query(query) or query
+    cache = get_query_cache()
+    key = _query_cache_key(normalized, model_name)
+    vector = cache.get(key)
+    if vector is None:
+        vector = embed_text(normalized, model_name)
+        cache.set(key, vector)
+    return vector
+
+
+def embed_queries(queries: List[str], model_name: str = None) -> List[List[float]]:
+    """
+    embed_query for many queries: cache misses (deduplicated) are embedded
+    with one model call. Vectors come back in the order of `queries`.
+    """
+    cache = get_query_cache()
+    normalized = [normalize_query(query) or query for query in queries]
+    vectors = {}
+    for text in normalized:
+        if text not in vectors:
+            vectors[text] = cache.get(_query_cache_key(text, model_name))
+    missing = [text for text, vector in vectors.items() if vector is None]
+    embedded = embed_texts(missing, model_name=model_name) if missing else []
+    for text, vector in zip(missing, embedded):
+        vectors[text] = vector
+        cache.set(_query_cache_key(text, model_name), vector)
+    return [vectors[text] for text in normalized]
@@ -0,0 +1,223 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from documents.models import Document, IngestionJob
+from .dedup_service import file_hash, find_duplicate, find_indexed_copy
+from .document_service import copy_document, delete_document_chunks, process_document
+from .pdf_service import iter_pdf_pages_parallel
+from .answer_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# 1️⃣ Enqueue
+# -------------------------
+def enqueue_ingestion(document: Document) -> IngestionJob:
+    """
+    Queues a document for background ingestion and returns the job, or the
+    document's queued or running job if it already has one: two jobs for
+    one document would run side by side and duplicate its chunks.
+    Returns immediately.
+    """
+    with transaction.atomic():
+        # lock the document so two concurrent requests don't both find no active job
+        Document.objects.select_for_update().filter(pk=document.pk).first()
+        active = document.jobs.filter(status__in=[IngestionJob.QUEUED, IngestionJob.RUNNING]).first()
+        if active is not None:
+            return active
+        return IngestionJob.objects.create(document=document)
+
+
+def upload_document(user, file, title: str, source: str = None):
+    """
+    Stores an uploaded file as a Document and queues its ingestion. Returns
+    (document, job, duplicate): if the user already uploaded the same content,
+    nothing is stored or queued and their existing document and its latest
+    job come back with duplicate=True. If that document's ingestion failed,
+    the upload retries it instead: a new job is queued (duplicate=False).
+    """
+    content_hash = file_hash(file)
+    existing = find_duplicate(user.id, content_hash)
+    if existing is None:
+        document = Document(title=title, uploaded_by=user, source=source, file=file, content_hash=content_hash)
+        try:
+            with transaction.atomic():
+                document.save()
+        except IntegrityError:
+            # a concurrent upload of the same content got in first: use its row
+            document.file.delete(save=False)
+            existing = find_duplicate(user.id, content_hash)
+        else:
+            return document, enqueue_ingestion(document), False
+    with transaction.atomic():
+        # lock the document so two retries don't queue two jobs
+        existing = Document.objects.select_for_update().get(pk=existing.pk)
+        job = existing.jobs.first()
+        if job is not None and job.status != IngestionJob.FAILED:
+            return existing, job, True
+        if not existing.file:
+            existing.file = file
+            existing.save(update_fields=["file"])
+        return existing, enqueue_ingestion(existing), False
+
+
+# -------------------------
+# 2️⃣ Claim and run
+# -------------------------
+def claim_next_job():
+    """
+    Atomically moves the oldest queued job to `running`. SKIP LOCKED lets
+    several workers poll the same table without handing out a job twice.
+    """
+    with transaction.atomic():
+        job = (
+            IngestionJob.objects.select_for_update(skip_locked=True)
+            .filter(status=IngestionJob.QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = IngestionJob.RUNNING
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "started_at", "updated_at"])
+    return job
+
+
+def run_job(job: IngestionJob):
+    """
+    Extracts, chunks, embeds and indexes the job's document, recording progress.
+    """
+    document = job.document
+    try:
+        if not document.file:
+            raise ValueError("Document has no file to ingest.")
+
+        # a retried job must not leave duplicate chunks behind
+        delete_document_chunks(document)
+
+        def _on_progress(done, total):
+            IngestionJob.objects.filter(pk=job.pk).update(
+                chunks_done=done, chunks_total=total, updated_at=timezone.now()
+            )
+
+        # same file already indexed for someone: copy its chunks and vectors instead of recomputing them
+        indexed_copy = find_indexed_copy(document)
+        if indexed_copy is not None:
+            total = copy_document(indexed_copy, document, on_progress=_on_progress)
+        else:
+            # pages are extracted, chunked and embedded as a stream, never as one big string
+            total = process_document(document, iter_pdf_pages_parallel(document.file.path), on_progress=_on_progress)
+        if total == 0:
+            raise ValueError(
+                "Could not extract readable text. The file may contain only images or be corrupted."
+            )
+        job.status = IngestionJob.DONE
+        job.chunks_done = job.chunks_total = total
+        job.error = ""
+        update_fields = ["status", "chunks_done", "chunks_total", "error", "finished_at", "updated_at"]
+        invalidate_user(document.uploaded_by_id)
+    except Exception as e:
+        logger.exception("Ingestion job %s failed", job.id)
+        job.status = IngestionJob.FAILED
+        job.error = str(e)
+        # keep the progress _on_progress recorded: this object still holds the values from the claim
+        update_fields = ["status", "error", "finished_at", "updated_at"]
+    job.finished_at = timezone.now()
+    job.save(update_fields=update_fields)
+    return job
+
+
+def requeue_stale_jobs(older_than: timedelta = None) -> int:
+    """
+    Puts `running` jobs whose worker stopped reporting progress back in the
+    queue. Live workers touch their jobs every INGESTION_HEARTBEAT_INTERVAL
+    (see drain_queue), so jobs another worker is still running are left alone.
+    """
+    older_than = older_than or timedelta(seconds=settings.INGESTION_STALE_AFTER)
+    return IngestionJob.objects.filter(
+        status=IngestionJob.RUNNING, updated_at__lt=timezone.now() - older_than
+    ).update(status=IngestionJob.QUEUED, updated_at=timezone.now())
+
+
+# -------------------------
+# 3️⃣ Worker loop
+# -------------------------
+_running_jobs = set()  # ids of the jobs this process is running
+_running_lock = threading.Lock()
+
+
+def _heartbeat_loop(stop: threading.Event, interval: float):
+    # progress only moves between chunk batches; keep long extractions from looking stale
+    try:
+        while not stop.wait(interval):
+            with _running_lock:
+                job_ids = list(_running_jobs)
+            if job_ids:
+                close_old_connections()
+                IngestionJob.objects.filter(pk__in=job_ids, status=IngestionJob.RUNNING).update(
+                    updated_at=timezone.now()
+                )
+    finally:
+        connection.close()
+
+
+def _worker_loop(stop: threading.Event, once: bool, poll_interval: float):
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return
+                stop.wait(poll_interval)
+                continue
+            started = time.perf_counter()
+            with _running_lock:
+                _running_jobs.add(job.pk)
+            try:
+                run_job(job)
+            finally:
+                with _running_lock:
+                    _running_jobs.discard(job.pk)
+            logger.info(
+                "Job %s %s (%s chunks) in %.2fs",
+                job.id, job.status, job.chunks_total, time.perf_counter() - started,
+            )
+    finally:
+        connection.close()
+
+
+def drain_queue(concurrency: int = None, once: bool = False, poll_interval: float = None, stop: threading.Event = None):
+    """
+    Runs `concurrency` worker threads that claim and process jobs. With
+    `once`, returns when the queue is empty; otherwise polls until `stop` is set.
+    """
+    concurrency = concurrency or settings.INGESTION_WORKER_CONCURRENCY
+    poll_interval = poll_interval if poll_interval is not None else settings.INGESTION_POLL_INTERVAL
+    stop = stop or threading.Event()
+    heartbeat_stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop, args=(heartbeat_stop, settings.INGESTION_HEARTBEAT_INTERVAL),
+        name="ingestion-heartbeat", daemon=True,
+    )
+    heartbeat.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(_worker_loop, stop, once, poll_interval) for _ in range(concurrency)]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # e.g. Ctrl-C: let the other workers finish their current job and exit
+                stop.set()
+                raise
+    finally:
+        heartbeat_stop.set()
@@ -0,0 +1,69 @@
+import re
+from typing import Dict, List
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from documents.models import DocumentChunk
+
+# must match the expression of the GIN index on DocumentChunk.text
+SEARCH_CONFIG = "english"
+_TERM = re.compile(r"[\w][\w\-\./]*")
+_MAX_TERMS = 32
+
+
+def _build_query(query: str):
+    """
+    ORs the query terms together, so a question that mentions an error code
+    matches chunks containing that code even if they share no other words.
+    """
+    terms = _TERM.findall(query)[:_MAX_TERMS]
+    if not terms:
+        return None
+    search_query = SearchQuery(terms[0], config=SEARCH_CONFIG)
+    for term in terms[1:]:
+        search_query |= SearchQuery(term, config=SEARCH_CONFIG)
+    return search_query
+
+
+def search_lexical(query: str, user_id, limit: int = 20) -> List[Dict]:
+    """
+    Full-text search over the user's chunks (Postgres tsvector + GIN index),
+    best ts_rank first.
+    """
+    search_query = _build_query(query)
+    if search_query is None:
+        return []
+    search_vector = SearchVector("text", config=SEARCH_CONFIG)
+    rows = (
+        DocumentChunk.objects
+        .annotate(search=search_vector)
+        .filter(search=search_query, document__uploaded_by_id=user_id)
+        .annotate(rank=SearchRank(search_vector, search_query))
+        .order_by("-rank")
+        .values("id", "document_id", "chunk_index", "text", "rank")[:limit]
+    )
+    return [
+        {
+            "chunk_id": str(row["id"]),
+            "document_id": str(row["document_id"]),
+            "chunk_index": row["chunk_index"],
+            "text": row["text"],
+            "lexical_score": row["rank"],
+        }
+        for row in rows
+    ]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict]], k: int = 60, limit: int = None) -> List[Dict]:
+    """
+    Merges ranked result lists by chunk_id with RRF: score = sum(1 / (k + rank)).
+    Fields from every list are kept (e.g. both vector_score and lexical_score).
+    """
+    merged = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            entry = merged.setdefault(result["chunk_id"], {"score": 0.0})
+            for key, value in result.items():
+                if key != "score":
+                    entry.setdefault(key, value)
+            entry["score"] += 1.0 / (k + rank)
+    fused = sorted(merged.values(), key=lambda r: r["score"], reverse=True)
+    return fused[:limit] if limit else fused
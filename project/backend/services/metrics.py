@@ -0,0 +1,116 @@
+import os
+from typing import Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# stage calls range from sub-millisecond cache hits to multi-second LLM answers and page extraction
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in one pipeline stage call", ["stage"], buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds", "Time to produce a response (headers, for streams)", ["view", "method"],
+    buckets=STAGE_BUCKETS,
+)
+
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(stage=name).observe(seconds)
+
+
+def observe_request(view: str, method: str, seconds: float):
+    REQUEST_SECONDS.labels(view=view, method=method).observe(seconds)
+
+
+# -------------------------
+# 1️⃣ Gauges read at scrape time
+# -------------------------
+class ServiceStatsCollector:
+    """
+    Exposes the counters the services already keep (cache hits, LLM
+    limiter, ingestion queue) when Prometheus scrapes, instead of updating
+    gauges on every request. Cache and limiter values are per process.
+    """
+
+    def describe(self):
+        return []  # keeps register() from calling collect(), which queries the database
+
+    def collect(self):
+        from django.db.models import Count
+        from documents.models import IngestionJob
+        from . import answer_cache, embedding_cache
+        from .embedding_service import get_query_cache
+        from .rag_service import async_llm_stats, llm_stats
+
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("rag_cache_hit_ratio", "Hit ratio since the process started", labels=["cache"])
+        answers = answer_cache.stats()
+        caches = {
+            "query_embedding": get_query_cache().stats(),
+            "chunk_embedding": embedding_cache.stats(),
+            "answer": {
+                "hits": answers["exact_hits"] + answers["semantic_hits"],
+                "misses": answers["misses"],
+                "hit_rate": answers["hit_rate"],
+            },
+        }
+        for cache, stats in caches.items():
+            hits.add_metric([cache], stats["hits"])
+            misses.add_metric([cache], stats["misses"])
+            ratio.add_metric([cache], stats["hit_rate"])
+        yield hits
+        yield misses
+        yield ratio
+
+        coalesced = CounterMetricFamily("rag_answer_cache_coalesced", "Answer requests that waited on an identical one")
+        coalesced.add_metric([], answers["coalesced"])
+        yield coalesced
+
+        in_flight = GaugeMetricFamily("rag_llm_in_flight", "LLM calls in flight", labels=["client"])
+        waiting = GaugeMetricFamily("rag_llm_waiting", "Callers queued for an LLM slot", labels=["client"])
+        rejected = CounterMetricFamily("rag_llm_rejected", "Callers that timed out waiting for a slot", labels=["client"])
+        for client, stats in (("sync", llm_stats()), ("async", async_llm_stats())):
+            in_flight.add_metric([client], stats["in_flight"])
+            waiting.add_metric([client], stats["waiting"])
+            rejected.add_metric([client], stats["rejected"])
+        yield in_flight
+        yield waiting
+        yield rejected
+
+        jobs = GaugeMetricFamily("rag_ingestion_jobs", "Ingestion jobs by status", labels=["status"])
+        counts = dict(IngestionJob.objects.values_list("status").annotate(count=Count("id")).order_by())
+        for status, _ in IngestionJob.STATUS_CHOICES:
+            jobs.add_metric([status], counts.get(status, 0))
+        yield jobs
+
+
+REGISTRY.register(ServiceStatsCollector())
+
+
+# -------------------------
+# 2️⃣ Exposition
+# -------------------------
+def render() -> Tuple[bytes, str]:
+    """
+    The metrics in Prometheus text format. With PROMETHEUS_MULTIPROC_DIR set
+    (several server processes), histograms are summed across processes.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(ServiceStatsCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_server(port: int):
+    """
+    Serves /metrics on its own port, for processes without a web server (the ingestion worker).
+    """
+    from prometheus_client import start_http_server
+
+    start_http_server(port)
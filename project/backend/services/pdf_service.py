@@ -0,0 +1,156 @@
+import logging
+import multiprocessing
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List
+import PyPDF2
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Control characters other than \n, \r and \t (Postgres rejects NUL in text columns).
+# str.translate drops them in one C-level pass instead of a per-character Python loop.
+_CONTROL_CHARS = dict.fromkeys(c for c in range(32) if chr(c) not in "\n\r\t")
+
+
+def clean_text(text: str) -> str:
+    """
+    Removes NUL and other control characters.
+    """
+    return text.translate(_CONTROL_CHARS)
+
+
+def iter_pdf_pages(source) -> Iterator[str]:
+    """
+    Yields the cleaned text of each page of a PDF, one page at a time, given a
+    path or an open binary file. Pages without text are skipped.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield from iter_pdf_pages(f)
+        return
+
+    reader = PyPDF2.PdfReader(source)
+    for page in reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            yield clean_text(page_text)
+
+
+def extract_text_from_pdf(source) -> str:
+    """
+    Extracts the full cleaned text of a PDF. Prefer iter_pdf_pages for large files.
+    """
+    return "\n".join(iter_pdf_pages(source))
+
+
+# -------------------------
+# Process-pool extraction
+# -------------------------
+class PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _extract_page_range(path: str, start: int, stop: int, page_timeout: float) -> List[str]:
+    """
+    Runs in a pool process: extracts pages [start, stop) of one PDF. A page
+    that takes longer than `page_timeout` seconds or fails to parse yields ''.
+    """
+    signal.signal(signal.SIGALRM, _raise_page_timeout)
+    texts = []
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for number in range(start, stop):
+            signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                texts.append(clean_text(reader.pages[number].extract_text() or ""))
+            except PageTimeout:
+                texts.append("")
+                logger.warning("Page %d of %s timed out after %ss", number, path, page_timeout)
+            except Exception as e:
+                texts.append("")
+                logger.warning("Page %d of %s could not be extracted: %s", number, path, e)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    return texts
+
+
+def get_extraction_pool():
+    """
+    Returns the process-wide extraction pool, or None when PDF_EXTRACT_WORKERS is 0.
+    """
+    global _pool
+    if settings.PDF_EXTRACT_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the workers only need PyPDF2, and forking a threaded Django process is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def iter_pdf_pages_parallel(path: str, pages_per_task: int = None, page_timeout: float = None) -> Iterator[str]:
+    """
+    Same output as iter_pdf_pages, but pages are extracted in the shared
+    process pool in ranges of at most PDF_PAGES_PER_TASK pages. Ranges of one file run on
+    several cores, and concurrent callers (one per ingestion job) share the
+    pool, so a batch of files spreads across all workers. Only a bounded
+    window of ranges is in flight, and pages come back in order.
+    """
+    pool = get_extraction_pool()
+    if pool is None:
+        yield from iter_pdf_pages(path)
+        return
+
+    page_timeout = page_timeout or settings.PDF_PAGE_TIMEOUT
+    with open(path, "rb") as f:
+        page_count = len(PyPDF2.PdfReader(f).pages)
+    # small files are still split so that every worker gets a share
+    pages_per_task = pages_per_task or max(1, min(
+        settings.PDF_PAGES_PER_TASK, -(-page_count // settings.PDF_EXTRACT_WORKERS)
+    ))
+
+    ranges = iter([(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)])
+    window = settings.PDF_EXTRACT_WORKERS * 2
+    pending = deque()
+
+    def _submit_next():
+        for start, stop in ranges:
+            pending.append((pool.submit(_extract_page_range, path, start, stop, page_timeout), stop - start))
+            return
+
+    try:
+        for _ in range(window):
+            _submit_next()
+        while pending:
+            future, size = pending.popleft()
+            _submit_next()
+            # generous guard on top of the per-page alarm, in case a worker dies silently
+            for text in future.result(timeout=page_timeout * size + 30):
+                if text:
+                    yield text
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+    finally:
+        for future, _ in pending:
+            future.cancel()
@@ -1,12 +1,257 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+import logging
+from django.conf import settings
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    IntegerIndexParams,
+    PayloadSchemaType,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+    VectorParamsDiff,
+)
+from .cache_service import LoopLocal
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "document_chunks"
 
 # Connect to Qdrant (assuming you run it in docker-compose on service name "qdrant")
-qdrant_client = QdrantClient(host="qdrant", port=6333)
+if settings.QDRANT_LOCATION:
+    qdrant_client = QdrantClient(location=settings.QDRANT_LOCATION)
+else:
+    qdrant_client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+
+def _new_async_client() -> AsyncQdrantClient:
+    return AsyncQdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+
+
+_async_clients = LoopLocal(_new_async_client)
+
+
+def get_async_client():
+    """
+    AsyncQdrantClient for the async views, one per event loop (see
+    LoopLocal), or None with QDRANT_LOCATION: a local instance belongs to
+    the sync client, so async callers have to go through it instead.
+    """
+    if settings.QDRANT_LOCATION:
+        return None
+    return _async_clients.get()
+
+
+# every search filters on user_id, deletes/lookups filter on document_id
+PAYLOAD_INDEXES = {
+    "user_id": IntegerIndexParams(type="integer", lookup=True, range=False),
+    "document_id": PayloadSchemaType.KEYWORD,
+}
+
+
+def _hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def _quantization_config():
+    if settings.QDRANT_QUANTIZATION == "int8":
+        # int8 copies stay in RAM for the graph search, full vectors can live on disk for rescoring
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    return None
+
+
+# -------------------------
+# 1️⃣ Aliases
+# -------------------------
+def resolve_alias(name: str, client: QdrantClient = None):
+    """
+    Returns the collection an alias points to, `name` itself for a plain
+    collection, or None if neither exists.
+    """
+    client = client or qdrant_client
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name if client.collection_exists(name) else None
+
+
+def switch_alias(alias: str, collection_name: str, client: QdrantClient = None):
+    """
+    Points `alias` at `collection_name` in one atomic alias update. Refuses
+    when a plain collection still sits under the alias name (created before
+    aliases were used): provision_qdrant moves it behind an alias first.
+    Returns the collection the alias pointed to before, if any.
+    """
+    client = client or qdrant_client
+    previous = resolve_alias(alias, client)
+    if previous == alias:
+        raise ValueError(
+            f"{alias} is a plain collection, not an alias; run provision_qdrant to move it behind one first."
+        )
+    operations = [CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias))]
+    if previous is not None:
+        operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info("Alias %s: %s -> %s", alias, previous, collection_name)
+    return previous
+
+
+# -------------------------
+# 2️⃣ Provision / migrate
+# -------------------------
+def _copy_collection(source: str, target: str, client: QdrantClient, batch_size: int) -> int:
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source, limit=batch_size, offset=offset, with_payload=True, with_vectors=True,
+        )
+        if points:
+            client.upsert(
+                collection_name=target,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=True,
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def migrate_legacy_collection(name: str, client: QdrantClient = None, batch_size: int = 1000) -> str:
+    """
+    Moves a plain collection created before aliases were used to `<name>_v1`
+    behind an alias `<name>`: copies every point (again while points keep
+    arriving), then deletes the plain collection and creates the alias.
+    Qdrant can't hold an alias and a collection under the same name, so
+    searches fail for the moment in between, and writes landing after the
+    last copy are lost: run it before the app serves traffic, as
+    provision_qdrant does in docker-compose. Returns `<name>_v1`.
+    """
+    client = client or qdrant_client
+    target = f"{name}_v1"
+    vectors = client.get_collection(name).config.params.vectors
+    if not client.collection_exists(target):
+        client.create_collection(
+            collection_name=target,
+            vectors_config=VectorParams(size=vectors.size, distance=vectors.distance, on_disk=vectors.on_disk),
+        )
+    while True:
+        copied = _copy_collection(name, target, client, batch_size)
+        logger.info("Copied %s point(s) from legacy collection %s to %s", copied, name, target)
+        if client.count(target, exact=True).count >= client.count(name, exact=True).count:
+            break
+    client.delete_collection(name)
+    client.update_collection_aliases(change_aliases_operations=[
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=name))
+    ])
+    logger.warning("Replaced legacy collection %s with an alias to %s", name, target)
+    return target
+
+
+def ensure_collection(
+    collection_name: str = COLLECTION_NAME, client: QdrantClient = None, versioned: bool = True, dimension: int = None
+) -> bool:
+    """
+    Creates the collection if missing, otherwise brings its HNSW, on-disk and
+    quantization settings in line with settings.py. Never drops data.
+    Also creates the payload indexes. Returns True if the collection was created.
+
+    With `versioned`, a missing collection is created as `<name>_v1` behind
+    an alias `<name>`, so reindex_qdrant can later swap in a rebuilt copy,
+    and a plain collection created before aliases were used is moved there
+    (see migrate_legacy_collection).
+    """
+    client = client or qdrant_client
+    dimension = dimension or settings.EMBEDDING_DIMENSION
+    target = resolve_alias(collection_name, client)
+    if versioned and target == collection_name:
+        target = migrate_legacy_collection(collection_name, client)
+    created = target is None
+    if created:
+        target = f"{collection_name}_v1" if versioned else collection_name
+        client.create_collection(
+            collection_name=target,
+            vectors_config=VectorParams(
+                size=dimension,
+                distance=Distance.COSINE,
+                on_disk=settings.QDRANT_ON_DISK_VECTORS,
+            ),
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config(),
+        )
+        logger.info("Created Qdrant collection %s", target)
+        if versioned:
+            switch_alias(collection_name, target, client)
+    else:
+        vectors = client.get_collection(target).config.params.vectors
+        if vectors.size != dimension:
+            raise ValueError(
+                f"Collection {collection_name} has {vectors.size}-dimensional vectors, "
+                f"settings expect {dimension}; rebuild it with a reindex instead."
+            )
+        client.update_collection(
+            collection_name=target,
+            vectors_config={"": VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK_VECTORS)},
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config() or Disabled.DISABLED,
+        )
+        logger.info("Updated Qdrant collection %s", target)
+
+    existing = client.get_collection(target).payload_schema or {}
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name not in existing:
+            client.create_payload_index(target, field_name=field_name, field_schema=schema, wait=True)
+            logger.info("Created payload index %s.%s", target, field_name)
+    return created
+
 
 # Create collection if not exists
 def init_qdrant():
-    qdrant_client.recreate_collection(
-        collection_name="document_chunks",
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE)  # 384 for MiniLM embeddings
-    )
+    ensure_collection()
+
+
+# -------------------------
+# 3️⃣ Report
+# -------------------------
+def collection_report(collection_name: str = COLLECTION_NAME, client: QdrantClient = None) -> dict:
+    """
+    Point counts, settings and an estimate of the collection's memory footprint.
+    """
+    client = client or qdrant_client
+    target = resolve_alias(collection_name, client) or collection_name
+    info = client.get_collection(target)
+    vectors = info.config.params.vectors
+    points = info.points_count or 0
+    hnsw_m = info.config.hnsw_config.m or 0
+    quantization = info.config.quantization_config
+
+    vector_bytes = points * vectors.size * 4  # float32
+    quantized_bytes = points * vectors.size if quantization else 0  # int8
+    hnsw_bytes = points * hnsw_m * 2 * 4  # ~2m links of 4 bytes per point on level 0
+    ram_bytes = hnsw_bytes + quantized_bytes + (0 if vectors.on_disk else vector_bytes)
+    return {
+        "collection": collection_name,
+        "target": target,
+        "status": str(info.status),
+        "points": points,
+        "indexed_vectors": info.indexed_vectors_count,
+        "segments": info.segments_count,
+        "dimension": vectors.size,
+        "on_disk_vectors": bool(vectors.on_disk),
+        "quantization": "int8" if quantization else None,
+        "hnsw": {"m": hnsw_m, "ef_construct": info.config.hnsw_config.ef_construct},
+        "payload_indexes": {name: str(schema.data_type) for name, schema in (info.payload_schema or {}).items()},
+        "estimated_bytes": {
+            "vectors": vector_bytes,
+            "quantized_vectors": quantized_bytes,
+            "hnsw_graph": hnsw_bytes,
+            "ram": ram_bytes,
+            "disk": vector_bytes if vectors.on_disk else 0,
+        },
+    }
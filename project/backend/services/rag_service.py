@@ -1,29 +1,360 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+import httpx
 import openai
 from django.conf import settings
+from .cache_service import LoopLocal
+
+logger = logging.getLogger(__name__)
 
 # Set the API key
 openai.api_key = settings.OPENAI_API_KEY
 
+SYSTEM_PROMPT = "You are an AI assistant that answers questions based on provided context."
+
+# upstream failures worth retrying: 429, 5xx, timeouts and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+
+class LLMError(Exception):
+    """
+    The completion could not be produced (upstream error, retries exhausted or queue full).
+    """
+
+
+# -------------------------
+# 1️⃣ Concurrency limiter
+# -------------------------
+class ConcurrencyLimiter:
+    """
+    Caps in-flight upstream calls per process; extra callers queue on a
+    semaphore for up to `queue_timeout` seconds. Keeps queueing metrics.
+    """
+
+    def __init__(self, limit: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def slot(self):
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        got_slot = self._semaphore.acquire(timeout=self.queue_timeout)
+        waited = time.perf_counter() - start
+        self._enter(got_slot, waited)
+        try:
+            yield waited
+        finally:
+            self._leave()
+            self._semaphore.release()
+
+    def _enter(self, got_slot: bool, waited: float):
+        with self._lock:
+            self.waiting -= 1
+            if not got_slot:
+                self.rejected += 1
+            else:
+                self.acquired += 1
+                self.in_flight += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+        if not got_slot:
+            raise LLMError(f"Too many concurrent requests to the language model (waited {waited:.1f}s).")
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+class AsyncConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    ConcurrencyLimiter for coroutines: waiters queue on an asyncio.Semaphore
+    instead of blocking a thread. The semaphore is per event loop, so the
+    limit holds per process under uvicorn. Under WSGI each request has its
+    own loop, and concurrency is bounded by the server's threads instead.
+    """
+
+    def __init__(self, limit: int, queue_timeout: float):
+        super().__init__(limit, queue_timeout)
+        self._async_semaphores = LoopLocal(lambda: asyncio.Semaphore(limit))
+
+    @asynccontextmanager
+    async def aslot(self):
+        start = time.perf_counter()
+        semaphore = self._async_semaphores.get()
+        with self._lock:
+            self.waiting += 1
+        try:
+            if semaphore.locked():
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            else:
+                await semaphore.acquire()  # free slot: returns without yielding
+            got_slot = True
+        except asyncio.TimeoutError:
+            got_slot = False
+        except BaseException:  # cancelled while queueing
+            with self._lock:
+                self.waiting -= 1
+            raise
+        waited = time.perf_counter() - start
+        self._enter(got_slot, waited)
+        try:
+            yield waited
+        finally:
+            self._leave()
+            semaphore.release()
+
+
+# -------------------------
+# 2️⃣ Shared client
+# -------------------------
+_client = None
+_client_lock = threading.Lock()
+_limiter = None
+_async_limiter = None
+
+
+def get_client() -> openai.OpenAI:
+    """
+    Returns the process-wide client. It owns one keep-alive connection pool,
+    so calls reuse TCP/TLS connections instead of opening new ones.
+    OPENAI_BASE_URL lets us point at any OpenAI-compatible server (e.g. the
+    fake_llm_server command). Retries are handled by _call_with_retries.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+                _client = openai.OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL,
+                    timeout=timeout,
+                    max_retries=0,
+                    http_client=openai.DefaultHttpxClient(
+                        timeout=timeout,
+                        limits=httpx.Limits(
+                            max_connections=settings.LLM_MAX_CONCURRENCY,
+                            max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                        ),
+                    ),
+                )
+    return _client
+
+
+def _new_async_client() -> openai.AsyncOpenAI:
+    timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+    return openai.AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        timeout=timeout,
+        max_retries=0,
+        http_client=openai.DefaultAsyncHttpxClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_ASYNC_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.LLM_ASYNC_MAX_CONCURRENCY,
+            ),
+        ),
+    )
+
+
+_async_clients = LoopLocal(_new_async_client)
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """
+    Async counterpart of get_client for the async views. Its pool is sized for
+    LLM_ASYNC_MAX_CONCURRENCY: waiting on a completion costs a socket and a
+    coroutine, not a thread. The pool's connections belong to one event
+    loop, so there is one client per loop (see LoopLocal).
+    """
+    return _async_clients.get()
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    global _limiter
+    if _limiter is None:
+        with _client_lock:
+            if _limiter is None:
+                _limiter = ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_TIMEOUT)
+    return _limiter
+
+
+def get_async_limiter() -> AsyncConcurrencyLimiter:
+    global _async_limiter
+    if _async_limiter is None:
+        with _client_lock:
+            if _async_limiter is None:
+                _async_limiter = AsyncConcurrencyLimiter(settings.LLM_ASYNC_MAX_CONCURRENCY, settings.LLM_QUEUE_TIMEOUT)
+    return _async_limiter
+
+
+def llm_stats() -> dict:
+    return get_limiter().stats()
+
+
+def async_llm_stats() -> dict:
+    return get_async_limiter().stats()
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    # honour Retry-After on 429s, otherwise exponential backoff with full jitter
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.LLM_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _call_with_retries(**kwargs):
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            return get_client().chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise LLMError(f"Error generating answer: {e}") from e
+            delay = _retry_delay(attempt, e)
+            logger.warning("LLM call failed (%s), retry %d in %.2fs", e.__class__.__name__, attempt + 1, delay)
+            time.sleep(delay)
+        except openai.OpenAIError as e:
+            raise LLMError(f"Error generating answer: {e}") from e
+
+
+async def _acall_with_retries(**kwargs):
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        try:
+            return await get_async_client().chat.completions.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise LLMError(f"Error generating answer: {e}") from e
+            delay = _retry_delay(attempt, e)
+            logger.warning("LLM call failed (%s), retry %d in %.2fs", e.__class__.__name__, attempt + 1, delay)
+            await asyncio.sleep(delay)
+        except openai.OpenAIError as e:
+            raise LLMError(f"Error generating answer: {e}") from e
+
+
+# -------------------------
+# 3️⃣ Answer generation
+# -------------------------
+def _build_messages(query: str, context: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context: {context}\n\nQuestion: {query}\n\nAnswer based on the context:"}
+    ]
+
+
 def generate_answer(query: str, context: str):
     """
     Calls OpenAI API with query + context and returns the answer.
-    Updated for openai>=1.0.0
-    """
-    try:
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an AI assistant that answers questions based on provided context."},
-                {"role": "user", "content": f"Context: {context}\n\nQuestion: {query}\n\nAnswer based on the context:"}
-            ],
+    Raises LLMError if no answer could be produced.
+    """
+    with get_limiter().slot():
+        response = _call_with_retries(
+            model=settings.OPENAI_MODEL,
+            messages=_build_messages(query, context),
+            temperature=0,
+            max_tokens=500
+        )
+    return (response.choices[0].message.content or "").strip()
+
+
+def stream_answer(query: str, context: str) -> Iterator[str]:
+    """
+    Same prompt as generate_answer, but yields the answer text piece by piece
+    as the model produces it. Closing the generator (e.g. the client went
+    away) closes the upstream HTTP response, which cancels the completion.
+    The concurrency slot is held until the stream ends.
+    """
+    with get_limiter().slot():
+        stream = _call_with_retries(
+            model=settings.OPENAI_MODEL,
+            messages=_build_messages(query, context),
+            temperature=0,
+            max_tokens=500,
+            stream=True
+        )
+        try:
+            for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+        except openai.OpenAIError as e:
+            raise LLMError(f"Error generating answer: {e}") from e
+        finally:
+            stream.close()
+
+
+# -------------------------
+# 4️⃣ Async answer generation (ASGI views)
+# -------------------------
+async def agenerate_answer(query: str, context: str):
+    """
+    Async generate_answer: the coroutine is suspended while the model works,
+    so one event loop can wait on hundreds of completions.
+    """
+    async with get_async_limiter().aslot():
+        response = await _acall_with_retries(
+            model=settings.OPENAI_MODEL,
+            messages=_build_messages(query, context),
             temperature=0,
             max_tokens=500
         )
-        
-        answer = response.choices[0].message.content.strip()
-        return answer
-        
-    except Exception as e:
-        return f"Error generating answer: {str(e)}"
\ No newline at end of file
+    return (response.choices[0].message.content or "").strip()
+
+
+async def astream_answer(query: str, context: str) -> AsyncIterator[str]:
+    """
+    Async stream_answer. Closing the generator (aclose) closes the upstream
+    response and releases the concurrency slot.
+    """
+    async with get_async_limiter().aslot():
+        stream = await _acall_with_retries(
+            model=settings.OPENAI_MODEL,
+            messages=_build_messages(query, context),
+            temperature=0,
+            max_tokens=500,
+            stream=True
+        )
+        try:
+            async for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+        except openai.OpenAIError as e:
+            raise LLMError(f"Error generating answer: {e}") from e
+        finally:
+            await stream.close()
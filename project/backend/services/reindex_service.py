@@ -0,0 +1,272 @@
+import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+from django.conf import settings
+from django.utils import timezone
+from qdrant_client.models import PointIdsList
+from documents.models import DocumentChunk, IngestionJob, ReindexRun, TenantPlacement
+from .cache_service import LRUCache
+from .embedding_cache import embed_chunks
+from .qdrant_service import COLLECTION_NAME, ensure_collection, qdrant_client, resolve_alias, switch_alias
+
+logger = logging.getLogger(__name__)
+
+_active_models = None
+
+
+def _model_cache() -> LRUCache:
+    global _active_models
+    if _active_models is None:
+        _active_models = LRUCache(maxsize=10000, ttl=settings.INDEX_MODEL_CACHE_TTL)
+    return _active_models
+
+
+# -------------------------
+# 1️⃣ Serving model
+# -------------------------
+def active_model(alias: str) -> str:
+    """
+    Embedding model of the vectors behind `alias`: the one recorded by its
+    last switched reindex, else EMBEDDING_MODEL_NAME. Queries and new chunks
+    must be embedded with it. Cached for INDEX_MODEL_CACHE_TTL seconds.
+    """
+    cache = _model_cache()
+    model_name = cache.get(alias)
+    if model_name is None:
+        model_name = (
+            ReindexRun.objects.filter(alias=alias, status=ReindexRun.SWITCHED)
+            .order_by("-switched_at").values_list("model_name", flat=True).first()
+            or settings.EMBEDDING_MODEL_NAME
+        )
+        cache.set(alias, model_name)
+    return model_name
+
+
+# -------------------------
+# 2️⃣ Runs
+# -------------------------
+def _next_collection_name(alias: str) -> str:
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    names = [collection.name for collection in qdrant_client.get_collections().collections]
+    names += ReindexRun.objects.filter(alias=alias).values_list("collection_name", flat=True)
+    versions = [int(match.group(1)) for match in map(pattern.match, names) if match]
+    return f"{alias}_v{max(versions, default=0) + 1}"
+
+
+def start_run(alias: str, model_name: str = None, restart: bool = False) -> Tuple[ReindexRun, bool]:
+    """
+    Returns (run, resumed): the alias's unfinished run if it uses the same
+    model, otherwise a new run. A run that is not resumed is abandoned and
+    its half-built collection deleted.
+    """
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    run = ReindexRun.objects.filter(alias=alias).first()
+    if run is not None and run.status != ReindexRun.SWITCHED:
+        if not restart and run.model_name == model_name:
+            run.status = ReindexRun.BUILDING
+            run.error = ""
+            run.save(update_fields=["status", "error", "updated_at"])
+            return run, True
+        if resolve_alias(alias) != run.collection_name and qdrant_client.collection_exists(run.collection_name):
+            qdrant_client.delete_collection(run.collection_name)
+        run.status = ReindexRun.FAILED
+        run.error = "Abandoned for a new run"
+        run.save(update_fields=["status", "error", "updated_at"])
+
+    run = ReindexRun.objects.create(alias=alias, collection_name=_next_collection_name(alias), model_name=model_name)
+    return run, False
+
+
+def _chunks(alias: str):
+    """
+    Chunks whose vectors live behind `alias`: dedicated tenants for their
+    own collection, everyone else for the shared one.
+    """
+    queryset = DocumentChunk.objects.select_related("document").only(
+        "id", "text", "chunk_index", "document__id", "document__uploaded_by_id"
+    )
+    if alias == COLLECTION_NAME:
+        return queryset.exclude(document__uploaded_by_id__in=TenantPlacement.objects.values("user_id"))
+    return queryset.filter(
+        document__uploaded_by_id__in=TenantPlacement.objects.filter(collection_name=alias).values("user_id")
+    )
+
+
+# -------------------------
+# 3️⃣ Copy passes
+# -------------------------
+def _copy_chunks(run: ReindexRun, queryset, batch_size: int, parallel: int, max_rate: float,
+                 after: str = None, on_batch=None) -> int:
+    """
+    Embeds `queryset` in pk order (from `after`) with the run's model and
+    upserts it into the run's collection, `parallel` batches in flight.
+    `on_batch(last_pk, size)` is called in pk order once a batch is stored.
+    With `max_rate`, sleeps to stay under that many chunks per second.
+    """
+    from .document_service import _build_point
+
+    done = 0
+    submitted = 0
+    start = time.perf_counter()
+    in_flight = deque()
+
+    def _finish_oldest():
+        nonlocal done
+        future, last_pk, size = in_flight.popleft()
+        future.result()
+        done += size
+        if on_batch:
+            on_batch(last_pk, size)
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        while True:
+            page = queryset.filter(pk__gt=after) if after else queryset
+            batch = list(page.order_by("pk")[:batch_size])
+            if not batch:
+                break
+            after = str(batch[-1].pk)
+            vectors = embed_chunks([chunk.text for chunk in batch], model_name=run.model_name)
+            points = [
+                _build_point(chunk, vector, chunk.document.uploaded_by_id) for chunk, vector in zip(batch, vectors)
+            ]
+            future = pool.submit(qdrant_client.upsert, collection_name=run.collection_name, points=points, wait=True)
+            in_flight.append((future, after, len(batch)))
+            submitted += len(batch)
+            while len(in_flight) >= parallel:
+                _finish_oldest()
+            if max_rate:
+                ahead = submitted / max_rate - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+        while in_flight:
+            _finish_oldest()
+    return done
+
+
+def _prune(run: ReindexRun, batch_size: int) -> int:
+    """
+    Deletes points whose chunk no longer exists in Postgres (documents
+    deleted or re-ingested while the run was copying).
+    """
+    removed = 0
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=run.collection_name, limit=batch_size, offset=offset,
+            with_payload=False, with_vectors=False,
+        )
+        ids = [str(point.id) for point in points]
+        existing = {str(pk) for pk in DocumentChunk.objects.filter(pk__in=ids).values_list("pk", flat=True)}
+        gone = [point_id for point_id in ids if point_id not in existing]
+        if gone:
+            qdrant_client.delete(
+                collection_name=run.collection_name, points_selector=PointIdsList(points=gone), wait=True
+            )
+            removed += len(gone)
+        if offset is None:
+            return removed
+
+
+def build(run: ReindexRun, batch_size: int, parallel: int, max_rate: float, log=logger.info) -> int:
+    """
+    Main pass: copies every chunk after run.cursor, saving the cursor after
+    each stored batch, so a crash loses at most `parallel` batches.
+    """
+    from .embedding_service import get_model
+
+    dimension = get_model(run.model_name).get_sentence_embedding_dimension()
+    ensure_collection(run.collection_name, versioned=False, dimension=dimension)
+    queryset = _chunks(run.alias)
+    if run.chunks_total is None:
+        run.chunks_total = queryset.count()
+        run.save(update_fields=["chunks_total", "updated_at"])
+
+    def _progress(last_pk, size):
+        run.cursor = last_pk
+        run.chunks_done += size
+        run.save(update_fields=["cursor", "chunks_done", "updated_at"])
+        if run.chunks_done // 10000 != (run.chunks_done - size) // 10000:
+            log(f"{run.alias}: {run.chunks_done}/{run.chunks_total} chunks in {run.collection_name}")
+
+    return _copy_chunks(run, queryset, batch_size, parallel, max_rate, after=run.cursor or None, on_batch=_progress)
+
+
+def catch_up(run: ReindexRun, batch_size: int, parallel: int, max_rate: float) -> Tuple[int, int]:
+    """
+    Copies the chunks of documents ingested since the last catch-up (or the
+    start of the run), which the pk cursor may have passed already, then
+    prunes deleted chunks. Returns (copied, pruned).
+    """
+    since = run.caught_up_at or run.created_at
+    now = timezone.now()
+    touched = IngestionJob.objects.filter(updated_at__gte=since).values("document_id")
+    copied = _copy_chunks(run, _chunks(run.alias).filter(document_id__in=touched), batch_size, parallel, max_rate)
+    pruned = _prune(run, batch_size)
+    run.caught_up_at = now
+    run.save(update_fields=["caught_up_at", "updated_at"])
+    return copied, pruned
+
+
+# -------------------------
+# 4️⃣ Reindex
+# -------------------------
+def reindex(alias: str = COLLECTION_NAME, model_name: str = None, restart: bool = False, batch_size: int = None,
+            parallel: int = None, max_rate: float = None, switch: bool = True, grace: float = None,
+            drop_old: bool = False, log=logger.info) -> ReindexRun:
+    """
+    Rebuilds the collection behind `alias` from DocumentChunk rows into a new
+    versioned collection while the old one keeps serving:
+
+    1. main pass, resumable from the run's cursor;
+    2. catch-up pass for documents ingested meanwhile, and prune;
+    3. atomic alias switch (skipped with switch=False; run again to finish);
+    4. wait `grace` seconds for cached serving models to expire, then
+       catch up again with what was written around the switch.
+
+    The previous collection is kept for rollback unless `drop_old`.
+    """
+    batch_size = batch_size or settings.REINDEX_BATCH_SIZE
+    parallel = parallel or settings.REINDEX_PARALLEL
+    max_rate = settings.REINDEX_MAX_CHUNKS_PER_SECOND if max_rate is None else max_rate
+    grace = settings.INDEX_MODEL_CACHE_TTL if grace is None else grace
+
+    if resolve_alias(alias) == alias:
+        # fail before the build rather than at the switch
+        raise ValueError(f"{alias} is a plain collection, not an alias; run provision_qdrant to move it behind one first.")
+    run, resumed = start_run(alias, model_name, restart)
+    log(f"{alias}: {'resuming' if resumed else 'starting'} run {run.id} -> {run.collection_name} ({run.model_name})")
+    try:
+        copied = build(run, batch_size, parallel, max_rate, log)
+        log(f"{alias}: main pass copied {copied} chunk(s)")
+        copied, pruned = catch_up(run, batch_size, parallel, max_rate)
+        log(f"{alias}: catch-up copied {copied}, pruned {pruned}")
+        if not switch:
+            log(f"{alias}: {run.collection_name} is ready; run again without --no-switch to switch")
+            return run
+
+        run.previous_collection = switch_alias(alias, run.collection_name) or ""
+        run.status = ReindexRun.SWITCHED
+        run.switched_at = timezone.now()
+        run.save(update_fields=["previous_collection", "status", "switched_at", "updated_at"])
+        _model_cache().delete(alias)
+        log(f"{alias}: switched {run.previous_collection or '-'} -> {run.collection_name}")
+
+        if grace:
+            log(f"{alias}: waiting {grace:.0f}s for cached serving models to expire")
+            time.sleep(grace)
+        copied, pruned = catch_up(run, batch_size, parallel, max_rate)
+        log(f"{alias}: final catch-up copied {copied}, pruned {pruned}")
+
+        if drop_old and run.previous_collection:
+            qdrant_client.delete_collection(run.previous_collection)
+            log(f"{alias}: dropped {run.previous_collection}")
+    except Exception as e:
+        run.error = str(e)
+        if run.status == ReindexRun.BUILDING:
+            run.status = ReindexRun.FAILED
+        run.save(update_fields=["error", "status", "updated_at"])
+        raise
+    return run
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+from typing import List
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+# running estimate of cross-encoder cost per (query, chunk) pair, in seconds
+_pair_cost = None
+_cost_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Returns the process-wide CrossEncoder, loading it on first use.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                from sentence_transformers import CrossEncoder
+                _model = CrossEncoder(settings.RERANK_MODEL_NAME, device="cpu")
+                logger.info(
+                    "Loaded rerank model %s in %.2fs", settings.RERANK_MODEL_NAME, time.perf_counter() - start
+                )
+    return _model
+
+
+def warm_up() -> float:
+    start = time.perf_counter()
+    _score("warm-up", ["warm-up"] * settings.RERANK_CANDIDATES)
+    elapsed = time.perf_counter() - start
+    logger.info("Rerank model warm-up took %.2fs", elapsed)
+    return elapsed
+
+
+def _score(query: str, texts: List[str]) -> List[float]:
+    global _pair_cost
+    start = time.perf_counter()
+    scores = get_model().predict([(query, text) for text in texts], batch_size=len(texts))
+    cost = (time.perf_counter() - start) / len(texts)
+    with _cost_lock:
+        _pair_cost = cost if _pair_cost is None else 0.8 * _pair_cost + 0.2 * cost
+    return [float(score) for score in scores]
+
+
+def rerank(query: str, results: List[dict], top_k: int, budget_ms: float = None) -> List[dict]:
+    """
+    Scores the candidates with the cross-encoder in one batch and returns the
+    best `top_k`. Only as many candidates as fit in `budget_ms` (judged from
+    the measured per-pair cost) are scored, keeping retrieval order; if not
+    even `top_k` fit, retrieval order is returned unchanged.
+    """
+    if len(results) <= 1:
+        return results[:top_k]
+    budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    candidates = results
+    if _pair_cost and budget_ms:
+        affordable = int(budget_ms / 1000 / _pair_cost)
+        if affordable < top_k:
+            logger.info("Rerank skipped: %d pairs fit in %sms, need %d", affordable, budget_ms, top_k)
+            return results[:top_k]
+        candidates = results[:affordable]
+
+    scores = _score(query, [result["text"] or "" for result in candidates])
+    for result, score in zip(candidates, scores):
+        result["rerank_score"] = score
+        result["score"] = score
+    return sorted(candidates, key=lambda r: r["rerank_score"], reverse=True)[:top_k]
@@ -0,0 +1,189 @@
+import logging
+import time
+from typing import Dict, List
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchValue, PointStruct
+from documents.models import DocumentChunk, IngestionJob, TenantPlacement
+from .cache_service import LRUCache
+from .qdrant_service import COLLECTION_NAME, ensure_collection, qdrant_client
+from .reindex_service import active_model
+
+logger = logging.getLogger(__name__)
+
+_placements = None
+
+
+def _placement_cache() -> LRUCache:
+    global _placements
+    if _placements is None:
+        _placements = LRUCache(maxsize=10000, ttl=settings.TENANT_PLACEMENT_CACHE_TTL)
+    return _placements
+
+
+def dedicated_collection_name(user_id) -> str:
+    return f"{COLLECTION_NAME}_tenant_{user_id}"
+
+
+# -------------------------
+# 1️⃣ Routing
+# -------------------------
+def collection_for_user(user_id) -> str:
+    """
+    Returns the Qdrant collection holding this user's vectors. Placements are
+    cached for TENANT_PLACEMENT_CACHE_TTL seconds per process.
+    """
+    cache = _placement_cache()
+    collection = cache.get(user_id)
+    if collection is None:
+        collection = (
+            TenantPlacement.objects.filter(user_id=user_id).values_list("collection_name", flat=True).first()
+            or COLLECTION_NAME
+        )
+        cache.set(user_id, collection)
+    return collection
+
+
+def all_collections() -> List[str]:
+    dedicated = TenantPlacement.objects.values_list("collection_name", flat=True).distinct()
+    return [COLLECTION_NAME, *sorted(set(dedicated))]
+
+
+# -------------------------
+# 2️⃣ Placement policy
+# -------------------------
+def plan_rebalance(threshold: int = None) -> Dict[int, str]:
+    """
+    Tenants with at least `threshold` chunks get a dedicated collection; a
+    dedicated tenant goes back to the shared one once it drops below half of
+    it (hysteresis, so tenants near the line don't bounce). Returns the moves
+    as {user_id: target collection}.
+    """
+    threshold = threshold or settings.TENANT_DEDICATED_THRESHOLD
+    sizes = dict(
+        DocumentChunk.objects.values("document__uploaded_by_id")
+        .annotate(chunks=Count("id"))
+        .values_list("document__uploaded_by_id", "chunks")
+    )
+    sizes.pop(None, None)
+    placements = dict(TenantPlacement.objects.values_list("user_id", "collection_name"))
+
+    moves = {}
+    for user_id, chunks in sizes.items():
+        current = placements.get(user_id, COLLECTION_NAME)
+        if current == COLLECTION_NAME and chunks >= threshold:
+            moves[user_id] = dedicated_collection_name(user_id)
+    for user_id, current in placements.items():
+        if current != COLLECTION_NAME and sizes.get(user_id, 0) < threshold // 2:
+            moves[user_id] = COLLECTION_NAME
+    return moves
+
+
+# -------------------------
+# 3️⃣ Migration
+# -------------------------
+def _user_filter(user_id) -> Filter:
+    return Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+
+
+def _copy_points(user_id, source: str, target: str, batch_size: int, seen: set) -> int:
+    """Copies the user's points not already in `seen`, adding their ids to it."""
+    copied = 0
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=source,
+            scroll_filter=_user_filter(user_id),
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = [p for p in points if p.id not in seen]
+        if points:
+            qdrant_client.upsert(
+                collection_name=target,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=True,
+            )
+            seen.update(p.id for p in points)
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def _vector_size(collection: str) -> int:
+    return qdrant_client.get_collection(collection).config.params.vectors.size
+
+
+def _wait_for_jobs(user_id, started_before, poll_interval: float, log) -> None:
+    """
+    Waits until no ingestion job of the user that started before
+    `started_before` is still running: such a job resolved its collection
+    at start and may still be writing to the old one.
+    """
+    logged = False
+    while IngestionJob.objects.filter(
+        document__uploaded_by_id=user_id, status=IngestionJob.RUNNING, started_at__lt=started_before
+    ).exists():
+        if not logged:
+            log(f"user {user_id}: waiting for running ingestion jobs to finish")
+            logged = True
+        time.sleep(poll_interval)
+
+
+def move_tenant(
+    user_id, target: str, batch_size: int = 500, grace: float = None, poll_interval: float = 1.0, log=logger.info
+) -> int:
+    """
+    Moves a user's points to `target` without a search outage:
+
+    1. copy every point to the target collection (idempotent upserts);
+    2. switch the placement, so new reads and writes go to the target;
+    3. wait `grace` seconds for per-process placement caches to expire;
+    4. wait for ingestion jobs started before then, which still write to the source;
+    5. copy the points written to the source meanwhile, until a pass finds none;
+    6. delete the user's points from the source.
+
+    Vectors are copied as they are, so both collections must serve the same
+    embedding model and dimension; otherwise a ValueError is raised before
+    anything moves. Returns the number of points copied.
+    """
+    source = collection_for_user(user_id)
+    if source == target:
+        return 0
+    grace = settings.TENANT_PLACEMENT_CACHE_TTL if grace is None else grace
+
+    ensure_collection(target)
+    if active_model(source) != active_model(target) or _vector_size(source) != _vector_size(target):
+        raise ValueError(
+            f"{source} and {target} hold vectors of different models or dimensions; "
+            f"reindex {target} with the model of {source} before moving user {user_id}."
+        )
+    seen = set()
+    copied = _copy_points(user_id, source, target, batch_size, seen)
+    log(f"user {user_id}: copied {copied} point(s) {source} -> {target}")
+
+    if target == COLLECTION_NAME:
+        TenantPlacement.objects.filter(user_id=user_id).delete()
+    else:
+        TenantPlacement.objects.update_or_create(user_id=user_id, defaults={"collection_name": target})
+    _placement_cache().delete(user_id)
+
+    if grace:
+        log(f"user {user_id}: waiting {grace:.0f}s for cached placements to expire")
+        time.sleep(grace)
+    # jobs claimed from now on resolve the new placement
+    _wait_for_jobs(user_id, timezone.now(), poll_interval, log)
+    late = 0
+    while True:
+        copied_now = _copy_points(user_id, source, target, batch_size, seen)
+        if not copied_now:
+            break
+        late += copied_now
+    qdrant_client.delete(
+        collection_name=source, points_selector=FilterSelector(filter=_user_filter(user_id)), wait=True
+    )
+    log(f"user {user_id}: copied {late} late point(s), removed the user's points from {source}")
+    return copied + late
@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+from .metrics import observe_stage
+
+# stage name -> accumulated seconds for the request being handled, if any
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# copy_context() hands the same dict to pool threads (lexical search, batch answers)
+_timings_lock = threading.Lock()
+
+
+def start_request(request_id: str = None) -> Dict[str, float]:
+    timings = {}
+    _timings.set(timings)
+    _request_id.set(request_id or uuid.uuid4().hex)
+    return timings
+
+
+def end_request():
+    _timings.set(None)
+    _request_id.set(None)
+
+
+def get_timings() -> Dict[str, float]:
+    with _timings_lock:
+        return dict(_timings.get() or {})
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def record(name: str, seconds: float):
+    """
+    Adds `seconds` to the current request's `name` stage (if any) and to the
+    rag_stage_seconds histogram. Stages that run on several threads at once
+    add up, so a request's stage sums can exceed its wall time.
+    """
+    observe_stage(name, seconds)
+    timings = _timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a pipeline stage (embed, search, llm, ...) and adds it to the
+    current request's breakdown. Outside a request it only measures.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+class TimedIterator:
+    """
+    Wraps a lazy iterator (PDF pages, chunks) and records the time spent
+    producing its items as one `name` stage once it is exhausted. Time spent
+    in a wrapped `inner` TimedIterator is subtracted, so nested streams don't
+    count the same seconds twice.
+    """
+
+    def __init__(self, iterable: Iterable, name: str, inner: "TimedIterator" = None):
+        self._iterator = iter(iterable)
+        self.name = name
+        self.inner = inner
+        self.elapsed = 0.0
+        self._recorded = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self.elapsed += time.perf_counter() - start
+            self._record()
+            raise
+        self.elapsed += time.perf_counter() - start
+        return item
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            record(self.name, self.elapsed - (self.inner.elapsed if self.inner else 0.0))
+
+
+def server_timing_header(timings: Dict[str, float], total: float = None) -> str:
+    """
+    Server-Timing value for `timings`, plus the request's wall time as
+    `total` if given. Parallel stages are summed across threads, so they can
+    add up to more than `total`.
+    """
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.1f};desc="wall time"')
+    return ", ".join(parts)
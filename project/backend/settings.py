@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'users',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.middleware.StageTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -96,7 +98,111 @@ DATABASES = {
         'PORT': '5432',
     }
 }
+# Qdrant: QDRANT_LOCATION=':memory:' runs an in-process instance (local load tests only)
+QDRANT_LOCATION = os.getenv('QDRANT_LOCATION') or None
+QDRANT_HOST = os.getenv('QDRANT_HOST', 'qdrant')
+QDRANT_PORT = int(os.getenv('QDRANT_PORT', 6333))
+# collection layout, applied by `manage.py provision_qdrant`
+EMBEDDING_DIMENSION = int(os.getenv('EMBEDDING_DIMENSION', 384))  # 384 for MiniLM embeddings
+QDRANT_HNSW_M = int(os.getenv('QDRANT_HNSW_M', 16))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv('QDRANT_HNSW_EF_CONSTRUCT', 100))
+QDRANT_ON_DISK_VECTORS = os.getenv('QDRANT_ON_DISK_VECTORS', 'True') == 'True'  # full vectors on disk, used for rescoring
+QDRANT_QUANTIZATION = os.getenv('QDRANT_QUANTIZATION', 'int8')  # 'int8' scalar quantization or 'none'
+QDRANT_LEAN_PAYLOAD = os.getenv('QDRANT_LEAN_PAYLOAD', 'True') == 'True'  # don't copy chunk text into Qdrant
+# tenants with this many chunks get their own collection (`manage.py rebalance_tenants --auto`)
+TENANT_DEDICATED_THRESHOLD = int(os.getenv('TENANT_DEDICATED_THRESHOLD', 200000))
+TENANT_PLACEMENT_CACHE_TTL = int(os.getenv('TENANT_PLACEMENT_CACHE_TTL', 60))  # seconds
+# `manage.py reindex_qdrant`: rebuilds a collection behind its alias
+REINDEX_BATCH_SIZE = int(os.getenv('REINDEX_BATCH_SIZE', 256))  # chunks per embed + upsert batch
+REINDEX_PARALLEL = int(os.getenv('REINDEX_PARALLEL', 4))  # upsert batches in flight
+REINDEX_MAX_CHUNKS_PER_SECOND = float(os.getenv('REINDEX_MAX_CHUNKS_PER_SECOND', 0))  # 0 = unthrottled
+INDEX_MODEL_CACHE_TTL = int(os.getenv('INDEX_MODEL_CACHE_TTL', 10))  # seconds a process caches each alias's model
+
 OPENAI_API_KEY=os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None  # e.g. http://127.0.0.1:8089/v1 for `manage.py fake_llm_server`
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30.0))  # seconds per completion request
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5.0))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))  # on 429/5xx/timeouts
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))  # seconds, doubled per attempt (full jitter)
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8.0))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))  # in-flight completions per process
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 30.0))  # seconds to wait for a free slot
+# POST /user/chat/batch/: questions per request, and completions one batch may have in flight
+# (below LLM_MAX_CONCURRENCY, so a bulk job leaves slots for interactive chat)
+BATCH_MAX_QUESTIONS = int(os.getenv('BATCH_MAX_QUESTIONS', 100))
+BATCH_LLM_CONCURRENCY = int(os.getenv('BATCH_LLM_CONCURRENCY', 4))
+LLM_ASYNC_MAX_CONCURRENCY = int(os.getenv('LLM_ASYNC_MAX_CONCURRENCY', 256))  # in-flight completions per process, async views
+
+# RAG pipeline tuning
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_WARMUP = os.getenv('EMBEDDING_WARMUP', 'True') == 'True'  # load the model when the ASGI/WSGI app starts
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))  # chunks per model forward pass
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv('QDRANT_UPSERT_BATCH_SIZE', 256))  # points per upsert request
+QDRANT_UPSERT_PARALLEL = int(os.getenv('QDRANT_UPSERT_PARALLEL', 2))  # concurrent upsert requests
+CHUNK_EMBEDDING_CACHE = os.getenv('CHUNK_EMBEDDING_CACHE', 'True') == 'True'  # reuse vectors of already-embedded chunk text
+
+# Chunking: 'tokens' packs sentences up to the embedding model's input limit, 'words' uses fixed word counts
+CHUNKER = os.getenv('CHUNKER', 'tokens')
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 0))  # 0 = the model's max_seq_length minus special tokens
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', 32))
+CHUNK_SIZE_WORDS = int(os.getenv('CHUNK_SIZE_WORDS', 500))  # 'words' chunker only
+
+# Background ingestion worker (manage.py process_ingestion_jobs)
+INGESTION_WORKER_CONCURRENCY = int(os.getenv('INGESTION_WORKER_CONCURRENCY', 2))
+INGESTION_POLL_INTERVAL = float(os.getenv('INGESTION_POLL_INTERVAL', 2.0))  # seconds
+INGESTION_STALE_AFTER = int(os.getenv('INGESTION_STALE_AFTER', 30 * 60))  # seconds without progress before a running job is re-queued
+INGESTION_HEARTBEAT_INTERVAL = float(os.getenv('INGESTION_HEARTBEAT_INTERVAL', 60))  # seconds; keep well below INGESTION_STALE_AFTER
+
+# PDF extraction process pool (0 = extract in the calling thread)
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 16))  # pages extracted per pool task
+PDF_PAGE_TIMEOUT = float(os.getenv('PDF_PAGE_TIMEOUT', 10.0))  # seconds before a page is skipped
+
+# Prometheus metrics: /metrics on the web server (Bearer METRICS_TOKEN if set), and on
+# METRICS_WORKER_PORT for the ingestion worker (0 = off)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_WORKER_PORT = int(os.getenv('METRICS_WORKER_PORT', 0))
+
+# Retrieval: 'hybrid' fuses Qdrant vector search with Postgres full-text search (RRF), 'vector' is Qdrant only
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'hybrid')
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', 20))  # hits fetched from each retriever before fusion
+HYBRID_SEARCH_THREADS = int(os.getenv('HYBRID_SEARCH_THREADS', 8))  # threads running the lexical query
+RRF_K = int(os.getenv('RRF_K', 60))
+
+# Optional cross-encoder rerank: over-fetch RERANK_CANDIDATES, keep the best RERANK_TOP_K
+RERANK_ENABLED = os.getenv('RERANK_ENABLED', 'False') == 'True'
+RERANK_MODEL_NAME = os.getenv('RERANK_MODEL_NAME', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', 20))
+RERANK_TOP_K = int(os.getenv('RERANK_TOP_K', 3))
+RERANK_BUDGET_MS = float(os.getenv('RERANK_BUDGET_MS', 150))  # 0 = no budget
+
+# Query embedding cache: 'local' (per-process LRU) or 'shared' (Django cache alias below)
+QUERY_EMBEDDING_CACHE_BACKEND = os.getenv('QUERY_EMBEDDING_CACHE_BACKEND', 'local')
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', 2048))
+QUERY_EMBEDDING_CACHE_ALIAS = os.getenv('QUERY_EMBEDDING_CACHE_ALIAS', 'default')
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', 24 * 3600))
+
+# Prompt context: hits with a vector similarity below CONTEXT_MIN_SCORE (and no full-text match) are
+# dropped, and the LLM is skipped if none remain; the rest is packed into CONTEXT_MAX_TOKENS (0 = no limit)
+CONTEXT_MIN_SCORE = float(os.getenv('CONTEXT_MIN_SCORE', 0.2))  # cosine similarity, 0 disables
+CONTEXT_MAX_TOKENS = int(os.getenv('CONTEXT_MAX_TOKENS', 3000))
+
+# Answer cache in front of the LLM (exact + optional semantic tier)
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'True') == 'True'
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 1024))
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', 3600))  # seconds
+ANSWER_CACHE_SEMANTIC_THRESHOLD = float(os.getenv('ANSWER_CACHE_SEMANTIC_THRESHOLD', 0.95))  # cosine similarity, 0 disables
+ANSWER_CACHE_SEMANTIC_PER_GROUP = int(os.getenv('ANSWER_CACHE_SEMANTIC_PER_GROUP', 32))  # cached questions per retrieved chunk set
+
+# Set REDIS_URL (and `pip install redis`) to share caches between worker processes
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -143,7 +249,39 @@ SIMPLE_JWT = {
 STATIC_URL = 'static/'
 
 STATICFILES_DIRS = [BASE_DIR/"users" / "static"]  # for development, serve from here
+
+# uploads are hashed while they stream in (Document.content_hash, used to skip duplicate ingestion)
+FILE_UPLOAD_HANDLERS = [
+    'backend.upload_handlers.HashingMemoryFileUploadHandler',
+    'backend.upload_handlers.HashingTemporaryFileUploadHandler',
+]
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Logging: surface service-level timings (model load, warm-up, ...) and each request's
+# stage breakdown (backend.middleware) on the console, tagged with the request id
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'backend.middleware.RequestIdLogFilter'},
+    },
+    'formatters': {
+        'request': {'format': '%(levelname)s %(name)s [%(request_id)s] %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'filters': ['request_id'], 'formatter': 'request'},
+    },
+    'loggers': {
+        'backend': {
+            'handlers': ['console'],
+            'level': os.getenv('BACKEND_LOG_LEVEL', 'INFO'),
+        },
+        'users': {
+            'handlers': ['console'],
+            'level': os.getenv('BACKEND_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
@@ -0,0 +1,373 @@
+"""
+Stage-level microbenchmarks for the RAG pipeline. Each stage is timed on its
+own against synthetic data; nothing needs Postgres, a Qdrant server or an
+API key (Qdrant runs in qdrant_client's in-memory mode, the LLM is the fake
+completion server). Run through `python manage.py benchmark_pipeline`.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List
+from django.conf import settings
+from django.test import override_settings
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, FieldCondition, Filter, MatchValue, PointStruct, SearchRequest, VectorParams
+from . import synthetic
+
+STAGES = [
+    "pdf_extraction",
+    "chunking",
+    "embedding",
+    "qdrant",
+    "payload_modes",
+    "rerank",
+    "context_assembly",
+    "llm",
+]
+
+
+def _summary(name: str, durations: List[float], items: int = 1, **extra) -> Dict:
+    """
+    `durations` are seconds per repetition; each repetition handled `items` items.
+    """
+    ordered = sorted(durations)
+    mean = statistics.fmean(ordered)
+    return {
+        "name": name,
+        "repeat": len(ordered),
+        "items": items,
+        "mean_ms": mean * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "items_per_s": items / mean if mean else None,
+        **extra,
+    }
+
+
+def _time(fn: Callable, repeat: int) -> List[float]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class Corpus:
+    """
+    Synthetic pages, chunks and queries shared by all stages.
+    """
+
+    def __init__(self, pages: int, words_per_page: int, queries: int):
+        self.pages = synthetic.make_pages(pages, words_per_page)
+        self.queries = synthetic.make_queries(queries)
+        self._chunks = None
+        self._vectors = None
+
+    @property
+    def chunks(self) -> List[str]:
+        if self._chunks is None:
+            from backend.services.chunking import iter_chunks
+            self._chunks = list(iter_chunks(self.pages))
+        return self._chunks
+
+    @property
+    def vectors(self) -> List[List[float]]:
+        if self._vectors is None:
+            from backend.services.embedding_service import embed_texts
+            self._vectors = embed_texts(self.chunks)
+        return self._vectors
+
+    def results(self, top_k: int = 5) -> List[Dict]:
+        return [
+            {"chunk_id": str(uuid.uuid4()), "document_id": "doc", "chunk_index": i, "text": text}
+            for i, text in enumerate(self.chunks[:top_k])
+        ]
+
+
+# -------------------------
+# Stages
+# -------------------------
+def bench_pdf_extraction(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services.pdf_service import get_extraction_pool, iter_pdf_pages, iter_pdf_pages_parallel
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(synthetic.make_pdf(corpus.pages))
+        path = f.name
+    try:
+        results = [_summary(
+            "pdf_extraction.sequential", _time(lambda: list(iter_pdf_pages(path)), repeat), len(corpus.pages)
+        )]
+        if get_extraction_pool() is not None:
+            list(iter_pdf_pages_parallel(path))  # start the pool processes outside the timing
+            results.append(_summary(
+                "pdf_extraction.process_pool",
+                _time(lambda: list(iter_pdf_pages_parallel(path)), repeat),
+                len(corpus.pages),
+                workers=settings.PDF_EXTRACT_WORKERS,
+            ))
+        return results
+    finally:
+        os.unlink(path)
+
+
+def bench_chunking(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services.chunking import CHUNKERS, iter_chunks
+    results = []
+    for name in sorted(CHUNKERS):
+        chunks = list(iter_chunks(corpus.pages, name))  # also loads the tokenizer outside the timing
+        results.append(_summary(
+            f"chunking.{name}",
+            _time(lambda: list(iter_chunks(corpus.pages, name)), repeat),
+            len(corpus.pages),
+            chunks=len(chunks),
+        ))
+    return results
+
+
+def bench_embedding(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services.embedding_service import embed_text, embed_texts, get_model
+    load_start = time.perf_counter()
+    get_model()
+    load = time.perf_counter() - load_start
+    sample = corpus.chunks[:settings.EMBEDDING_BATCH_SIZE]
+    return [
+        _summary("embedding.model_load", [load], 1),
+        _summary("embedding.single", _time(lambda: [embed_text(t) for t in sample], repeat), len(sample)),
+        _summary(
+            "embedding.batched", _time(lambda: embed_texts(sample), repeat), len(sample),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+        ),
+    ]
+
+
+def _in_memory_collection(dimension: int) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name="bench",
+        vectors_config=VectorParams(size=dimension, distance=Distance.COSINE),
+    )
+    return client
+
+
+def bench_qdrant(corpus: Corpus, repeat: int) -> List[Dict]:
+    vectors = corpus.vectors
+    query_vectors = vectors[:len(corpus.queries)] or vectors[:1]
+    batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
+
+    def points(user_id=1):
+        return [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={"document_id": "doc", "chunk_index": i, "text": text, "user_id": user_id},
+            )
+            for i, (text, vector) in enumerate(zip(corpus.chunks, vectors))
+        ]
+
+    def upsert():
+        client = _in_memory_collection(len(vectors[0]))
+        batch = points()
+        for start in range(0, len(batch), batch_size):
+            client.upsert(collection_name="bench", points=batch[start:start + batch_size])
+
+    client = _in_memory_collection(len(vectors[0]))
+    client.upsert(collection_name="bench", points=points())
+    user_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=1))])
+
+    def search():
+        for vector in query_vectors:
+            client.search(collection_name="bench", query_vector=vector, query_filter=user_filter, limit=5)
+
+    def search_batch():
+        client.search_batch(collection_name="bench", requests=[
+            SearchRequest(vector=vector, filter=user_filter, limit=5, with_payload=True) for vector in query_vectors
+        ])
+
+    return [
+        _summary("qdrant.upsert", _time(upsert, repeat), len(vectors), batch_size=batch_size),
+        _summary("qdrant.search", _time(search, repeat), len(query_vectors), points=len(vectors)),
+        _summary("qdrant.search_batch", _time(search_batch, repeat), len(query_vectors), points=len(vectors)),
+    ]
+
+
+def _chunk_table(chunks: List[str]):
+    """
+    In-memory SQLite stand-in for the DocumentChunk rows lean results are
+    hydrated from (Postgres isn't needed for the benchmark). Returns
+    (connection, chunk ids).
+    """
+    import sqlite3
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE chunk (id TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    db.executemany("INSERT INTO chunk VALUES (?, ?)", zip(ids, chunks))
+    return db, ids
+
+
+def bench_payload_modes(corpus: Corpus, repeat: int) -> List[Dict]:
+    """
+    Full payloads (text copied into Qdrant) vs lean payloads (ids and filter
+    fields only). Lean searches are timed together with their hydration:
+    one IN query for the hit texts, the equivalent of hydrate_texts' in_bulk,
+    against an in-memory SQLite table. Hydration is also reported on its own.
+    """
+    vectors = corpus.vectors
+    query_vectors = vectors[:len(corpus.queries)] or vectors[:1]
+    user_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=1))])
+    db, ids = _chunk_table(corpus.chunks)
+
+    def hydrate(hits):
+        placeholders = ",".join("?" * len(hits))
+        return dict(db.execute(
+            f"SELECT id, text FROM chunk WHERE id IN ({placeholders})", [str(hit.id) for hit in hits]
+        ))
+
+    results = []
+    for mode in ("full", "lean"):
+        client = _in_memory_collection(len(vectors[0]))
+        points = []
+        for i, (chunk_id, text, vector) in enumerate(zip(ids, corpus.chunks, vectors)):
+            payload = {"document_id": "doc", "chunk_index": i, "user_id": 1}
+            if mode == "full":
+                payload["text"] = text
+            points.append(PointStruct(id=chunk_id, vector=vector, payload=payload))
+        client.upsert(collection_name="bench", points=points)
+        payload_bytes = sum(len(json.dumps(point.payload)) for point in points)
+
+        def search(client=client, mode=mode):
+            for vector in query_vectors:
+                hits = client.search(collection_name="bench", query_vector=vector, query_filter=user_filter, limit=5)
+                if mode == "lean":
+                    hydrate(hits)
+
+        hits = client.search(collection_name="bench", query_vector=query_vectors[0], query_filter=user_filter, limit=5)
+        results.append(_summary(
+            f"payload_modes.{mode}.search", _time(search, repeat), len(query_vectors),
+            payload_bytes=payload_bytes,
+            response_payload_bytes=sum(len(json.dumps(hit.payload)) for hit in hits),
+            includes_hydration=mode == "lean",
+        ))
+        if mode == "lean":
+            results.append(_summary(
+                "payload_modes.lean.hydrate", _time(lambda: [hydrate(hits) for _ in query_vectors], repeat),
+                len(query_vectors),
+            ))
+    db.close()
+    return results
+
+
+def bench_rerank(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services.rerank_service import get_model, rerank
+    get_model()
+    candidates = corpus.chunks[:settings.RERANK_CANDIDATES]
+
+    def run():
+        results = [{"chunk_id": i, "text": text} for i, text in enumerate(candidates)]
+        rerank(corpus.queries[0], results, top_k=settings.RERANK_TOP_K, budget_ms=0)
+
+    run()
+    return [_summary("rerank.cross_encoder", _time(run, repeat), len(candidates), top_k=settings.RERANK_TOP_K)]
+
+
+def assemble_context(results: List[Dict]) -> str:
+    from backend.services.context_service import build_context
+    return build_context(results)
+
+
+def bench_context_assembly(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services.context_service import count_tokens
+    results = corpus.results()
+    context = assemble_context(results)
+    return [_summary(
+        "context_assembly", _time(lambda: assemble_context(results), max(repeat, 100)), 1,
+        context_chars=len(context),
+        context_tokens=count_tokens(context),
+        joined_tokens=count_tokens("\n".join(result["text"] for result in results)),
+    )]
+
+
+def _first_token(stream) -> str:
+    try:
+        return next(stream)
+    finally:
+        stream.close()  # cancel the rest of the completion
+
+
+def bench_llm(corpus: Corpus, repeat: int) -> List[Dict]:
+    from backend.services import rag_service
+    from .fake_llm import start_in_thread
+    server = start_in_thread(port=0)
+    context = assemble_context(corpus.results())
+    try:
+        with override_settings(OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_port}/v1", OPENAI_API_KEY="fake"):
+            rag_service._client = None  # build a client for the fake server
+            rag_service.generate_answer("warm up", context)
+            return [
+                _summary(
+                    "llm.generate_answer",
+                    _time(lambda: rag_service.generate_answer(corpus.queries[0], context), repeat), 1,
+                ),
+                _summary(
+                    "llm.stream_first_token",
+                    _time(lambda: _first_token(rag_service.stream_answer(corpus.queries[0], context)), repeat), 1,
+                ),
+            ]
+    finally:
+        rag_service._client = None
+        server.shutdown()
+        server.server_close()
+
+
+BENCHMARKS = {
+    "pdf_extraction": bench_pdf_extraction,
+    "chunking": bench_chunking,
+    "embedding": bench_embedding,
+    "qdrant": bench_qdrant,
+    "payload_modes": bench_payload_modes,
+    "rerank": bench_rerank,
+    "context_assembly": bench_context_assembly,
+    "llm": bench_llm,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(stages: List[str], pages: int, words_per_page: int, queries: int, repeat: int) -> Dict:
+    """
+    Runs the selected stages and returns a JSON-serialisable report.
+    """
+    corpus = Corpus(pages, words_per_page, queries)
+    results = []
+    for stage in stages:
+        results.extend(BENCHMARKS[stage](corpus, repeat))
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "pages": pages,
+            "words_per_page": words_per_page,
+            "queries": queries,
+            "repeat": repeat,
+            "chunker": settings.CHUNKER,
+            "embedding_model": settings.EMBEDDING_MODEL_NAME,
+        },
+        "results": results,
+    }
@@ -0,0 +1,126 @@
+"""
+A tiny OpenAI-compatible completion server for local testing and benchmarks.
+
+Serves POST /v1/chat/completions (streaming and non-streaming) with a canned
+answer, so the chat endpoints can be exercised without an API key and with
+predictable latency. Run it with `python manage.py fake_llm_server`.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "This is a canned answer from the fake completion server. "
+    "It is returned for every question so that latency can be measured without a real model."
+)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    # set by make_server()
+    answer = DEFAULT_ANSWER
+    first_token_delay = 0.0  # seconds before the first token
+    token_delay = 0.0  # seconds between streamed tokens
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "fake-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        time.sleep(self.first_token_delay)
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def _chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        tokens = [word + " " for word in self.answer.split(" ")]
+        try:
+            self._write_event(_chunk({"role": "assistant", "content": ""}))
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.token_delay)
+                self._write_event(_chunk({"content": token}))
+            self._write_event(_chunk({}, "stop"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled the stream
+
+    def _write_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class _FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 drops bursts from async clients
+
+
+def make_server(host="127.0.0.1", port=8089, answer=None, first_token_delay=0.0, token_delay=0.0):
+    """
+    Builds a threaded fake completion server; call serve_forever() or use start_in_thread().
+    """
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {
+        "answer": answer or DEFAULT_ANSWER,
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+    })
+    server = _FakeLLMServer((host, port), handler)
+    return server
+
+
+def start_in_thread(**kwargs):
+    """
+    Starts a fake server in a daemon thread and returns it; its base URL is
+    f"http://{host}:{server.server_port}/v1". Pass port=0 for a free port.
+    """
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,84 @@
+"""
+Stand-ins for the embedding model and the Qdrant server, so service tests
+run without sentence-transformers, a model download or a Qdrant container.
+"""
+
+import hashlib
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+import numpy as np
+from django.conf import settings
+from django.test import override_settings
+from qdrant_client import QdrantClient
+
+# modules that bind the process-wide client at import time
+QDRANT_CLIENT_MODULES = [
+    "backend.services.qdrant_service",
+    "backend.services.document_service",
+    "backend.services.tenant_service",
+    "backend.services.reindex_service",
+    "documents.management.commands.provision_qdrant",
+    "documents.management.commands.strip_qdrant_payload_text",
+]
+
+
+class FakeEmbeddingModel:
+    """
+    Deterministic SentenceTransformer look-alike: each text maps to a vector
+    derived from its sha256 (and the model name, so two models disagree).
+    """
+
+    def __init__(self, name: str, dimension: int):
+        self.name = name
+        self.dimension = dimension
+        self.encoded = []  # texts passed to encode, per call
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _vector(self, text: str) -> np.ndarray:
+        digest = hashlib.sha256(f"{self.name}:{text}".encode("utf-8")).digest()
+        return np.frombuffer(digest * (self.dimension // 32 + 1), dtype=np.uint8)[:self.dimension] / 255.0 + 0.01
+
+    def encode(self, texts, batch_size: int = None, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.encoded.append(texts)
+        vectors = np.array([self._vector(text) for text in texts])
+        return vectors[0] if single else vectors
+
+
+@contextmanager
+def fake_embeddings(dimension: int = 8):
+    """
+    Serves every embedding model from FakeEmbeddingModel and sets
+    EMBEDDING_DIMENSION to match. Yields {model name: model}.
+    """
+    models = {}
+
+    def get_model(model_name=None):
+        model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        if model_name not in models:
+            models[model_name] = FakeEmbeddingModel(model_name, dimension)
+        return models[model_name]
+
+    with mock.patch("backend.services.embedding_service.get_model", get_model), \
+            override_settings(EMBEDDING_DIMENSION=dimension):
+        yield models
+
+
+@contextmanager
+def memory_qdrant():
+    """
+    Swaps the process-wide Qdrant client for an empty in-memory instance,
+    with empty placement and serving-model caches. Yields the client.
+    """
+    client = QdrantClient(location=":memory:")
+    with ExitStack() as stack:
+        for module in QDRANT_CLIENT_MODULES:
+            stack.enter_context(mock.patch(f"{module}.qdrant_client", client))
+        stack.enter_context(override_settings(QDRANT_LOCATION=":memory:"))
+        stack.enter_context(mock.patch("backend.services.tenant_service._placements", None))
+        stack.enter_context(mock.patch("backend.services.reindex_service._active_models", None))
+        yield client
+    client.close()
@@ -0,0 +1,208 @@
+"""
+Concurrent HTTP load generator for the chat and upload endpoints.
+
+Mints JWTs for synthetic users, seeds each with a synthetic PDF, then fires
+a mix of questions (/user/chat/) and uploads (/api/upload/) at each
+concurrency level and reports latency percentiles, errors and the per-stage
+breakdown the server returns in its Server-Timing header. Run it through
+`python manage.py loadtest`.
+"""
+
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from typing import Dict, List
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+import httpx
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+from . import synthetic
+
+
+# -------------------------
+# 1️⃣ Local stack
+# -------------------------
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_local_stack(port: int = 0):
+    """
+    Serves the Django app from this process with a threaded WSGI server,
+    the fake completion server and an in-process ingestion worker. Meant
+    for QDRANT_LOCATION=':memory:', where only this process can see the
+    vectors. Returns (base_url, stop) where stop() shuts everything down.
+    """
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from backend.services import rag_service
+    from backend.services.embedding_service import warm_up
+    from backend.services.job_service import drain_queue
+    from backend.services.qdrant_service import init_qdrant
+    from .fake_llm import start_in_thread
+
+    llm = start_in_thread(port=0)
+    settings.OPENAI_BASE_URL = f"http://127.0.0.1:{llm.server_port}/v1"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "fake"
+    rag_service._client = None
+
+    if settings.QDRANT_LOCATION == ":memory:":
+        init_qdrant()
+    warm_up()
+
+    stop_worker = threading.Event()
+    worker = threading.Thread(
+        target=drain_queue, kwargs={"stop": stop_worker, "poll_interval": 0.2}, daemon=True
+    )
+    worker.start()
+
+    server = make_server("127.0.0.1", port, get_wsgi_application(), _ThreadingWSGIServer, _QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        stop_worker.set()
+        llm.shutdown()
+
+    return f"http://127.0.0.1:{server.server_port}", stop
+
+
+# -------------------------
+# 2️⃣ Users and corpora
+# -------------------------
+def mint_users(count: int, prefix: str = "loadtest") -> List[str]:
+    """
+    Creates (or reuses) `count` synthetic users and returns an access token for each.
+    """
+    tokens = []
+    for i in range(count):
+        user, created = User.objects.get_or_create(username=f"{prefix}-{i}")
+        if created:
+            user.set_unusable_password()
+            user.save()
+        tokens.append(str(RefreshToken.for_user(user).access_token))
+    return tokens
+
+
+def _upload(client: httpx.Client, token: str, pdf: bytes, title: str) -> httpx.Response:
+    return client.post(
+        "/api/upload/",
+        headers={"Authorization": f"Bearer {token}"},
+        data={"title": title},
+        files={"file": (f"{title}.pdf", pdf, "application/pdf")},
+    )
+
+
+def seed_corpora(client: httpx.Client, tokens: List[str], pages: int, timeout: float = 600) -> None:
+    """
+    Uploads one synthetic PDF per user and waits for the ingestion jobs to finish.
+    """
+    jobs = []
+    for i, token in enumerate(tokens):
+        response = _upload(client, token, synthetic.make_pdf(synthetic.make_pages(pages, seed=i)), f"seed-{i}")
+        response.raise_for_status()
+        jobs.append((token, response.json()["job"]["id"]))
+
+    deadline = time.monotonic() + timeout
+    for token, job_id in jobs:
+        while True:
+            status = client.get(f"/api/jobs/{job_id}/", headers={"Authorization": f"Bearer {token}"}).json()
+            if status["status"] == "done":
+                break
+            if status["status"] == "failed":
+                raise RuntimeError(f"Seeding job {job_id} failed: {status['error']}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Seeding job {job_id} did not finish in {timeout}s")
+            time.sleep(0.5)
+
+
+# -------------------------
+# 3️⃣ Traffic
+# -------------------------
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    stages = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, params = part.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(value)
+    return stages
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_level(client: httpx.Client, tokens: List[str], concurrency: int, requests: int,
+              upload_ratio: float, upload_pages: int, seed: int = 0) -> Dict:
+    """
+    Sends `requests` requests with `concurrency` in flight and summarises them.
+    """
+    rng = random.Random(seed)
+    queries = synthetic.make_queries(64, seed=seed)
+    upload_pages_text = synthetic.make_pages(upload_pages, seed=seed)
+    plan = [
+        ("upload" if rng.random() < upload_ratio else "question", rng.choice(tokens), rng.choice(queries))
+        for _ in range(requests)
+    ]
+    # a unique first page per upload: identical files would be short-circuited as duplicates;
+    # built up front so PDF generation isn't timed
+    upload_pdfs = {
+        i: synthetic.make_pdf([f"Load test upload {uuid.uuid4()}", *upload_pages_text])
+        for i, (kind, _, _) in enumerate(plan) if kind == "upload"
+    }
+
+    def send(indexed_item):
+        i, (kind, token, query) = indexed_item
+        start = time.perf_counter()
+        try:
+            if kind == "upload":
+                response = _upload(client, token, upload_pdfs[i], "loadtest-upload")
+            else:
+                response = client.post(
+                    "/user/chat/", headers={"Authorization": f"Bearer {token}"}, data={"message": query}
+                )
+            ok = response.status_code < 400
+            stages = _parse_server_timing(response.headers.get("server-timing"))
+        except httpx.HTTPError:
+            ok, stages = False, {}
+        return kind, time.perf_counter() - start, ok, stages
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(send, enumerate(plan)))
+    elapsed = time.perf_counter() - started
+
+    report = {"concurrency": concurrency, "requests": requests, "duration_s": elapsed,
+              "throughput_rps": requests / elapsed if elapsed else 0.0, "kinds": {}}
+    for kind in ("question", "upload"):
+        rows = [o for o in outcomes if o[0] == kind]
+        if not rows:
+            continue
+        latencies = [o[1] * 1000 for o in rows if o[2]]
+        stage_names = sorted({name for o in rows for name in o[3]})
+        report["kinds"][kind] = {
+            "count": len(rows),
+            "errors": sum(1 for o in rows if not o[2]),
+            "p50_ms": _percentile(latencies, 50),
+            "p90_ms": _percentile(latencies, 90),
+            "p99_ms": _percentile(latencies, 99),
+            "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+            "stages_mean_ms": {
+                name: statistics.fmean([o[3][name] for o in rows if name in o[3]]) for name in stage_names
+            },
+        }
+    return report
@@ -0,0 +1,105 @@
+"""
+Deterministic synthetic corpora and PDFs for benchmarks and load tests.
+"""
+
+import random
+from typing import List
+
+_WORDS = (
+    "system document user query vector index search answer model context chunk "
+    "embedding retrieval latency throughput server client request response cache "
+    "database table column record field value error warning config setting option "
+    "network storage memory disk process thread worker queue job batch stream "
+    "policy contract invoice payment customer order product service support manual"
+).split()
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+    if rng.random() < 0.1:
+        # identifiers and error codes, which pure vector search tends to miss
+        words.insert(rng.randrange(len(words)), f"ERR-{rng.randint(1000, 9999)}")
+    return " ".join(words).capitalize() + "."
+
+
+def make_pages(pages: int, words_per_page: int = 400, seed: int = 0) -> List[str]:
+    """
+    Returns `pages` page texts of roughly `words_per_page` words each,
+    made of sentences grouped into paragraphs.
+    """
+    rng = random.Random(seed)
+    result = []
+    for _ in range(pages):
+        paragraphs, words = [], 0
+        while words < words_per_page:
+            sentences = [make_sentence(rng) for _ in range(rng.randint(3, 6))]
+            words += sum(len(s.split()) for s in sentences)
+            paragraphs.append(" ".join(sentences))
+        result.append("\n\n".join(paragraphs))
+    return result
+
+
+def make_queries(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) + "?"
+        for _ in range(count)
+    ]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines = []
+    for paragraph in text.split("\n\n"):
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        lines.append("")
+    return lines
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """
+    Builds a minimal text PDF (Helvetica, one page per entry) that PyPDF2 can extract.
+    """
+    objects = []  # object bodies, numbered from 1
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in below
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for text in pages:
+        lines = "\n".join(f"({_pdf_escape(line)}) '" for line in _wrap(text))
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td\n{lines}\nET".encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
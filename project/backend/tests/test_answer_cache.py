@@ -0,0 +1,114 @@
+import threading
+from unittest import mock
+from django.core.cache import cache as shared_cache
+from django.test import SimpleTestCase, override_settings
+from backend.services import answer_cache
+
+RESULTS = [{"chunk_id": "c1"}, {"chunk_id": "c2"}]
+
+# query -> embedding; the two refund phrasings are close, the shipping one is not
+VECTORS = {
+    "how long is the refund window": [1.0, 0.0, 0.1],
+    "how many days do i have to return it": [1.0, 0.05, 0.12],
+    "what does shipping cost": [0.0, 1.0, 0.0],
+}
+
+
+@override_settings(ANSWER_CACHE_ENABLED=True, ANSWER_CACHE_SEMANTIC_THRESHOLD=0.95)
+class AnswerCacheTests(SimpleTestCase):
+    def setUp(self):
+        for name in ("_exact", "_semantic"):
+            self.enterContext(mock.patch.object(answer_cache, name, None))
+        self.enterContext(mock.patch.object(
+            answer_cache, "embed_query", lambda query: VECTORS[answer_cache.normalize_query(query)]
+        ))
+        shared_cache.clear()
+
+    def test_exact_hit_ignores_case_and_punctuation(self):
+        answer_cache.store(1, "How long is the refund window?", RESULTS, "Thirty days.")
+
+        self.assertEqual(answer_cache.lookup(1, "how long is the REFUND window", RESULTS), "Thirty days.")
+
+    def test_semantic_hit_needs_the_same_chunks_and_a_close_question(self):
+        answer_cache.store(1, "How long is the refund window?", RESULTS, "Thirty days.")
+
+        self.assertEqual(answer_cache.lookup(1, "How many days do I have to return it?", RESULTS), "Thirty days.")
+        self.assertIsNone(answer_cache.lookup(1, "What does shipping cost?", RESULTS))
+        self.assertIsNone(answer_cache.lookup(1, "How many days do I have to return it?", RESULTS[:1]))
+
+    def test_answers_are_per_user_and_dropped_on_invalidation(self):
+        answer_cache.store(1, "How long is the refund window?", RESULTS, "Thirty days.")
+
+        self.assertIsNone(answer_cache.lookup(2, "How long is the refund window?", RESULTS))
+        answer_cache.invalidate_user(1)
+        self.assertIsNone(answer_cache.lookup(1, "How long is the refund window?", RESULTS))
+
+    @override_settings(ANSWER_CACHE_ENABLED=False)
+    def test_disabled_cache_always_generates(self):
+        generate = mock.Mock(return_value="Thirty days.")
+
+        answer_cache.get_or_generate(1, "How long is the refund window?", RESULTS, generate)
+        answer_cache.get_or_generate(1, "How long is the refund window?", RESULTS, generate)
+
+        self.assertEqual(generate.call_count, 2)
+
+    def test_identical_concurrent_questions_share_one_generation(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "Thirty days."
+
+        answers = []
+        leader = threading.Thread(target=lambda: answers.append(
+            answer_cache.get_or_generate(1, "How long is the refund window?", RESULTS, generate)
+        ))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        coalesced = answer_cache.stats()["coalesced"]
+        follower = threading.Thread(target=lambda: answers.append(
+            answer_cache.get_or_generate(1, "how long is the refund window", RESULTS, generate)
+        ))
+        follower.start()
+        while answer_cache.stats()["coalesced"] == coalesced and follower.is_alive():
+            follower.join(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(answers, ["Thirty days.", "Thirty days."])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(answer_cache.stats()["coalesced"], coalesced + 1)
+
+    def test_followers_get_the_leaders_error(self):
+        started, release = threading.Event(), threading.Event()
+
+        def generate():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("upstream down")
+
+        errors = []
+
+        def ask():
+            try:
+                answer_cache.get_or_generate(1, "How long is the refund window?", RESULTS, generate)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=ask)
+        leader.start()
+        self.assertTrue(started.wait(5))
+        coalesced = answer_cache.stats()["coalesced"]
+        follower = threading.Thread(target=ask)
+        follower.start()
+        while answer_cache.stats()["coalesced"] == coalesced and follower.is_alive():
+            follower.join(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, ["upstream down", "upstream down"])
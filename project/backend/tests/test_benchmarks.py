@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from backend.testing.fakes import fake_embeddings
+
+
+@override_settings(CHUNKER="words", CHUNK_SIZE_WORDS=40, PDF_EXTRACT_WORKERS=0)
+class BenchmarkPipelineCommandTests(SimpleTestCase):
+    def test_writes_a_report_for_the_selected_stages(self):
+        with tempfile.TemporaryDirectory() as directory, fake_embeddings():
+            output = os.path.join(directory, "bench.json")
+            stdout = StringIO()
+            call_command(
+                "benchmark_pipeline", stages="pdf_extraction,qdrant,payload_modes,context_assembly,llm",
+                pages=3, words_per_page=80, queries=2, repeat=1, output=output, stdout=stdout,
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        names = [result["name"] for result in report["results"]]
+        self.assertEqual(names, [
+            "pdf_extraction.sequential",
+            "qdrant.upsert", "qdrant.search", "qdrant.search_batch",
+            "payload_modes.full.search", "payload_modes.lean.search", "payload_modes.lean.hydrate",
+            "context_assembly",
+            "llm.generate_answer", "llm.stream_first_token",
+        ])
+        self.assertEqual(report["config"]["pages"], 3)
+        self.assertTrue(all(result["mean_ms"] >= 0 for result in report["results"]))
+        full, lean = (report["results"][names.index(f"payload_modes.{mode}.search")] for mode in ("full", "lean"))
+        self.assertTrue(lean["includes_hydration"])
+        self.assertLess(lean["response_payload_bytes"], full["response_payload_bytes"])
+        self.assertIn("qdrant.search_batch", stdout.getvalue())
+
+    def test_unknown_stage(self):
+        with self.assertRaisesMessage(CommandError, "Unknown stage(s): gpu"):
+            call_command("benchmark_pipeline", stages="chunking,gpu", stdout=StringIO())
@@ -0,0 +1,35 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from backend.services.cache_service import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_the_least_recently_used_entry(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_zero_size_stores_nothing(self):
+        cache = LRUCache(maxsize=0)
+        cache.set("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+
+    @mock.patch("backend.services.cache_service.time.monotonic")
+    def test_entries_expire_after_ttl(self, monotonic):
+        cache = LRUCache(maxsize=2, ttl=10)
+        monotonic.return_value = 100.0
+        cache.set("a", 1)
+
+        monotonic.return_value = 109.0
+        self.assertEqual(cache.get("a"), 1)
+        monotonic.return_value = 110.0
+        self.assertEqual(cache.get("a", "gone"), "gone")
+        self.assertEqual(len(cache), 0)
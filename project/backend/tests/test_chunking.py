@@ -0,0 +1,56 @@
+import re
+from django.test import SimpleTestCase, override_settings
+from backend.services.chunking import TokenChunker, iter_chunks
+
+
+def word_tokenizer(text, add_special_tokens=False, return_offsets_mapping=False):
+    """A Hugging Face-style tokenizer with one token per word."""
+    if isinstance(text, list):
+        return {"input_ids": [word_tokenizer(t)["input_ids"] for t in text]}
+    words = list(re.finditer(r"\S+", text))
+    encoded = {"input_ids": list(range(len(words)))}
+    if return_offsets_mapping:
+        encoded["offset_mapping"] = [(m.start(), m.end()) for m in words]
+    return encoded
+
+
+class TokenChunkerTests(SimpleTestCase):
+    def test_packs_whole_sentences_up_to_the_limit(self):
+        chunker = TokenChunker(word_tokenizer, max_tokens=6)
+
+        chunks = list(chunker(["One two three. Four five six. Seven eight."]))
+
+        self.assertEqual(chunks, ["One two three. Four five six.", "Seven eight."])
+
+    def test_repeats_trailing_sentences_as_overlap(self):
+        chunker = TokenChunker(word_tokenizer, max_tokens=6, overlap_tokens=2)
+
+        chunks = list(chunker(["A b c. D e. F g h."]))
+
+        self.assertEqual(chunks, ["A b c. D e.", "D e. F g h."])
+
+    def test_cuts_long_sentences_at_token_boundaries(self):
+        chunker = TokenChunker(word_tokenizer, max_tokens=4, overlap_tokens=1)
+
+        chunks = list(chunker(["w1 w2 w3 w4 w5 w6 w7."]))
+
+        self.assertEqual(chunks, ["w1 w2 w3 w4", "w4 w5 w6 w7."])
+
+    def test_joins_a_sentence_split_across_pages(self):
+        chunker = TokenChunker(word_tokenizer, max_tokens=10)
+
+        chunks = list(chunker(["First sentence. The second one", "continues here."]))
+
+        self.assertEqual(chunks, ["First sentence. The second one continues here."])
+
+
+class IterChunksTests(SimpleTestCase):
+    @override_settings(CHUNK_SIZE_WORDS=3)
+    def test_word_chunker_carries_words_across_pages(self):
+        chunks = list(iter_chunks(["a b", "c d e", "f g"], chunker="words"))
+
+        self.assertEqual(chunks, ["a b c", "d e f", "g"])
+
+    def test_unknown_chunker(self):
+        with self.assertRaisesMessage(ValueError, "Unknown chunker 'nope'"):
+            iter_chunks(["text"], chunker="nope")
@@ -0,0 +1,86 @@
+import sys
+from unittest import mock
+from django.test import SimpleTestCase
+from backend.services import context_service
+from backend.services.context_service import build_context, count_tokens
+
+# sentences the chunker would repeat at the start of the next chunk
+OVERLAP = "Refunds are issued to the original payment method."
+
+
+def hit(document_id, chunk_index, text, vector_score=0.9, **extra):
+    return {"document_id": document_id, "chunk_index": chunk_index, "text": text,
+            "vector_score": vector_score, **extra}
+
+
+@mock.patch.object(context_service, "_counter", lambda text: len(text.split()))
+class BuildContextTests(SimpleTestCase):
+    def test_merges_adjacent_chunks_without_their_overlap(self):
+        context = build_context([
+            hit("a", 1, f"{OVERLAP} They arrive within five days."),
+            hit("a", 0, f"Returns are accepted for thirty days. {OVERLAP}"),
+        ], max_tokens=0, min_score=0)
+
+        self.assertEqual(
+            context, f"Returns are accepted for thirty days. {OVERLAP} They arrive within five days."
+        )
+
+    def test_keeps_non_adjacent_chunks_apart(self):
+        context = build_context([
+            hit("a", 0, "First section of the handbook."),
+            hit("a", 2, "Third section of the handbook."),
+        ], max_tokens=0, min_score=0)
+
+        self.assertEqual(context, "First section of the handbook.\n\nThird section of the handbook.")
+
+    def test_skips_duplicate_passages_across_documents(self):
+        context = build_context([
+            hit("a", 0, "Shipping is free over fifty euros."),
+            hit("b", 4, "Shipping  is free over fifty euros."),
+        ], max_tokens=0, min_score=0)
+
+        self.assertEqual(context, "Shipping is free over fifty euros.")
+
+    def test_drops_low_scores_unless_they_matched_lexically(self):
+        context = build_context([
+            hit("a", 0, "Relevant passage.", vector_score=0.8),
+            hit("b", 0, "Weak passage.", vector_score=0.1),
+            hit("c", 0, "Keyword passage.", vector_score=0.1, lexical_score=0.3),
+        ], max_tokens=0, min_score=0.5)
+
+        self.assertEqual(context, "Relevant passage.\n\nKeyword passage.")
+
+    def test_nothing_relevant_gives_empty_context(self):
+        self.assertEqual(build_context([hit("a", 0, "Weak.", vector_score=0.1)], min_score=0.5), "")
+
+    def test_keeps_best_ranked_blocks_within_budget(self):
+        best = " ".join(["best"] * 40)
+        second = " ".join(["second"] * 40)
+        context = build_context([hit("a", 0, best), hit("b", 0, second), hit("c", 0, "third")],
+                                max_tokens=50, min_score=0)
+
+        # the second block no longer fits and a 10-token remainder is too short to cut it to
+        self.assertEqual(context, best)
+
+    def test_cuts_the_last_block_to_fit(self):
+        best = " ".join(["best"] * 20)
+        second = " ".join(["second"] * 80)
+        context = build_context([hit("a", 0, best), hit("b", 0, second)], max_tokens=70, min_score=0)
+
+        first, cut = context.split("\n\n")
+        self.assertEqual(first, best)
+        self.assertTrue(second.startswith(cut))
+        self.assertLessEqual(len(context.split()), 70)
+
+
+@mock.patch.object(context_service, "_counter", None)
+class CountTokensTests(SimpleTestCase):
+    def test_estimate_without_tiktoken_overcounts(self):
+        with mock.patch.dict(sys.modules, {"tiktoken": None}):
+            # 40 characters: ~10 tokens of English, counted as 14
+            self.assertEqual(count_tokens("Refunds go to the original card, always."), 14)
+
+    def test_estimate_when_the_encoding_cannot_be_loaded(self):
+        tiktoken = mock.Mock(**{"encoding_for_model.side_effect": OSError("offline")})
+        with mock.patch.dict(sys.modules, {"tiktoken": tiktoken}), self.assertLogs(context_service.logger, "WARNING"):
+            self.assertEqual(count_tokens("abcdef"), 2)
@@ -0,0 +1,143 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from qdrant_client.models import PointStruct
+from backend.services.document_service import (
+    hydrate_texts, process_document, search_similar_chunks, search_similar_chunks_batch, upsert_points,
+)
+from backend.services.qdrant_service import COLLECTION_NAME, ensure_collection
+from backend.testing.fakes import fake_embeddings, memory_qdrant
+from documents.models import Document, DocumentChunk
+
+# 12 words: three 4-word chunks with CHUNK_SIZE_WORDS=4
+TEXT = "one two three four five six seven eight nine ten eleven twelve"
+
+
+@override_settings(CHUNK_SIZE_WORDS=4, EMBEDDING_BATCH_SIZE=2, QDRANT_UPSERT_PARALLEL=2, QDRANT_LEAN_PAYLOAD=True)
+class ProcessDocumentTests(TestCase):
+    def setUp(self):
+        self.models = self.enterContext(fake_embeddings())
+        self.qdrant = self.enterContext(memory_qdrant())
+        ensure_collection()
+        user = User.objects.create_user(username="alice")
+        self.document = Document.objects.create(title="Doc", uploaded_by=user)
+
+    def test_stores_every_chunk_in_postgres_and_qdrant(self):
+        progress = []
+
+        total = process_document(self.document, TEXT, chunker="words",
+                                 on_progress=lambda done, total: progress.append((done, total)))
+
+        chunks = list(DocumentChunk.objects.filter(document=self.document).order_by("chunk_index"))
+        self.assertEqual(total, 3)
+        self.assertEqual([c.text for c in chunks], [
+            "one two three four", "five six seven eight", "nine ten eleven twelve"
+        ])
+        self.assertTrue(all(c.qdrant_id == str(c.id) for c in chunks))
+        points, _ = self.qdrant.scroll(COLLECTION_NAME, limit=10)
+        self.assertEqual({str(p.id) for p in points}, {str(c.id) for c in chunks})
+        self.assertEqual(points[0].payload["user_id"], self.document.uploaded_by_id)
+        self.assertNotIn("text", points[0].payload)
+        # the total is only known once the chunk stream is exhausted
+        self.assertEqual(progress[-1], (3, 3))
+        self.assertEqual([done for done, _ in progress], [2, 3])
+
+    def test_embeds_in_batches_of_embedding_batch_size(self):
+        process_document(self.document, TEXT, chunker="words")
+
+        (model,) = self.models.values()
+        self.assertEqual([len(texts) for texts in model.encoded], [2, 1])
+
+    def test_pages_are_chunked_as_one_stream(self):
+        total = process_document(self.document, iter(["one two three", "four five six"]), chunker="words")
+
+        self.assertEqual(total, 2)
+        self.assertEqual(DocumentChunk.objects.get(document=self.document, chunk_index=0).text, "one two three four")
+
+
+class UpsertPointsTests(TestCase):
+    def test_sends_fixed_size_batches(self):
+        points = [PointStruct(id=i, vector=[0.1] * 8, payload={}) for i in range(5)]
+        for parallel in (1, 3):
+            with self.subTest(parallel=parallel), memory_qdrant() as qdrant, fake_embeddings():
+                ensure_collection()
+                with mock.patch.object(qdrant, "upsert", wraps=qdrant.upsert) as upsert:
+                    upsert_points(points, COLLECTION_NAME, batch_size=2, parallel=parallel)
+
+                self.assertEqual(sorted(len(call.kwargs["points"]) for call in upsert.call_args_list), [1, 2, 2])
+                self.assertEqual(qdrant.count(COLLECTION_NAME).count, 5)
+
+
+class LeanPayloadTests(TestCase):
+    def setUp(self):
+        self.enterContext(fake_embeddings())
+        self.qdrant = self.enterContext(memory_qdrant())
+        ensure_collection()
+        user = User.objects.create_user(username="alice")
+        self.document = Document.objects.create(title="Doc", uploaded_by=user)
+
+    def _payloads(self):
+        points, _ = self.qdrant.scroll(COLLECTION_NAME, limit=10)
+        return [point.payload for point in points]
+
+    def test_full_payload_keeps_the_text(self):
+        with override_settings(QDRANT_LEAN_PAYLOAD=False):
+            process_document(self.document, "one two three", chunker="words")
+
+        self.assertEqual([payload["text"] for payload in self._payloads()], ["one two three"])
+
+    @override_settings(QDRANT_LEAN_PAYLOAD=True, RETRIEVAL_MODE="vector")
+    def test_search_reads_lean_texts_back_from_postgres(self):
+        process_document(self.document, "one two three", chunker="words")
+
+        results = search_similar_chunks("one two three", self.document.uploaded_by_id, top_k=1)
+
+        self.assertEqual(results[0]["text"], "one two three")
+
+    def test_hydrate_texts_uses_one_query(self):
+        chunks = DocumentChunk.objects.bulk_create(
+            DocumentChunk(document=self.document, text=f"chunk {i}", chunk_index=i) for i in range(3)
+        )
+        results = [{"chunk_id": str(chunk.id), "text": None} for chunk in chunks]
+        results.append({"chunk_id": "kept", "text": "already there"})
+
+        with self.assertNumQueries(1):
+            hydrate_texts(results)
+
+        self.assertEqual([r["text"] for r in results], ["chunk 0", "chunk 1", "chunk 2", "already there"])
+
+    def test_strip_command_removes_stored_texts(self):
+        with override_settings(QDRANT_LEAN_PAYLOAD=False, CHUNK_SIZE_WORDS=4):
+            process_document(self.document, TEXT, chunker="words")
+        out = StringIO()
+
+        call_command("strip_qdrant_payload_text", batch_size=2, stdout=out)
+
+        self.assertTrue(all("text" not in payload for payload in self._payloads()))
+        self.assertIn("Stripped text from 3 point(s)", out.getvalue())
+        self.assertEqual(DocumentChunk.objects.filter(document=self.document).count(), 3)
+
+
+@override_settings(RETRIEVAL_MODE="vector", CHUNK_SIZE_WORDS=4)
+class SearchBatchTests(TestCase):
+    def setUp(self):
+        self.enterContext(fake_embeddings())
+        self.qdrant = self.enterContext(memory_qdrant())
+        ensure_collection()
+        self.user = User.objects.create_user(username="alice")
+        process_document(Document.objects.create(title="Doc", uploaded_by=self.user), TEXT, chunker="words")
+
+    def test_matches_one_search_per_query_in_one_request(self):
+        queries = ["one two three four", "nine ten eleven twelve", "five six"]
+        expected = [search_similar_chunks(query, self.user.id, top_k=2) for query in queries]
+
+        with mock.patch.object(self.qdrant, "search_batch", wraps=self.qdrant.search_batch) as search_batch:
+            rankings = search_similar_chunks_batch(queries, self.user.id, top_k=2)
+
+        self.assertEqual(search_batch.call_count, 1)
+        self.assertEqual(
+            [[(r["chunk_id"], r["text"]) for r in results] for results in rankings],
+            [[(r["chunk_id"], r["text"]) for r in results] for results in expected],
+        )
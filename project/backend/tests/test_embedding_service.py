@@ -0,0 +1,36 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from backend.services.cache_service import LRUCache
+from backend.services.embedding_service import embed_queries, embed_query
+from backend.testing.fakes import fake_embeddings
+
+
+@override_settings(EMBEDDING_MODEL_NAME="fake-model")
+class QueryEmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.models = self.enterContext(fake_embeddings())
+        self.enterContext(mock.patch("backend.services.embedding_service._query_cache", LRUCache(maxsize=16)))
+
+    def test_trivially_different_queries_share_one_embedding(self):
+        first = embed_query("What is the refund window?")
+        second = embed_query("  what is the REFUND window ")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.models["fake-model"].encoded, [["what is the refund window"]])
+
+    def test_entries_are_per_model(self):
+        embed_query("refund window")
+        other = embed_query("refund window", model_name="other-model")
+
+        self.assertNotEqual(other, embed_query("refund window"))
+        self.assertEqual(len(self.models), 2)
+
+
+    def test_batch_embeds_only_distinct_misses(self):
+        embed_query("cached question")
+
+        vectors = embed_queries(["New question", "cached question", "new question?"])
+
+        self.assertEqual(vectors[0], vectors[2])
+        self.assertEqual(vectors[1], embed_query("cached question"))
+        self.assertEqual(self.models["fake-model"].encoded[1:], [["new question"]])
@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from backend.services.job_service import claim_next_job, requeue_stale_jobs, run_job
+from documents.models import Document, IngestionJob
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_document(username="alice", title="Doc"):
+    user, _ = User.objects.get_or_create(username=username)
+    return Document.objects.create(title=title, uploaded_by=user)
+
+
+class ClaimNextJobTests(TestCase):
+    def test_claims_the_oldest_queued_job(self):
+        now = timezone.now()
+        newer = IngestionJob.objects.create(document=make_document(title="newer"))
+        older = IngestionJob.objects.create(document=make_document(title="older"))
+        IngestionJob.objects.filter(pk=newer.pk).update(created_at=now)
+        IngestionJob.objects.filter(pk=older.pk).update(created_at=now - timedelta(minutes=1))
+        IngestionJob.objects.create(document=make_document(title="done"), status=IngestionJob.DONE)
+
+        first, second, third = claim_next_job(), claim_next_job(), claim_next_job()
+
+        self.assertEqual((first.pk, second.pk), (older.pk, newer.pk))
+        self.assertIsNone(third)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (IngestionJob.RUNNING, 1))
+        self.assertIsNotNone(first.started_at)
+
+
+@skipUnless(connection.features.has_select_for_update_skip_locked, "needs SELECT ... FOR UPDATE SKIP LOCKED")
+class ClaimNextJobLockingTests(TransactionTestCase):
+    def test_skips_a_job_another_worker_has_locked(self):
+        locked_job = IngestionJob.objects.create(document=make_document(title="locked"))
+        free_job = IngestionJob.objects.create(document=make_document(title="free"))
+        IngestionJob.objects.filter(pk=locked_job.pk).update(created_at=timezone.now() - timedelta(minutes=1))
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    IngestionJob.objects.select_for_update().get(pk=locked_job.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(5))
+            claimed = claim_next_job()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(claimed.pk, free_job.pk)
+
+
+class RequeueStaleJobsTests(TestCase):
+    def test_requeues_only_running_jobs_without_recent_progress(self):
+        stale = IngestionJob.objects.create(document=make_document(title="stale"), status=IngestionJob.RUNNING)
+        live = IngestionJob.objects.create(document=make_document(title="live"), status=IngestionJob.RUNNING)
+        done = IngestionJob.objects.create(document=make_document(title="done"), status=IngestionJob.DONE)
+        IngestionJob.objects.filter(pk__in=[stale.pk, done.pk]).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+
+        statuses = dict(IngestionJob.objects.values_list("pk", "status"))
+        self.assertEqual(statuses, {
+            stale.pk: IngestionJob.QUEUED, live.pk: IngestionJob.RUNNING, done.pk: IngestionJob.DONE,
+        })
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RunJobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.document = make_document()
+        self.document.file.save("doc.pdf", ContentFile(b"%PDF-1.4"))
+        IngestionJob.objects.create(document=self.document)
+        self.delete_chunks = self.enterContext(mock.patch("backend.services.job_service.delete_document_chunks"))
+        self.enterContext(mock.patch("backend.services.job_service.iter_pdf_pages_parallel"))
+
+    def test_success_records_the_chunk_count(self):
+        job = claim_next_job()
+        with mock.patch("backend.services.job_service.process_document", return_value=12), \
+                mock.patch("backend.services.job_service.invalidate_user") as invalidate_user:
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.chunks_done, job.chunks_total), (IngestionJob.DONE, 12, 12))
+        # a retried job starts from a clean slate
+        self.delete_chunks.assert_called_once_with(self.document)
+        invalidate_user.assert_called_once_with(self.document.uploaded_by_id)
+
+    def test_no_text_fails_the_job(self):
+        job = claim_next_job()
+        with mock.patch("backend.services.job_service.process_document", return_value=0), \
+                self.assertLogs("backend.services.job_service", "ERROR"):
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.FAILED)
+        self.assertIn("Could not extract readable text", job.error)
+
+    def test_failure_keeps_the_progress_already_recorded(self):
+        def fail_halfway(document, pages, on_progress=None):
+            on_progress(64, None)
+            raise RuntimeError("Qdrant went away")
+
+        job = claim_next_job()
+        with mock.patch("backend.services.job_service.process_document", side_effect=fail_halfway), \
+                self.assertLogs("backend.services.job_service", "ERROR"):
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.FAILED)
+        self.assertEqual(job.error, "Qdrant went away")
+        self.assertEqual(job.chunks_done, 64)
+        self.assertIsNotNone(job.finished_at)
@@ -0,0 +1,88 @@
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from backend.services import document_service
+from backend.services.lexical_search import reciprocal_rank_fusion, search_lexical
+from documents.models import Document, DocumentChunk
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def test_hits_in_both_rankings_come_first(self):
+        vector = [{"chunk_id": "a", "vector_score": 0.9}, {"chunk_id": "b", "vector_score": 0.8}]
+        lexical = [{"chunk_id": "b", "lexical_score": 0.5}, {"chunk_id": "c", "lexical_score": 0.4}]
+
+        fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+        self.assertEqual([r["chunk_id"] for r in fused], ["b", "a", "c"])
+        self.assertAlmostEqual(fused[0]["score"], 1 / 62 + 1 / 61)
+        self.assertEqual(fused[0]["vector_score"], 0.8)
+        self.assertEqual(fused[0]["lexical_score"], 0.5)
+
+    def test_limit(self):
+        ranking = [{"chunk_id": str(i)} for i in range(5)]
+
+        fused = reciprocal_rank_fusion([ranking], limit=2)
+
+        self.assertEqual([r["chunk_id"] for r in fused], ["0", "1"])
+
+    def test_incoming_scores_are_replaced(self):
+        fused = reciprocal_rank_fusion([[{"chunk_id": "a", "score": 42.0}]], k=1)
+
+        self.assertEqual(fused[0]["score"], 0.5)
+
+
+def hit(chunk_id, **scores):
+    return {"chunk_id": chunk_id, "document_id": "doc", "chunk_index": 0, "text": f"text {chunk_id}", **scores}
+
+
+class HybridSearchTests(SimpleTestCase):
+    def setUp(self):
+        self.vector = self.enterContext(mock.patch.object(
+            document_service, "_vector_search", return_value=[hit("a", vector_score=0.9), hit("b", vector_score=0.8)]
+        ))
+        self.lexical = self.enterContext(mock.patch.object(
+            document_service, "_lexical_search", return_value=[hit("c", lexical_score=0.4), hit("b", lexical_score=0.3)]
+        ))
+
+    @override_settings(RETRIEVAL_MODE="hybrid", HYBRID_CANDIDATES=20, RRF_K=60)
+    def test_hybrid_fuses_both_rankings(self):
+        results = document_service.search_similar_chunks("ERR-4821 refund", user_id=1, top_k=2)
+
+        self.assertEqual([r["chunk_id"] for r in results], ["b", "a"])
+        # each retriever over-fetches HYBRID_CANDIDATES before fusion
+        self.vector.assert_called_once_with("ERR-4821 refund", 1, 20)
+        self.lexical.assert_called_once_with("ERR-4821 refund", 1, 20)
+
+    @override_settings(RETRIEVAL_MODE="vector")
+    def test_vector_mode_skips_the_lexical_search(self):
+        results = document_service.search_similar_chunks("refund", user_id=1, top_k=2)
+
+        self.assertEqual([(r["chunk_id"], r["score"]) for r in results], [("a", 0.9), ("b", 0.8)])
+        self.lexical.assert_not_called()
+
+    def test_pool_thread_reconnects_once_after_a_dropped_connection(self):
+        self.lexical.side_effect = [OperationalError("server closed the connection"), [hit("c")]]
+
+        with mock.patch.object(document_service.connection, "close") as close:
+            results = document_service._pooled_lexical_search("refund", 1, 5)
+
+        self.assertEqual(results, [hit("c")])
+        close.assert_called_once_with()
+
+
+@skipUnless(connection.vendor == "postgresql", "full-text search needs Postgres")
+class SearchLexicalTests(TestCase):
+    def test_matches_any_term_within_the_users_chunks(self):
+        alice, bob = (User.objects.create_user(username=name) for name in ("alice", "bob"))
+        for user in (alice, bob):
+            document = Document.objects.create(title="Runbook", uploaded_by=user)
+            DocumentChunk.objects.bulk_create([
+                DocumentChunk(document=document, chunk_index=0, text="Restart the worker when you see ERR-4821."),
+                DocumentChunk(document=document, chunk_index=1, text="Invoices are sent monthly."),
+            ])
+
+        results = search_lexical("what does ERR-4821 mean", alice.id)
+
+        self.assertEqual([r["chunk_index"] for r in results], [0])
+        self.assertGreater(results[0]["lexical_score"], 0)
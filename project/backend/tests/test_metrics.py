@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from backend.middleware import StageTimingMiddleware
+from backend.services.metrics import STAGE_SECONDS
+from backend.services.timing import stage
+from documents.models import Document, IngestionJob
+
+
+class MetricsEndpointTests(TestCase):
+    def test_exposes_histograms_and_service_gauges(self):
+        document = Document.objects.create(title="Doc", uploaded_by=User.objects.create_user(username="alice"))
+        IngestionJob.objects.create(document=document)
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode("utf-8")
+        self.assertIn("rag_stage_seconds", body)
+        self.assertIn('rag_ingestion_jobs{status="queued"} 1.0', body)
+        self.assertIn('rag_llm_in_flight{client="sync"}', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code, 200)
+
+    def test_only_get(self):
+        self.assertEqual(self.client.post("/metrics").status_code, 405)
+
+
+def stage_count(name):
+    # the histogram alone: the registry's other collectors query the database
+    (metric,) = STAGE_SECONDS.collect()
+    return next((s.value for s in metric.samples if s.name.endswith("_count") and s.labels["stage"] == name), 0)
+
+
+class StageTimingMiddlewareTests(SimpleTestCase):
+    def _call(self, view, **headers):
+        request = RequestFactory().get("/somewhere", headers=headers)
+        return StageTimingMiddleware(view)(request)
+
+    def test_reports_stages_in_server_timing_and_prometheus(self):
+        def view(request):
+            with stage("lookup"):
+                pass
+            return HttpResponse("ok")
+
+        before = stage_count("lookup")
+
+        response = self._call(view)
+
+        self.assertRegex(response["Server-Timing"], r'^lookup;dur=[\d.]+, total;dur=[\d.]+;desc="wall time"$')
+        self.assertTrue(response["X-Request-ID"])
+        self.assertEqual(stage_count("lookup"), before + 1)
+
+    def test_keeps_a_sane_incoming_request_id(self):
+        response = self._call(lambda request: HttpResponse("ok"), **{"X-Request-ID": "lb-1234"})
+        replaced = self._call(lambda request: HttpResponse("ok"), **{"X-Request-ID": "bad id\n"})
+
+        self.assertEqual(response["X-Request-ID"], "lb-1234")
+        self.assertNotEqual(replaced["X-Request-ID"], "bad id\n")
+
+    def test_streaming_responses_get_no_server_timing(self):
+        def view(request):
+            with stage("lookup"):
+                pass
+            return StreamingHttpResponse(iter([b"ok"]))
+
+        self.assertNotIn("Server-Timing", self._call(view))
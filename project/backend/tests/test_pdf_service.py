@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+from unittest import mock
+import PyPDF2
+from django.test import SimpleTestCase, override_settings
+from backend.services import pdf_service
+from backend.services.pdf_service import _extract_page_range, iter_pdf_pages, iter_pdf_pages_parallel
+from backend.testing.synthetic import make_pdf
+
+PAGES = [f"Page {number} of the handbook." for number in range(5)]
+
+
+class PdfExtractionTestCase(SimpleTestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(make_pdf(PAGES))
+        self.path = f.name
+        self.addCleanup(os.unlink, self.path)
+
+
+class ExtractPageRangeTests(PdfExtractionTestCase):
+    def test_extracts_the_requested_pages(self):
+        texts = _extract_page_range(self.path, 1, 3, page_timeout=5)
+
+        self.assertEqual([text.strip() for text in texts], PAGES[1:3])
+
+    def test_a_slow_page_is_skipped_not_the_file(self):
+        extract_text = PyPDF2.PageObject.extract_text
+
+        def slow_second_page(page, *args, **kwargs):
+            text = extract_text(page, *args, **kwargs)
+            if "Page 1" in text:
+                time.sleep(1)
+            return text
+
+        with mock.patch.object(PyPDF2.PageObject, "extract_text", slow_second_page), \
+                self.assertLogs("backend.services.pdf_service", "WARNING") as logs:
+            texts = _extract_page_range(self.path, 0, 3, page_timeout=0.1)
+
+        self.assertEqual([text.strip() for text in texts], [PAGES[0], "", PAGES[2]])
+        self.assertIn("timed out", logs.output[0])
+
+
+class IterPdfPagesParallelTests(PdfExtractionTestCase):
+    @override_settings(PDF_EXTRACT_WORKERS=2, PDF_PAGES_PER_TASK=2)
+    def test_pages_come_back_in_order(self):
+        self.addCleanup(self._shutdown_pool)
+
+        parallel = list(iter_pdf_pages_parallel(self.path))
+
+        self.assertEqual(parallel, list(iter_pdf_pages(self.path)))
+        self.assertEqual(len(parallel), len(PAGES))
+
+    @override_settings(PDF_EXTRACT_WORKERS=0)
+    def test_no_workers_extracts_in_process(self):
+        self.assertEqual(list(iter_pdf_pages_parallel(self.path)), list(iter_pdf_pages(self.path)))
+
+    @staticmethod
+    def _shutdown_pool():
+        if pdf_service._pool is not None:
+            pdf_service._pool.shutdown()
+            pdf_service._reset_pool()
@@ -0,0 +1,105 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from backend.services.qdrant_service import COLLECTION_NAME, collection_report, ensure_collection, resolve_alias, switch_alias
+from backend.testing.fakes import memory_qdrant
+
+
+@override_settings(EMBEDDING_DIMENSION=8, QDRANT_QUANTIZATION="int8", QDRANT_ON_DISK_VECTORS=True)
+class EnsureCollectionTests(SimpleTestCase):
+    def setUp(self):
+        self.qdrant = self.enterContext(memory_qdrant())
+
+    def test_creates_a_versioned_collection_behind_an_alias(self):
+        # the local client accepts payload indexes but doesn't keep them
+        with mock.patch.object(self.qdrant, "create_payload_index") as create_index:
+            self.assertTrue(ensure_collection())
+
+        self.assertEqual(resolve_alias(COLLECTION_NAME), f"{COLLECTION_NAME}_v1")
+        info = self.qdrant.get_collection(f"{COLLECTION_NAME}_v1")
+        self.assertEqual(info.config.params.vectors.size, 8)
+        self.assertEqual({c.kwargs["field_name"] for c in create_index.call_args_list}, {"user_id", "document_id"})
+
+    def test_unversioned(self):
+        ensure_collection("tenant_7", versioned=False)
+
+        self.assertEqual(resolve_alias("tenant_7"), "tenant_7")
+
+    def test_running_again_keeps_the_points(self):
+        ensure_collection()
+        self.qdrant.upsert(COLLECTION_NAME, points=[PointStruct(id=1, vector=[0.1] * 8, payload={"user_id": 1})])
+
+        self.assertFalse(ensure_collection())
+        self.assertEqual(self.qdrant.count(COLLECTION_NAME).count, 1)
+
+    def test_refuses_a_dimension_change(self):
+        ensure_collection()
+
+        with override_settings(EMBEDDING_DIMENSION=16), self.assertRaisesMessage(ValueError, "rebuild it with a reindex"):
+            ensure_collection()
+
+    def test_moves_a_legacy_collection_behind_an_alias(self):
+        self.qdrant.create_collection(COLLECTION_NAME, vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+        self.qdrant.upsert(COLLECTION_NAME, points=[
+            PointStruct(id=i, vector=[0.1] * 8, payload={"user_id": i}) for i in range(5)
+        ])
+
+        self.assertFalse(ensure_collection())
+
+        self.assertEqual(resolve_alias(COLLECTION_NAME), f"{COLLECTION_NAME}_v1")
+        points, _ = self.qdrant.scroll(COLLECTION_NAME, limit=10)
+        self.assertEqual(sorted(p.payload["user_id"] for p in points), [0, 1, 2, 3, 4])
+
+    def test_switch_alias_refuses_to_replace_a_plain_collection(self):
+        self.qdrant.create_collection(COLLECTION_NAME, vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+        self.qdrant.upsert(COLLECTION_NAME, points=[PointStruct(id=1, vector=[0.1] * 8)])
+        ensure_collection(f"{COLLECTION_NAME}_v2", versioned=False)
+
+        with self.assertRaisesMessage(ValueError, "run provision_qdrant"):
+            switch_alias(COLLECTION_NAME, f"{COLLECTION_NAME}_v2")
+
+        self.assertEqual(self.qdrant.count(COLLECTION_NAME).count, 1)
+
+    def test_report(self):
+        ensure_collection()
+        self.qdrant.upsert(COLLECTION_NAME, points=[PointStruct(id=i, vector=[0.1] * 8) for i in range(10)])
+
+        report = collection_report()
+
+        self.assertEqual((report["target"], report["points"], report["dimension"]), (f"{COLLECTION_NAME}_v1", 10, 8))
+        self.assertEqual(report["estimated_bytes"]["vectors"], 10 * 8 * 4)
+
+
+@override_settings(EMBEDDING_DIMENSION=8)
+class ProvisionQdrantCommandTests(SimpleTestCase):
+    def test_provisions_and_reports(self):
+        stdout = StringIO()
+        with memory_qdrant() as qdrant:
+            call_command("provision_qdrant", stdout=stdout)
+            call_command("provision_qdrant", stdout=stdout)
+
+            self.assertTrue(qdrant.collection_exists(f"{COLLECTION_NAME}_v1"))
+        output = stdout.getvalue()
+        self.assertIn(f"Created collection {COLLECTION_NAME}", output)
+        self.assertIn(f"Updated collection {COLLECTION_NAME}", output)
+        self.assertIn("payload indexes:", output)
+
+    def test_wait_gives_up_at_the_deadline(self):
+        with memory_qdrant() as qdrant, \
+                mock.patch.object(qdrant, "get_collections", side_effect=ConnectionError("refused")), \
+                mock.patch("documents.management.commands.provision_qdrant.time.sleep"), \
+                mock.patch("documents.management.commands.provision_qdrant.time.monotonic", side_effect=[0, 1, 2]):
+            with self.assertRaisesMessage(CommandError, "Qdrant is not reachable after 2s: refused"):
+                call_command("provision_qdrant", wait=2, stdout=StringIO())
+
+    def test_wait_provisions_once_qdrant_answers(self):
+        with memory_qdrant() as qdrant:
+            get_collections = mock.Mock(side_effect=[ConnectionError("refused"), qdrant.get_collections()])
+            with mock.patch.object(qdrant, "get_collections", get_collections), \
+                    mock.patch("documents.management.commands.provision_qdrant.time.sleep") as sleep:
+                call_command("provision_qdrant", wait=30, stdout=StringIO())
+
+            self.assertEqual(sleep.call_count, 1)
+            self.assertTrue(qdrant.collection_exists(f"{COLLECTION_NAME}_v1"))
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from unittest import mock
+import httpx
+import openai
+from django.test import SimpleTestCase, override_settings
+from backend.services.rag_service import AsyncConcurrencyLimiter, ConcurrencyLimiter, LLMError, generate_answer
+
+
+def api_error(cls, status, headers=None):
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+def completion(text):
+    return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=text))])
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def test_rejects_callers_that_wait_past_the_timeout(self):
+        limiter = ConcurrencyLimiter(limit=1, queue_timeout=0.05)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with limiter.slot():
+                holding.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        holding.wait()
+        try:
+            self.assertEqual(limiter.stats()["in_flight"], 1)
+            with self.assertRaises(LLMError):
+                with limiter.slot():
+                    pass
+        finally:
+            release.set()
+            holder.join()
+
+        stats = limiter.stats()
+        self.assertEqual((stats["acquired"], stats["rejected"]), (1, 1))
+        self.assertEqual((stats["in_flight"], stats["waiting"]), (0, 0))
+
+    def test_a_released_slot_is_reused(self):
+        limiter = ConcurrencyLimiter(limit=1, queue_timeout=0.05)
+        for _ in range(3):
+            with limiter.slot():
+                pass
+
+        self.assertEqual(limiter.stats()["acquired"], 3)
+
+
+@override_settings(LLM_MAX_RETRIES=2, LLM_RETRY_BASE_DELAY=0.5, LLM_RETRY_MAX_DELAY=4)
+class RetryTests(SimpleTestCase):
+    def setUp(self):
+        self.create = mock.Mock()
+        client = mock.Mock()
+        client.chat.completions.create = self.create
+        self.enterContext(mock.patch("backend.services.rag_service.get_client", return_value=client))
+        self.sleep = self.enterContext(mock.patch("backend.services.rag_service.time.sleep"))
+        self.enterContext(mock.patch("backend.services.rag_service._limiter", ConcurrencyLimiter(2, 1)))
+
+    def test_retries_rate_limits_honouring_retry_after(self):
+        self.create.side_effect = [
+            api_error(openai.RateLimitError, 429, {"retry-after": "2"}),
+            api_error(openai.RateLimitError, 429, {"retry-after": "60"}),
+            completion(" Thirty days. "),
+        ]
+
+        with self.assertLogs("backend.services.rag_service", "WARNING"):
+            answer = generate_answer("How long?", "The refund window is thirty days.")
+
+        self.assertEqual(answer, "Thirty days.")
+        # Retry-After is capped at LLM_RETRY_MAX_DELAY
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [2.0, 4])
+
+    def test_backs_off_exponentially_without_retry_after(self):
+        self.create.side_effect = [api_error(openai.InternalServerError, 503)] * 2 + [completion("ok")]
+
+        with mock.patch("backend.services.rag_service.random.uniform", side_effect=lambda low, high: high), \
+                self.assertLogs("backend.services.rag_service", "WARNING"):
+            generate_answer("q", "context")
+
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [0.5, 1.0])
+
+    def test_gives_up_after_max_retries(self):
+        self.create.side_effect = api_error(openai.InternalServerError, 500)
+
+        with self.assertRaises(LLMError), self.assertLogs("backend.services.rag_service", "WARNING"):
+            generate_answer("q", "context")
+
+        self.assertEqual(self.create.call_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.create.side_effect = api_error(openai.BadRequestError, 400)
+
+        with self.assertRaises(LLMError):
+            generate_answer("q", "context")
+
+        self.assertEqual(self.create.call_count, 1)
+        self.sleep.assert_not_called()
+
+
+class AsyncConcurrencyLimiterTests(SimpleTestCase):
+    def test_queues_up_to_the_timeout_then_rejects(self):
+        limiter = AsyncConcurrencyLimiter(limit=2, queue_timeout=0.05)
+        peak = 0
+
+        async def call(seconds):
+            nonlocal peak
+            async with limiter.aslot():
+                peak = max(peak, limiter.stats()["in_flight"])
+                await asyncio.sleep(seconds)
+
+        async def main():
+            # two slow calls hold both slots past the third caller's timeout
+            return await asyncio.gather(call(0.2), call(0.2), call(0), return_exceptions=True)
+
+        results = asyncio.run(main())
+
+        self.assertIsInstance(results[2], LLMError)
+        self.assertEqual(peak, 2)
+        stats = limiter.stats()
+        self.assertEqual((stats["acquired"], stats["rejected"], stats["in_flight"]), (2, 1, 0))
+
+    def test_each_event_loop_gets_its_own_semaphore(self):
+        limiter = AsyncConcurrencyLimiter(limit=1, queue_timeout=0.05)
+
+        async def call():
+            async with limiter.aslot():
+                pass
+
+        asyncio.run(call())
+        asyncio.run(call())  # a semaphore bound to the first loop would fail here
+
+        self.assertEqual(limiter.stats()["acquired"], 2)
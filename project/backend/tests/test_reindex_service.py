@@ -0,0 +1,90 @@
+import uuid
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from qdrant_client.models import Distance, VectorParams
+from backend.services import reindex_service
+from backend.services.qdrant_service import COLLECTION_NAME, ensure_collection, resolve_alias
+from backend.services.reindex_service import active_model, build, catch_up, reindex, start_run
+from backend.testing.fakes import fake_embeddings, memory_qdrant
+from documents.models import Document, DocumentChunk, IngestionJob, ReindexRun
+
+
+@override_settings(REINDEX_PARALLEL=1, REINDEX_MAX_CHUNKS_PER_SECOND=0)
+class ReindexTests(TestCase):
+    def setUp(self):
+        self.enterContext(fake_embeddings())
+        self.qdrant = self.enterContext(memory_qdrant())
+        ensure_collection()
+        self.user = User.objects.create_user(username="alice")
+        self.document = self._document(5)
+
+    def _document(self, chunks):
+        document = Document.objects.create(title="Doc", uploaded_by=self.user)
+        DocumentChunk.objects.bulk_create(
+            DocumentChunk(document=document, text=f"{document.id} chunk {i}", chunk_index=i) for i in range(chunks)
+        )
+        return document
+
+    def _ids(self, collection):
+        points, _ = self.qdrant.scroll(collection, limit=100)
+        return {str(point.id) for point in points}
+
+    def _chunk_ids(self):
+        return {str(pk) for pk in DocumentChunk.objects.values_list("pk", flat=True)}
+
+    def test_builds_a_new_version_and_switches_the_alias(self):
+        run = reindex(model_name="other-model", batch_size=2, grace=0, log=lambda message: None)
+
+        self.assertEqual(run.status, ReindexRun.SWITCHED)
+        self.assertEqual((run.previous_collection, run.collection_name), (f"{COLLECTION_NAME}_v1", f"{COLLECTION_NAME}_v2"))
+        self.assertEqual(resolve_alias(COLLECTION_NAME), f"{COLLECTION_NAME}_v2")
+        self.assertEqual(self._ids(COLLECTION_NAME), self._chunk_ids())
+        self.assertEqual(active_model(COLLECTION_NAME), "other-model")
+
+    def test_a_failed_run_resumes_from_its_cursor(self):
+        embed_chunks = reindex_service.embed_chunks
+        calls = []
+
+        def fail_on_second_batch(texts, model_name=None):
+            calls.append(len(texts))
+            if len(calls) == 2:
+                raise RuntimeError("embedding worker died")
+            return embed_chunks(texts, model_name=model_name)
+
+        with mock.patch("backend.services.reindex_service.embed_chunks", fail_on_second_batch), \
+                self.assertRaisesMessage(RuntimeError, "embedding worker died"):
+            reindex(batch_size=2, grace=0, log=lambda message: None)
+
+        failed = ReindexRun.objects.get()
+        self.assertEqual((failed.status, failed.chunks_done), (ReindexRun.FAILED, 2))
+        self.assertTrue(failed.cursor)
+
+        messages = []
+        run = reindex(batch_size=2, grace=0, log=messages.append)
+
+        self.assertEqual((run.pk, run.status, run.chunks_done), (failed.pk, ReindexRun.SWITCHED, 5))
+        self.assertIn(f"{COLLECTION_NAME}: main pass copied 3 chunk(s)", messages)
+        self.assertEqual(self._ids(COLLECTION_NAME), self._chunk_ids())
+
+    def test_catch_up_copies_new_documents_and_prunes_deleted_chunks(self):
+        run, _ = start_run(COLLECTION_NAME)
+        build(run, batch_size=2, parallel=1, max_rate=0)
+        # a chunk sorting before the cursor is only found through its ingestion job
+        late = Document.objects.create(title="Late", uploaded_by=self.user)
+        DocumentChunk.objects.create(id=uuid.UUID(int=1), document=late, text="late chunk", chunk_index=0)
+        IngestionJob.objects.create(document=late, status=IngestionJob.DONE)
+        DocumentChunk.objects.filter(document=self.document, chunk_index=0).delete()
+
+        copied, pruned = catch_up(run, batch_size=2, parallel=1, max_rate=0)
+
+        self.assertEqual((copied, pruned), (1, 1))
+        self.assertEqual(self._ids(run.collection_name), self._chunk_ids())
+
+    def test_refuses_a_legacy_collection(self):
+        self.qdrant.create_collection("legacy", vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+
+        with self.assertRaisesMessage(ValueError, "run provision_qdrant"):
+            reindex("legacy", grace=0, log=lambda message: None)
+
+        self.assertFalse(ReindexRun.objects.exists())
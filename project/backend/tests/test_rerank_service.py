@@ -0,0 +1,64 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from backend.services import document_service, rerank_service
+from backend.services.rerank_service import rerank
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many of the query's words the text contains."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=None):
+        self.batches.append(len(pairs))
+        return [sum(word in text.lower().split() for word in query.lower().split()) for query, text in pairs]
+
+
+def candidates():
+    return [
+        {"chunk_id": "a", "text": "shipping is free"},
+        {"chunk_id": "b", "text": "refunds take thirty days"},
+        {"chunk_id": "c", "text": "the refund window is thirty days from delivery"},
+        {"chunk_id": "d", "text": "contact support"},
+    ]
+
+
+class RerankTests(SimpleTestCase):
+    def setUp(self):
+        self.model = FakeCrossEncoder()
+        self.enterContext(mock.patch.object(rerank_service, "_model", self.model))
+        self.enterContext(mock.patch.object(rerank_service, "_pair_cost", None))
+
+    def test_scores_all_candidates_in_one_batch_and_keeps_the_best(self):
+        results = rerank("refund window thirty days", candidates(), top_k=2, budget_ms=0)
+
+        self.assertEqual([r["chunk_id"] for r in results], ["c", "b"])
+        self.assertEqual(results[0]["score"], results[0]["rerank_score"])
+        self.assertEqual(self.model.batches, [4])
+
+    def test_budget_limits_the_candidates_scored(self):
+        rerank_service._pair_cost = 0.010  # 10ms per pair: 3 fit in 30ms
+
+        results = rerank("contact support", candidates(), top_k=2, budget_ms=30)
+
+        # "d" was never scored, however well it would have matched
+        self.assertEqual(self.model.batches, [3])
+        self.assertNotIn("d", [r["chunk_id"] for r in results])
+
+    def test_budget_too_small_keeps_retrieval_order(self):
+        rerank_service._pair_cost = 0.010
+
+        with self.assertLogs("backend.services.rerank_service", "INFO"):
+            results = rerank("refund window", candidates(), top_k=3, budget_ms=20)
+
+        self.assertEqual([r["chunk_id"] for r in results], ["a", "b", "c"])
+        self.assertEqual(self.model.batches, [])
+
+    @override_settings(RERANK_ENABLED=True, RERANK_CANDIDATES=4, RERANK_TOP_K=1, RERANK_BUDGET_MS=0)
+    def test_retrieve_chunks_over_fetches_then_reranks(self):
+        with mock.patch.object(document_service, "search_similar_chunks", return_value=candidates()) as search:
+            results = document_service.retrieve_chunks("refund window thirty days", user_id=1, top_k=5)
+
+        search.assert_called_once_with("refund window thirty days", 1, top_k=4)
+        self.assertEqual([r["chunk_id"] for r in results], ["c"])
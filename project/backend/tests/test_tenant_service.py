@@ -0,0 +1,108 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from qdrant_client.models import PointStruct
+from backend.services.qdrant_service import COLLECTION_NAME, ensure_collection
+from backend.services.tenant_service import collection_for_user, dedicated_collection_name, move_tenant, plan_rebalance
+from backend.testing.fakes import memory_qdrant
+from documents.models import Document, DocumentChunk, IngestionJob, ReindexRun, TenantPlacement
+
+
+class PlanRebalanceTests(TestCase):
+    def _tenant(self, name, chunks, dedicated=False):
+        user = User.objects.create_user(username=name)
+        document = Document.objects.create(title=name, uploaded_by=user)
+        DocumentChunk.objects.bulk_create(
+            DocumentChunk(document=document, text=f"chunk {i}", chunk_index=i) for i in range(chunks)
+        )
+        if dedicated:
+            TenantPlacement.objects.create(user=user, collection_name=dedicated_collection_name(user.id))
+        return user
+
+    def test_moves_with_hysteresis(self):
+        grown = self._tenant("grown", 10)
+        self._tenant("small", 9)
+        self._tenant("near", 5, dedicated=True)
+        shrunk = self._tenant("shrunk", 4, dedicated=True)
+
+        moves = plan_rebalance(threshold=10)
+
+        # 5 chunks is below the threshold but not below half of it: that tenant stays
+        self.assertEqual(moves, {grown.id: dedicated_collection_name(grown.id), shrunk.id: COLLECTION_NAME})
+
+
+@override_settings(EMBEDDING_DIMENSION=8)
+class MoveTenantTests(TestCase):
+    def setUp(self):
+        self.qdrant = self.enterContext(memory_qdrant())
+        self.sleep = self.enterContext(mock.patch("backend.services.tenant_service.time.sleep"))
+        ensure_collection()
+        self.user = User.objects.create_user(username="alice")
+        self.other = User.objects.create_user(username="bob")
+        self.target = dedicated_collection_name(self.user.id)
+        self._write(COLLECTION_NAME, self.user.id, range(3))
+        self._write(COLLECTION_NAME, self.other.id, range(10, 12))
+
+    def _write(self, collection, user_id, ids):
+        self.qdrant.upsert(collection, points=[
+            PointStruct(id=i, vector=[0.1] * 8, payload={"user_id": user_id}) for i in ids
+        ])
+
+    def _ids(self, collection):
+        points, _ = self.qdrant.scroll(collection, limit=100)
+        return sorted(point.id for point in points)
+
+    def test_moves_only_the_users_points(self):
+        moved = move_tenant(self.user.id, self.target, grace=0, log=lambda message: None)
+
+        self.assertEqual(moved, 3)
+        self.assertEqual(self._ids(self.target), [0, 1, 2])
+        self.assertEqual(self._ids(COLLECTION_NAME), [10, 11])
+        self.assertEqual(collection_for_user(self.user.id), self.target)
+
+    def test_copies_points_written_to_the_source_during_the_move(self):
+        job = IngestionJob.objects.create(
+            document=Document.objects.create(title="Doc", uploaded_by=self.user),
+            status=IngestionJob.RUNNING,
+            started_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        def job_keeps_writing(seconds):
+            # a job that resolved the old placement writes twice, then finishes
+            if self.sleep.call_count == 1:
+                self._write(COLLECTION_NAME, self.user.id, [3])
+            else:
+                self._write(COLLECTION_NAME, self.user.id, [4])
+                IngestionJob.objects.filter(pk=job.pk).update(status=IngestionJob.DONE)
+
+        self.sleep.side_effect = job_keeps_writing
+
+        moved = move_tenant(self.user.id, self.target, grace=5, log=lambda message: None)
+
+        self.assertEqual(moved, 5)
+        self.assertEqual(self._ids(self.target), [0, 1, 2, 3, 4])
+        self.assertEqual(self._ids(COLLECTION_NAME), [10, 11])
+
+    def test_refuses_a_target_serving_another_model(self):
+        ReindexRun.objects.create(
+            alias=self.target, collection_name=f"{self.target}_v2", model_name="other-model",
+            status=ReindexRun.SWITCHED,
+        )
+
+        with self.assertRaises(ValueError):
+            move_tenant(self.user.id, self.target, grace=0)
+
+        self.assertEqual(self._ids(COLLECTION_NAME), [0, 1, 2, 10, 11])
+        self.assertFalse(TenantPlacement.objects.exists())
+
+    def test_refuses_a_target_of_another_dimension(self):
+        source = dedicated_collection_name(self.other.id)
+        ensure_collection(source, dimension=4)
+        TenantPlacement.objects.create(user=self.other, collection_name=source)
+
+        with self.assertRaises(ValueError):
+            move_tenant(self.other.id, COLLECTION_NAME, grace=0)
+
+        self.assertEqual(collection_for_user(self.other.id), source)
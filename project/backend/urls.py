@@ -5,10 +5,13 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from backend.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/", include("documents.urls")),
     path("user/", include("users.urls")),
+    path("metrics", metrics, name="metrics"),
 
 ]
 
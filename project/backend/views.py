@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from backend.services.metrics import render
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, the scraper must
+    send it as a Bearer token.
+    """
+    if settings.METRICS_TOKEN:
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if not constant_time_compare(header, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401)
+    body, content_type = render()
+    return HttpResponse(body, content_type=content_type)
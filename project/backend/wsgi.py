@@ -14,3 +14,16 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load the embedding model once per worker at startup instead of on the first request
+from django.conf import settings  # noqa: E402
+
+if settings.EMBEDDING_WARMUP:
+    from backend.services.embedding_service import warm_up  # noqa: E402
+
+    warm_up()
+
+    if settings.RERANK_ENABLED:
+        from backend.services import rerank_service  # noqa: E402
+
+        rerank_service.warm_up()
@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from backend.testing.benchmarks import STAGES, run
+
+
+class Command(BaseCommand):
+    help = "Time each RAG pipeline stage on a synthetic corpus and write machine-readable results"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of: {', '.join(STAGES)}")
+        parser.add_argument("--pages", type=int, default=50, help="Pages in the synthetic document")
+        parser.add_argument("--words-per-page", type=int, default=400)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        stages = [stage.strip() for stage in options["stages"].split(",") if stage.strip()]
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise CommandError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+        report = run(
+            stages,
+            pages=options["pages"],
+            words_per_page=options["words_per_page"],
+            queries=options["queries"],
+            repeat=options["repeat"],
+        )
+
+        self.stdout.write(f"{'stage':32} {'items':>6} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'items/s':>10}")
+        for result in report["results"]:
+            self.stdout.write(
+                f"{result['name']:32} {result['items']:>6} {result['mean_ms']:>10.2f} "
+                f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['items_per_s'] or 0:>10.1f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from backend.testing.fake_llm import make_server
+
+
+class Command(BaseCommand):
+    help = "Run a fake OpenAI-compatible completion server for local testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--answer", default=None, help="Text returned for every question")
+        parser.add_argument("--first-token-ms", type=float, default=200.0, help="Delay before the first token")
+        parser.add_argument("--token-ms", type=float, default=20.0, help="Delay between streamed tokens")
+
+    def handle(self, *args, **options):
+        server = make_server(
+            host=options["host"],
+            port=options["port"],
+            answer=options["answer"],
+            first_token_delay=options["first_token_ms"] / 1000,
+            token_delay=options["token_ms"] / 1000,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake LLM listening on http://{options['host']}:{server.server_port}/v1 "
+            f"(set OPENAI_BASE_URL to this URL)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from backend.services.dedup_service import file_hash, find_duplicate
+from documents.models import Document
+
+
+class Command(BaseCommand):
+    help = "Fill in Document.content_hash for files uploaded before uploads were hashed, so they take part in dedup"
+
+    def handle(self, *args, **options):
+        documents = Document.objects.filter(content_hash="").exclude(file="").exclude(file=None)
+        hashed = missing = duplicates = 0
+        for document in documents.iterator():
+            try:
+                with document.file.open("rb") as f:
+                    document.content_hash = file_hash(f)
+            except FileNotFoundError:
+                missing += 1
+                continue
+            # the user already has a hashed copy: one per user and content, so leave this one unhashed
+            if find_duplicate(document.uploaded_by_id, document.content_hash) is not None:
+                duplicates += 1
+                continue
+            # update(), not save(): don't touch signals or cached answers
+            Document.objects.filter(pk=document.pk).update(content_hash=document.content_hash)
+            hashed += 1
+        self.stdout.write(self.style.SUCCESS(f"Hashed {hashed} document(s); {duplicates} duplicate(s) left unhashed, {missing} file(s) missing."))
@@ -0,0 +1,75 @@
+import json
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from backend.testing.loadtest import mint_users, run_level, seed_corpora, start_local_stack
+
+
+class Command(BaseCommand):
+    help = "Fire concurrent question/upload traffic at the chat and upload endpoints and report latencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server under test")
+        parser.add_argument(
+            "--serve", action="store_true",
+            help="Serve the app from this process with the fake LLM and an in-process ingestion worker "
+                 "(use with QDRANT_LOCATION=:memory:)",
+        )
+        parser.add_argument("--users", type=int, default=5, help="Synthetic users (JWTs are minted for each)")
+        parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+        parser.add_argument("--upload-ratio", type=float, default=0.1, help="Share of requests that are uploads")
+        parser.add_argument("--seed-pages", type=int, default=20, help="Pages in each user's seed document")
+        parser.add_argument("--upload-pages", type=int, default=5, help="Pages in each uploaded document")
+        parser.add_argument("--no-seed", action="store_true", help="Skip seeding corpora")
+        parser.add_argument("--output", help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of integers")
+
+        stop = None
+        base_url = options["base_url"]
+        if options["serve"]:
+            if settings.QDRANT_LOCATION != ":memory:":
+                self.stdout.write(self.style.WARNING("QDRANT_LOCATION is not ':memory:'; using the configured Qdrant."))
+            base_url, stop = start_local_stack()
+            self.stdout.write(f"Serving the app at {base_url}")
+
+        try:
+            tokens = mint_users(options["users"])
+            with httpx.Client(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=max(levels))) as client:
+                if not options["no_seed"]:
+                    self.stdout.write(f"Seeding {len(tokens)} corpora...")
+                    seed_corpora(client, tokens, options["seed_pages"])
+
+                reports = []
+                for concurrency in levels:
+                    report = run_level(
+                        client, tokens, concurrency, options["requests"],
+                        options["upload_ratio"], options["upload_pages"],
+                    )
+                    reports.append(report)
+                    self._print_level(report)
+        finally:
+            if stop:
+                stop()
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"base_url": base_url, "levels": reports}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _print_level(self, report):
+        self.stdout.write(
+            f"\nconcurrency={report['concurrency']} requests={report['requests']} "
+            f"throughput={report['throughput_rps']:.1f} req/s"
+        )
+        for kind, row in report["kinds"].items():
+            stages = " ".join(f"{name}={ms:.1f}ms" for name, ms in row["stages_mean_ms"].items())
+            self.stdout.write(
+                f"  {kind:9} n={row['count']:<5} errors={row['errors']:<4} p50={row['p50_ms']:.1f}ms "
+                f"p90={row['p90_ms']:.1f}ms p99={row['p99_ms']:.1f}ms  {stages}"
+            )
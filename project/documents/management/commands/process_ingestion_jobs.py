@@ -0,0 +1,47 @@
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.services.job_service import drain_queue, requeue_stale_jobs
+from backend.services.metrics import start_server
+
+
+class Command(BaseCommand):
+    help = "Process queued document ingestion jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.INGESTION_WORKER_CONCURRENCY,
+            help="Number of jobs processed at the same time",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.INGESTION_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument(
+            "--metrics-port", type=int, default=settings.METRICS_WORKER_PORT,
+            help="Serve Prometheus metrics on this port (0 = off)",
+        )
+
+    def handle(self, *args, **options):
+        if options["metrics_port"]:
+            start_server(options["metrics_port"])
+            self.stdout.write(f"Serving metrics on :{options['metrics_port']}/metrics")
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} stale job(s).")
+
+        self.stdout.write(f"Processing ingestion jobs with concurrency {options['concurrency']}...")
+        stop = threading.Event()
+        try:
+            drain_queue(
+                concurrency=options["concurrency"],
+                once=options["once"],
+                poll_interval=options["poll_interval"],
+                stop=stop,
+            )
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write("Stopping after running jobs finish...")
+        self.stdout.write(self.style.SUCCESS("Ingestion worker stopped."))
@@ -0,0 +1,68 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from backend.services.qdrant_service import COLLECTION_NAME, collection_report, ensure_collection, qdrant_client
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = "Create or migrate the Qdrant collection (indexes, HNSW, on-disk vectors, quantization) without dropping data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=COLLECTION_NAME)
+        parser.add_argument("--all", action="store_true", help="Also handle the dedicated per-tenant collections")
+        parser.add_argument("--report-only", action="store_true", help="Only print the collection report")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+        parser.add_argument(
+            "--wait", type=float, default=0,
+            help="Seconds to wait for Qdrant to accept connections (e.g. right after `docker compose up`)",
+        )
+
+    def handle(self, *args, **options):
+        if options["wait"]:
+            self._wait_for_qdrant(options["wait"])
+        collections = [options["collection"]]
+        if options["all"]:
+            from backend.services.tenant_service import all_collections
+            collections = all_collections()
+        for collection in collections:
+            self._handle_collection(collection, options)
+
+    def _wait_for_qdrant(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                qdrant_client.get_collections()
+                return
+            except Exception as e:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"Qdrant is not reachable after {timeout:.0f}s: {e}")
+                self.stdout.write("Waiting for Qdrant...")
+                time.sleep(1)
+
+    def _handle_collection(self, collection, options):
+        if not options["report_only"]:
+            created = ensure_collection(collection)
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Created' if created else 'Updated'} collection {collection}"
+            ))
+
+        report = collection_report(collection)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        estimated = report["estimated_bytes"]
+        self.stdout.write(
+            f"collection={report['target']} points={report['points']} indexed={report['indexed_vectors']} segments={report['segments']} "
+            f"status={report['status']}\n"
+            f"dimension={report['dimension']} on_disk_vectors={report['on_disk_vectors']} "
+            f"quantization={report['quantization']} hnsw={report['hnsw']}\n"
+            f"payload indexes: {report['payload_indexes'] or 'none'}\n"
+            f"estimated memory: RAM {_mb(estimated['ram'])} "
+            f"(graph {_mb(estimated['hnsw_graph'])}, quantized {_mb(estimated['quantized_vectors'])}), "
+            f"disk {_mb(estimated['disk'])}, raw vectors {_mb(estimated['vectors'])}"
+        )
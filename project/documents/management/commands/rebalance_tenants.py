@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from backend.services.qdrant_service import COLLECTION_NAME
+from backend.services.tenant_service import (
+    collection_for_user,
+    dedicated_collection_name,
+    move_tenant,
+    plan_rebalance,
+)
+
+
+class Command(BaseCommand):
+    help = "Move tenants between the shared Qdrant collection and dedicated per-tenant collections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Move this user (with --to)")
+        parser.add_argument("--to", choices=["dedicated", "shared"], help="Target placement for --user")
+        parser.add_argument("--auto", action="store_true", help="Apply the size-based placement policy to every tenant")
+        parser.add_argument("--threshold", type=int, help="Chunks needed for a dedicated collection (default: settings)")
+        parser.add_argument("--grace", type=float, help="Seconds to wait for cached placements to expire (default: cache TTL)")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Only print the planned moves")
+
+    def handle(self, *args, **options):
+        if options["auto"]:
+            moves = plan_rebalance(options["threshold"])
+        elif options["user"] is not None and options["to"]:
+            target = dedicated_collection_name(options["user"]) if options["to"] == "dedicated" else COLLECTION_NAME
+            moves = {options["user"]: target}
+        else:
+            raise CommandError("Use --auto, or --user with --to")
+
+        if not moves:
+            self.stdout.write("Nothing to move.")
+            return
+
+        for user_id, target in moves.items():
+            self.stdout.write(f"user {user_id}: {collection_for_user(user_id)} -> {target}")
+        if options["dry_run"]:
+            return
+
+        for user_id, target in moves.items():
+            moved = move_tenant(
+                user_id, target,
+                batch_size=options["batch_size"],
+                grace=options["grace"],
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(f"user {user_id}: moved {moved} point(s) to {target}"))
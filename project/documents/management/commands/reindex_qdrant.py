@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from backend.services.qdrant_service import COLLECTION_NAME
+from backend.services.reindex_service import reindex
+
+
+class Command(BaseCommand):
+    help = "Rebuild a Qdrant collection from DocumentChunk rows into a new versioned collection and switch its alias"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=COLLECTION_NAME, help="Alias to rebuild")
+        parser.add_argument("--all", action="store_true", help="Rebuild the shared and every dedicated tenant collection")
+        parser.add_argument("--model", help="Embedding model for the new collection (default: EMBEDDING_MODEL_NAME)")
+        parser.add_argument("--restart", action="store_true", help="Abandon an unfinished run instead of resuming it")
+        parser.add_argument("--batch-size", type=int, help="Chunks per batch (default: REINDEX_BATCH_SIZE)")
+        parser.add_argument("--parallel", type=int, help="Upsert batches in flight (default: REINDEX_PARALLEL)")
+        parser.add_argument("--max-rate", type=float, help="Chunks per second cap (default: REINDEX_MAX_CHUNKS_PER_SECOND)")
+        parser.add_argument("--no-switch", action="store_true", help="Build and catch up, but leave the alias alone")
+        parser.add_argument("--grace", type=float, help="Seconds to wait after the switch (default: INDEX_MODEL_CACHE_TTL)")
+        parser.add_argument("--drop-old", action="store_true", help="Delete the previous collection after switching")
+
+    def handle(self, *args, **options):
+        aliases = [options["collection"]]
+        if options["all"]:
+            from backend.services.tenant_service import all_collections
+            aliases = all_collections()
+
+        for alias in aliases:
+            run = reindex(
+                alias,
+                model_name=options["model"],
+                restart=options["restart"],
+                batch_size=options["batch_size"],
+                parallel=options["parallel"],
+                max_rate=options["max_rate"],
+                switch=not options["no_switch"],
+                grace=options["grace"],
+                drop_old=options["drop_old"],
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(f"{alias}: run {run.id} {run.status} ({run.chunks_done} chunks)"))
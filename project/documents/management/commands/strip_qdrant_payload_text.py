@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from qdrant_client.models import Filter, IsEmptyCondition, PayloadField
+from backend.services.qdrant_service import COLLECTION_NAME, qdrant_client
+
+
+class Command(BaseCommand):
+    help = "Remove the chunk text from existing Qdrant payloads (lean payload mode); text stays in Postgres"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=COLLECTION_NAME)
+        parser.add_argument("--all", action="store_true", help="Also handle the dedicated per-tenant collections")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the points that still carry text")
+
+    def handle(self, *args, **options):
+        collections = [options["collection"]]
+        if options["all"]:
+            from backend.services.tenant_service import all_collections
+            collections = all_collections()
+        for collection in collections:
+            self._strip(collection, options)
+
+    def _strip(self, collection, options):
+        has_text = Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key="text"))])
+        total = qdrant_client.count(collection, count_filter=has_text, exact=True).count
+        self.stdout.write(f"{total} point(s) in {collection} still carry text.")
+        if options["dry_run"] or not total:
+            return
+
+        stripped = 0
+        offset = None
+        while True:
+            points, offset = qdrant_client.scroll(
+                collection_name=collection,
+                scroll_filter=has_text,
+                limit=options["batch_size"],
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            if not points:
+                break
+            qdrant_client.delete_payload(
+                collection_name=collection, keys=["text"], points=[point.id for point in points], wait=True
+            )
+            stripped += len(points)
+            self.stdout.write(f"  stripped {stripped}/{total}")
+            if offset is None:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Stripped text from {stripped} point(s) in {collection}."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentchunk',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('text', config='english'), name='chunk_text_search_idx'),
+        ),
+    ]
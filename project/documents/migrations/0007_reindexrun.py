@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:28
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_tenantplacement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReindexRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('alias', models.CharField(db_index=True, max_length=255)),
+                ('collection_name', models.CharField(max_length=255)),
+                ('previous_collection', models.CharField(blank=True, max_length=255)),
+                ('model_name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('building', 'Building'), ('switched', 'Switched'), ('failed', 'Failed')], db_index=True, default='building', max_length=16)),
+                ('cursor', models.CharField(blank=True, max_length=64)),
+                ('chunks_done', models.PositiveIntegerField(default=0)),
+                ('chunks_total', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('caught_up_at', models.DateTimeField(blank=True, null=True)),
+                ('switched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
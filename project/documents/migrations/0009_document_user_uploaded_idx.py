@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_document_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='document_user_uploaded_idx'),
+        ),
+    ]
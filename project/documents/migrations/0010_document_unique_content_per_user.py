@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def unhash_duplicates(apps, schema_editor):
+    """Keeps the hash on each user's earliest copy of a file, so the constraint can be added."""
+    Document = apps.get_model("documents", "Document")
+    seen = set()
+    duplicates = []
+    rows = Document.objects.exclude(content_hash="").order_by("uploaded_at").values_list("pk", "uploaded_by_id", "content_hash")
+    for pk, user_id, content_hash in rows.iterator():
+        if user_id is not None and (user_id, content_hash) in seen:
+            duplicates.append(pk)
+        seen.add((user_id, content_hash))
+    Document.objects.filter(pk__in=duplicates).update(content_hash="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_document_user_uploaded_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(unhash_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='document',
+            constraint=models.UniqueConstraint(condition=models.Q(('content_hash', ''), _negated=True), fields=('uploaded_by', 'content_hash'), name='unique_document_content_per_user'),
+        ),
+    ]
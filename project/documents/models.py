@@ -3,6 +3,8 @@ from django.db import models
 # Create your models here.
 import uuid
 from django.conf import settings  # to reference the custom User model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 
 class Document(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -17,9 +19,25 @@ class Document(models.Model):
     source = models.URLField(blank=True, null=True)  # optional if file uploaded via URL
     uploaded_at = models.DateTimeField(auto_now_add=True)
     file = models.FileField(upload_to="documents/", blank=True, null=True)  # optional
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256 of the file, for dedup
+
+    class Meta:
+        indexes = [
+            # the document list: one user's documents, newest first
+            models.Index(fields=["uploaded_by", "-uploaded_at"], name="document_user_uploaded_idx"),
+        ]
+        constraints = [
+            # one document per user and content; unhashed rows (links, old uploads) are exempt
+            models.UniqueConstraint(
+                fields=["uploaded_by", "content_hash"],
+                condition=~models.Q(content_hash=""),
+                name="unique_document_content_per_user",
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.title} ({self.uploaded_by.username})"
+        # ids only: __str__ must not query (admin, logs)
+        return f"{self.title} (user {self.uploaded_by_id})"
 
 
 class DocumentChunk(models.Model):
@@ -33,6 +51,122 @@ class DocumentChunk(models.Model):
     chunk_index = models.PositiveIntegerField()
     qdrant_id = models.CharField(max_length=255, blank=True, null=True)  # ID in vector DB
 
+    class Meta:
+        indexes = [
+            # full-text index for lexical search; same expression as lexical_search.search_lexical
+            GinIndex(SearchVector("text", config="english"), name="chunk_text_search_idx"),
+        ]
+
+    def __str__(self):
+        return f"Chunk {self.chunk_index} of document {self.document_id}"
+
+
+
+class EmbeddingCacheEntry(models.Model):
+    """
+    Content-addressed chunk embedding: identical text embedded with the same
+    model is looked up here instead of running the model again.
+    """
+    content_hash = models.CharField(max_length=64)  # sha256 of the chunk text
+    model_name = models.CharField(max_length=255)
+    vector = models.BinaryField()  # float32, packed
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model_name", "content_hash"], name="unique_embedding_per_model"),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name}:{self.content_hash[:12]}"
+
+
+class IngestionJob(models.Model):
+    """
+    Tracks background extraction/chunking/embedding of an uploaded document.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="jobs"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    chunks_done = models.PositiveIntegerField(default=0)
+    chunks_total = models.PositiveIntegerField(null=True, blank=True)  # unknown until the text is chunked
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+
+class TenantPlacement(models.Model):
+    """
+    Qdrant collection holding a user's vectors. Users without a placement
+    live in the shared collection.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="vector_placement"
+    )
+    collection_name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"Chunk {self.chunk_index} of {self.document.title}"
+        return f"user {self.user_id} -> {self.collection_name}"
+
+
+class ReindexRun(models.Model):
+    """
+    Rebuild of a Qdrant collection (by alias) into a new versioned collection.
+    `cursor` is the last chunk id written, so a crashed run resumes there.
+    """
+    BUILDING = "building"
+    SWITCHED = "switched"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (BUILDING, "Building"),
+        (SWITCHED, "Switched"),
+        (FAILED, "Failed"),
+    ]
 
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    alias = models.CharField(max_length=255, db_index=True)
+    collection_name = models.CharField(max_length=255)  # versioned target, e.g. document_chunks_v2
+    previous_collection = models.CharField(max_length=255, blank=True)  # alias target before the switch
+    model_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=BUILDING, db_index=True)
+    cursor = models.CharField(max_length=64, blank=True)
+    chunks_done = models.PositiveIntegerField(default=0)
+    chunks_total = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    caught_up_at = models.DateTimeField(null=True, blank=True)  # ingestion since then still needs copying
+    switched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Reindex {self.alias} -> {self.collection_name} ({self.status})"
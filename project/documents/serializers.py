@@ -1,6 +1,6 @@
 # documents/serializers.py
 from rest_framework import serializers
-from .models import Document, DocumentChunk
+from .models import Document, DocumentChunk, IngestionJob
 
 # Serializer for document upload
 class DocumentUploadSerializer(serializers.ModelSerializer):
@@ -20,9 +20,28 @@ class DocumentSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "uploaded_by", "source", "file", "uploaded_at"]
         read_only_fields = ["id", "uploaded_by", "uploaded_at"]
 
+# Serializer for the document list; the extra fields are annotated by DocumentListAPIView
+class DocumentListSerializer(DocumentSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+    index_status = serializers.CharField(read_only=True, allow_null=True)  # latest ingestion job, None if never queued
+
+    class Meta(DocumentSerializer.Meta):
+        fields = DocumentSerializer.Meta.fields + ["content_hash", "chunk_count", "index_status"]
+        read_only_fields = DocumentSerializer.Meta.read_only_fields + ["content_hash"]
+
 # Optional: Serializer for returning chunk info
 class DocumentChunkSerializer(serializers.ModelSerializer):
     class Meta:
         model = DocumentChunk
         fields = ["id", "document", "text", "chunk_index", "qdrant_id"]
         read_only_fields = ["id", "qdrant_id"]
+
+# Serializer for background ingestion job status
+class IngestionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestionJob
+        fields = [
+            "id", "document", "status", "chunks_done", "chunks_total", "attempts",
+            "error", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Document
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidate_cached_answers(sender, instance, **kwargs):
+    """
+    A user's documents changed: answers cached for them may be stale.
+    """
+    from backend.services.answer_cache import invalidate_user
+    invalidate_user(instance.uploaded_by_id)
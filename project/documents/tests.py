@@ -1,3 +1,197 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from backend.services.job_service import upload_document
+from .models import Document, DocumentChunk, IngestionJob
 
 # Create your tests here.
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class IngestionJobAPITests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.document = Document.objects.create(title="Handbook", uploaded_by=self.user)
+        self.document.file.save("handbook.pdf", ContentFile(b"%PDF-1.4 handbook"))
+
+    def _requeue(self, document=None):
+        return self.client.post("/api/jobs/", {"document": str((document or self.document).pk)}, format="json")
+
+    def test_requeue_while_active_returns_the_current_job(self):
+        for status in (IngestionJob.QUEUED, IngestionJob.RUNNING):
+            with self.subTest(status=status):
+                IngestionJob.objects.all().delete()
+                active = IngestionJob.objects.create(document=self.document, status=status)
+
+                response = self._requeue()
+
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(response.json()["id"], str(active.pk))
+                self.assertEqual(IngestionJob.objects.count(), 1)
+
+    def test_requeue_after_a_finished_job_queues_a_new_one(self):
+        done = IngestionJob.objects.create(document=self.document, status=IngestionJob.DONE)
+
+        response = self._requeue()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.json()["id"], str(done.pk))
+        self.assertEqual(response.json()["status"], IngestionJob.QUEUED)
+
+    def test_only_the_owner_can_requeue(self):
+        other = Document.objects.create(title="Other", uploaded_by=User.objects.create_user(username="bob"))
+
+        self.assertEqual(self._requeue(other).status_code, 404)
+
+    def test_document_without_file_is_rejected(self):
+        empty = Document.objects.create(title="Link", uploaded_by=self.user, source="https://example.com")
+
+        self.assertEqual(self._requeue(empty).status_code, 400)
+        self.assertFalse(IngestionJob.objects.filter(document=empty).exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadDocumentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice")
+
+    def _upload(self, content=b"%PDF-1.4 handbook", user=None):
+        return upload_document(user or self.user, SimpleUploadedFile("handbook.pdf", content), "Handbook")
+
+    def test_same_content_is_not_stored_or_queued_twice(self):
+        document, job, duplicate = self._upload()
+        again, same_job, duplicate_again = self._upload()
+
+        self.assertFalse(duplicate)
+        self.assertTrue(duplicate_again)
+        self.assertEqual((again.pk, same_job.pk), (document.pk, job.pk))
+        self.assertEqual(Document.objects.count(), 1)
+        self.assertEqual(IngestionJob.objects.count(), 1)
+
+    def test_different_content_or_user_is_a_new_document(self):
+        self._upload()
+        _, _, other_content = self._upload(b"%PDF-1.4 price list")
+        _, _, other_user = self._upload(user=User.objects.create_user(username="bob"))
+
+        self.assertFalse(other_content)
+        self.assertFalse(other_user)
+        self.assertEqual(Document.objects.count(), 3)
+
+    def test_reupload_retries_a_failed_ingestion(self):
+        document, job, _ = self._upload()
+        IngestionJob.objects.filter(pk=job.pk).update(status=IngestionJob.FAILED)
+
+        again, retry, duplicate = self._upload()
+
+        self.assertFalse(duplicate)
+        self.assertEqual(again.pk, document.pk)
+        self.assertNotEqual(retry.pk, job.pk)
+        self.assertEqual(retry.status, IngestionJob.QUEUED)
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_concurrent_upload_of_the_same_content_returns_the_first_row(self):
+        document, job, _ = self._upload()
+        # the other request checked for a duplicate before this one was saved
+        with mock.patch("backend.services.job_service.find_duplicate", side_effect=[None, document]):
+            again, same_job, duplicate = self._upload()
+
+        self.assertTrue(duplicate)
+        self.assertEqual((again.pk, same_job.pk), (document.pk, job.pk))
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_one_hashed_document_per_user_and_content(self):
+        document, _, _ = self._upload()
+
+        with self.assertRaises(IntegrityError):
+            Document.objects.create(title="Copy", uploaded_by=self.user, content_hash=document.content_hash)
+
+    def test_unhashed_documents_are_exempt(self):
+        Document.objects.create(title="Link", uploaded_by=self.user, source="https://example.com")
+        Document.objects.create(title="Link", uploaded_by=self.user, source="https://example.com")
+
+        self.assertEqual(Document.objects.filter(uploaded_by=self.user).count(), 2)
+
+
+class DocumentListAPITests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _documents(self, count, user=None):
+        documents = [Document.objects.create(title=f"Doc {i}", uploaded_by=user or self.user) for i in range(count)]
+        for document in documents:
+            DocumentChunk.objects.bulk_create(
+                DocumentChunk(document=document, text=f"chunk {i}", chunk_index=i) for i in range(2)
+            )
+            IngestionJob.objects.create(document=document, status=IngestionJob.FAILED)
+            IngestionJob.objects.create(document=document, status=IngestionJob.DONE)
+        return documents
+
+    def test_lists_only_the_users_documents_with_counts_and_status(self):
+        (document,) = self._documents(1)
+        self._documents(1, user=User.objects.create_user(username="bob"))
+
+        results = self.client.get("/api/list/").json()["results"]
+
+        self.assertEqual([r["id"] for r in results], [str(document.pk)])
+        self.assertEqual((results[0]["chunk_count"], results[0]["index_status"]), (2, IngestionJob.DONE))
+
+    def test_cursor_pages_cover_every_document_newest_first(self):
+        documents = self._documents(5)
+        seen = []
+        url = "/api/list/?page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            seen += [r["id"] for r in page["results"]]
+            url = page["next"]
+
+        expected = Document.objects.filter(pk__in=[d.pk for d in documents]).order_by("-uploaded_at")
+        self.assertEqual(seen, [str(d.pk) for d in expected])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self._documents(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/api/list/")
+        self._documents(6)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get("/api/list/")
+
+        self.assertEqual(len(response.json()["results"]), 8)
+        self.assertEqual(len(large), len(small))
+
+    def test_unchanged_list_answers_304(self):
+        (document,) = self._documents(1)
+        first = self.client.get("/api/list/")
+        self.assertIn("Authorization", first["Vary"])
+
+        unchanged = self.client.get("/api/list/", HTTP_IF_NONE_MATCH=first["ETag"])
+        IngestionJob.objects.create(document=document)
+        changed = self.client.get("/api/list/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["results"][0]["index_status"], IngestionJob.QUEUED)
+
+    def test_deleting_a_document_changes_the_etag(self):
+        documents = self._documents(2)
+        etag = self.client.get("/api/list/")["ETag"]
+
+        documents[0].delete()
+
+        self.assertEqual(self.client.get("/api/list/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -5,5 +5,7 @@ from .views import *
 urlpatterns = [
     path("upload/", DocumentUploadAPIView.as_view(), name="upload-document"),
     path("list/", DocumentListAPIView.as_view(), name="list-documents"),
+    path("jobs/", IngestionJobListCreateAPIView.as_view(), name="ingestion-jobs"),
+    path("jobs/<uuid:pk>/", IngestionJobDetailAPIView.as_view(), name="ingestion-job-detail"),
 
 ]
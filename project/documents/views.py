@@ -1,9 +1,17 @@
+import hashlib
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Document, DocumentChunk
-from .serializers import DocumentSerializer
-import PyPDF2
+from .models import Document, DocumentChunk, IngestionJob
+from .serializers import DocumentListSerializer, DocumentSerializer, IngestionJobSerializer
+from backend.services.job_service import enqueue_ingestion, upload_document
+from backend.services.timing import stage
 
 class DocumentUploadAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -11,47 +19,119 @@ class DocumentUploadAPIView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = DocumentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        document = serializer.save(uploaded_by=request.user)
+        file = serializer.validated_data.get("file")
+        if not file:
+            with stage("upload"):
+                serializer.save(uploaded_by=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if document.file:
-            text = extract_text_from_pdf(document.file.path)
-            chunks = split_text_into_chunks(text)
-            save_chunks(document, chunks)
+        # Extraction/embedding happen in the ingestion worker; poll the job for progress
+        with stage("upload"):
+            document, job, duplicate = upload_document(
+                request.user, file, serializer.validated_data["title"], serializer.validated_data.get("source")
+            )
+        data = dict(DocumentSerializer(document).data)
+        data["job"] = IngestionJobSerializer(job).data if job else None
+        data["duplicate"] = duplicate
+        # a duplicate is the user's existing document: nothing new was created
+        return Response(data, status=status.HTTP_200_OK if duplicate else status.HTTP_202_ACCEPTED)
 
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+class DocumentCursorPagination(CursorPagination):
+    ordering = "-uploaded_at"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
 
+
+def _list_state(request):
+    """
+    (count, newest upload, latest job update) of the user's documents: two
+    aggregate queries, computed once per request for both validators.
+    """
+    if not hasattr(request, "_document_list_state"):
+        documents = Document.objects.filter(uploaded_by=request.user).aggregate(
+            count=Count("id"), last_upload=Max("uploaded_at")
+        )
+        last_job = IngestionJob.objects.filter(document__uploaded_by=request.user).aggregate(
+            last_job=Max("updated_at")
+        )["last_job"]
+        request._document_list_state = (documents["count"], documents["last_upload"], last_job)
+    return request._document_list_state
+
+
+def _list_etag(request, *args, **kwargs):
+    # the count catches deletions, which move neither timestamp
+    state = (request.user.pk, request.get_full_path(), *_list_state(request))
+    return hashlib.sha256(repr(state).encode("utf-8")).hexdigest()
+
+
+def _list_last_modified(request, *args, **kwargs):
+    _, last_upload, last_job = _list_state(request)
+    return max(filter(None, (last_upload, last_job)), default=None)
+
+
+@method_decorator(condition(etag_func=_list_etag, last_modified_func=_list_last_modified), name="get")
 class DocumentListAPIView(generics.ListAPIView):
-    queryset = Document.objects.all()
-    serializer_class = DocumentSerializer
+    """
+    The user's documents, newest first, cursor-paginated, each with its
+    chunk count and the status of its latest ingestion job. A page costs the
+    same few queries whatever the number of documents, and unchanged pages
+    answer 304 to If-None-Match / If-Modified-Since.
+    """
+    serializer_class = DocumentListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DocumentCursorPagination
 
+    def get_queryset(self):
+        # correlated subqueries run only for the rows of the page, unlike a JOIN + GROUP BY
+        chunk_count = (
+            DocumentChunk.objects.filter(document=OuterRef("pk"))
+            .order_by().values("document").annotate(count=Count("id")).values("count")
+        )
+        latest_job = IngestionJob.objects.filter(document=OuterRef("pk")).order_by("-created_at")
+        return (
+            Document.objects.filter(uploaded_by=self.request.user)
+            .select_related("uploaded_by")
+            .annotate(
+                chunk_count=Coalesce(Subquery(chunk_count, output_field=IntegerField()), 0),
+                index_status=Subquery(latest_job.values("status")[:1]),
+            )
+        )
 
-# Utility functions
-def extract_text_from_pdf(file_path):
-    with open(file_path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-            text += "\n"
-    return text
-
-
-def split_text_into_chunks(text, chunk_size=1000, overlap=150):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
-
-
-def save_chunks(document, chunks):
-    for idx, chunk_text in enumerate(chunks):
-        DocumentChunk.objects.create(
-            document=document,
-            text=chunk_text,
-            chunk_index=idx
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, ["Authorization"])  # the same URL lists a different user's documents
+        return response
+
+
+class IngestionJobListCreateAPIView(generics.ListCreateAPIView):
+    """
+    GET lists the user's ingestion jobs; POST {"document": <id>} (re-)queues one of their documents.
+    A document that is already queued or running gets its current job back, not a second one.
+    """
+    serializer_class = IngestionJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return IngestionJob.objects.filter(document__uploaded_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        document = generics.get_object_or_404(
+            Document, pk=request.data.get("document"), uploaded_by=request.user
         )
+        if not document.file:
+            return Response(
+                {"detail": "Document has no file to ingest."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = enqueue_ingestion(document)
+        return Response(IngestionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class IngestionJobDetailAPIView(generics.RetrieveAPIView):
+    serializer_class = IngestionJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return IngestionJob.objects.filter(document__uploaded_by=self.request.user)
@@ -75,6 +75,57 @@ function addMessage(type, content, files = []) {
 
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return messageDiv.querySelector('.message-content');
+}
+
+// Ask a question through the streaming endpoint, rendering tokens as they arrive
+async function streamAnswer(message, token) {
+    const response = await fetch('/user/chat/stream/', {
+        method: 'POST',
+        headers: {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ message })
+    });
+
+    if (!response.ok) {
+        const data = await response.json();
+        addMessage('assistant', data.detail || 'Error occurred');
+        return;
+    }
+
+    const contentElement = addMessage('assistant', '');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+            let eventName = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            const payload = data ? JSON.parse(data) : {};
+            if (eventName === 'token') {
+                answer += payload.text;
+                contentElement.textContent = answer;
+            } else if (eventName === 'error') {
+                contentElement.classList.add('error-message');
+                contentElement.textContent = answer + payload.detail;
+            }
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        }
+    }
 }
 
 // Handle form submission
@@ -115,6 +166,11 @@ chatForm.addEventListener('submit', async (e) => {
     sendButton.disabled = true;
 
     try {
+        if (message && files.length === 0) {
+            await streamAnswer(message, token);
+            return;
+        }
+
         const response = await fetch('/user/chat/', {
             method: 'POST',
             headers: {
@@ -1,3 +1,173 @@
-from django.test import TestCase
+import json
+from asgiref.sync import async_to_sync
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.testing.fake_llm import DEFAULT_ANSWER, start_in_thread
+from backend.testing.fakes import fake_embeddings
 
 # Create your tests here.
+RESULTS = [
+    {"chunk_id": "00000000-0000-0000-0000-000000000001", "document_id": "doc", "chunk_index": 0,
+     "text": "The refund window is thirty days from delivery.", "vector_score": 0.9},
+]
+
+
+async def _read_async(content):
+    return [part async for part in content]
+
+
+def sse_events(response):
+    """[(event, data)] of a text/event-stream response."""
+    content = response.streaming_content
+    parts = async_to_sync(_read_async)(content) if response.is_async else content
+    body = b"".join(parts).decode("utf-8")
+    events = []
+    for block in filter(None, body.split("\n\n")):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class ChatViewTestCase(TestCase):
+    """
+    Runs the fake completion server for the class and gives each test a
+    user, a fresh OpenAI client and a fresh answer cache.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = start_in_thread(port=0)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        user = User.objects.create_user(username="alice", password="pw")
+        self.headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        self.enterContext(fake_embeddings())
+        for name in ("rag_service._client", "answer_cache._exact", "answer_cache._semantic"):
+            self.enterContext(mock.patch(f"backend.services.{name}", None))
+        self.enterContext(override_settings(
+            OPENAI_BASE_URL=f"http://127.0.0.1:{self.server.server_port}/v1",
+            OPENAI_API_KEY="fake",
+            LLM_MAX_RETRIES=0,  # a retry on a fresh connection would hide a stale pool
+        ))
+
+    def _post(self, path, message):
+        return self.client.post(
+            path, json.dumps({"message": message}), content_type="application/json", headers=self.headers,
+        )
+
+
+class ChatAsyncViewTests(ChatViewTestCase):
+    @override_settings(ANSWER_CACHE_ENABLED=False)
+    def test_sequential_requests_under_wsgi(self):
+        # the test client is WSGI: Django runs each async view on a new event loop,
+        # so nothing loop-bound (connection pools, semaphores) may outlive a request
+        with mock.patch("users.views.aretrieve_chunks", mock.AsyncMock(return_value=RESULTS)):
+            first = self._post("/user/chat/async/", "How long is the refund window?")
+            second = self._post("/user/chat/async/", "Can I return an opened item?")
+
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(second.status_code, 200, second.content)
+        self.assertTrue(second.json()["answer"])
+
+
+class ChatStreamViewTests(ChatViewTestCase):
+    def _stream(self, message):
+        response = self._post("/user/chat/stream/", message)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return sse_events(response)
+
+    def test_failure_before_the_first_token_is_an_error_event(self):
+        with mock.patch("users.views.retrieve_chunks", side_effect=RuntimeError("Qdrant is unavailable")), \
+                self.assertLogs("users.views", "ERROR"):
+            events = self._stream("How long is the refund window?")
+
+        self.assertEqual(events, [("error", {"detail": "Qdrant is unavailable"}), ("done", {})])
+
+    def test_sources_then_tokens_then_done(self):
+        with mock.patch("users.views.retrieve_chunks", return_value=RESULTS):
+            events = self._stream("How long is the refund window?")
+
+        names = [name for name, _ in events]
+        self.assertEqual(names[:2], ["sources", "timings"])
+        self.assertEqual(names[-1], "done")
+        self.assertEqual(events[0][1][0]["chunk_id"], RESULTS[0]["chunk_id"])
+        tokens = [data["text"] for name, data in events if name == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens).strip(), DEFAULT_ANSWER)
+
+    def test_repeated_question_is_served_from_the_cache(self):
+        with mock.patch("users.views.retrieve_chunks", return_value=RESULTS):
+            self._stream("How long is the refund window?")
+            events = self._stream("how long is the refund window")
+
+        self.assertEqual(events[-2:], [("token", {"text": DEFAULT_ANSWER}), ("done", {"cached": True})])
+
+    def test_no_relevant_chunks_skips_the_model(self):
+        with mock.patch("users.views.retrieve_chunks", return_value=[]), \
+                mock.patch("users.views.stream_answer") as stream_answer:
+            events = self._stream("Unrelated question?")
+
+        stream_answer.assert_not_called()
+        self.assertIn("No relevant documents found", events[-2][1]["text"])
+
+    def test_model_failure_is_an_error_event(self):
+        with mock.patch("users.views.retrieve_chunks", return_value=RESULTS), \
+                override_settings(OPENAI_BASE_URL="http://127.0.0.1:9/v1", LLM_CONNECT_TIMEOUT=1):
+            events = self._stream("How long is the refund window?")
+
+        self.assertEqual(events[-2][0], "error")
+        self.assertEqual(events[-1], ("done", {}))
+
+
+class ChatStreamAsyncViewTests(ChatViewTestCase):
+    def _stream(self, message):
+        response = self._post("/user/chat/async/stream/", message)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return sse_events(response)
+
+    def test_sources_then_tokens_then_done(self):
+        with mock.patch("users.views.aretrieve_chunks", mock.AsyncMock(return_value=RESULTS)):
+            events = self._stream("How long is the refund window?")
+
+        self.assertEqual([name for name, _ in events[:2]], ["sources", "timings"])
+        tokens = [data["text"] for name, data in events if name == "token"]
+        self.assertEqual("".join(tokens).strip(), DEFAULT_ANSWER)
+        self.assertEqual(events[-1], ("done", {}))
+
+    def test_failure_before_the_first_token_is_an_error_event(self):
+        with mock.patch("users.views.aretrieve_chunks", mock.AsyncMock(side_effect=RuntimeError("Qdrant is unavailable"))), \
+                self.assertLogs("users.views", "ERROR"):
+            events = self._stream("How long is the refund window?")
+
+        self.assertEqual(events, [("error", {"detail": "Qdrant is unavailable"}), ("done", {})])
+
+
+class ChatBatchViewTests(ChatViewTestCase):
+    def _batch(self, questions):
+        return self.client.post(
+            "/user/chat/batch/", json.dumps({"questions": questions}), content_type="application/json",
+            headers=self.headers,
+        )
+
+    def test_rejects_invalid_question_lists(self):
+        for questions in ([], "one question", ["fine", "  "], ["q"] * 3):
+            with self.subTest(questions=questions), override_settings(BATCH_MAX_QUESTIONS=2):
+                self.assertEqual(self._batch(questions).status_code, 400)
+
+    def test_answers_in_question_order(self):
+        questions = ["How long is the refund window?", "Unrelated question?"]
+        with mock.patch("backend.services.batch_service.retrieve_chunks_batch", return_value=[RESULTS, []]) as retrieve:
+            response = self._batch(questions)
+
+        self.assertEqual(response.status_code, 200)
+        retrieve.assert_called_once_with(questions, mock.ANY, top_k=5)
+        first, second = response.json()["results"]
+        self.assertEqual((first["question"], first["answer"]), (questions[0], DEFAULT_ANSWER))
+        self.assertEqual(first["sources"][0]["chunk_id"], RESULTS[0]["chunk_id"])
+        self.assertIn("No relevant documents found", second["answer"])
@@ -20,6 +20,10 @@ urlpatterns = [
     path("login/", login_page, name="login-page"),
     path("logout/", logout_page, name="logout-page"),
     path("chat/", chat_page, name="chat"),
+    path("chat/stream/", chat_stream_page, name="chat-stream"),
+    path("chat/batch/", chat_batch_page, name="chat-batch"),
+    path("chat/async/", chat_async_page, name="chat-async"),
+    path("chat/async/stream/", chat_stream_async_page, name="chat-stream-async"),
 
 ]
 
@@ -1,8 +1,10 @@
-import os, sys, PyPDF2
+import os, sys, json
+import logging
 from rest_framework import status
+from django.conf import settings
 from django.contrib import messages
 from django.db import IntegrityError
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from documents.models import Document
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
@@ -10,14 +12,24 @@ from rest_framework.response import Response
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, logout
-from backend.services.rag_service import generate_answer  
+from backend.services.rag_service import LLMError, agenerate_answer, astream_answer, generate_answer, stream_answer
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
-from backend.services.document_service import process_document, search_similar_chunks
+from backend.services.document_service import aretrieve_chunks, retrieve_chunks
+from backend.services.job_service import upload_document
+from backend.services.batch_service import answer_questions
+from backend.services import answer_cache
+from backend.services.context_service import build_context
+from backend.services.timing import end_request, get_request_id, get_timings, stage, start_request
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 # ----- LOGIN VIEW -----
@@ -68,29 +80,31 @@ def upload_page(request):
             source = request.POST.get("source")
             file = request.FILES.get("file")
 
-            if title or source or file:
-                doc = Document.objects.create(
+            if file:
+                # extracted and indexed by the ingestion worker; a re-upload of the same file is a no-op
+                upload_document(request.user, file, title or "Untitled", source)
+            elif title or source:
+                Document.objects.create(
                     title=title or "Untitled",
                     uploaded_by=request.user,
-                    source=source,
-                    file=file
+                    source=source
                 )
 
-                if file:
-                    import PyPDF2
-                    text = ""
-                    reader = PyPDF2.PdfReader(file)
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    process_document(doc, text)
-
         # --- Ask a question ---
         elif action == "ask":
             query = request.POST.get("query")
             if query:
-                results = search_similar_chunks(query, request.user.id, top_k=5) ## Top-5 most relevant chunks retrieved
-                chunks_text = "\n".join([r.payload["text"] for r in results])
-                answer = generate_answer(query, chunks_text)
+                results = retrieve_chunks(query, request.user.id, top_k=5) ## Top-5 most relevant chunks retrieved
+                chunks_text = build_context(results)
+                if not chunks_text:
+                    answer = f"No relevant documents found for '{query}'."
+                else:
+                    try:
+                        answer = answer_cache.get_or_generate(
+                            request.user.id, query, results, lambda: generate_answer(query, chunks_text)
+                        )
+                    except LLMError as e:
+                        answer = str(e)
 
     return render(request, "upload.html", {"answer": answer})
 
@@ -140,64 +154,42 @@ def chat_page(request):
         
         response_text = ""
         
-        # Handle file uploads
+        # Handle file uploads: store the file and queue it, the ingestion worker does the rest
+        job_ids = []
         if files:
+            uploaded = 0
             for f in files:
-                # Save file to disk
-                file_path = os.path.join(UPLOAD_DIR, f.name)
-                with open(file_path, "wb+") as dest:
-                    for chunk in f.chunks():
-                        dest.write(chunk)
-                
-                # Process PDF files
-                if f.name.endswith('.pdf'):
-                    try:
-                        import PyPDF2
-                        with open(file_path, 'rb') as pdf_file:
-                            reader = PyPDF2.PdfReader(pdf_file)
-                            text = ""
-                            for page in reader.pages:
-                                page_text = page.extract_text()
-                                # Clean the text to remove NUL characters and other problematic chars
-                                if page_text:
-                                    clean_text = page_text.replace('\x00', '').replace('\0', '')
-                                    # Remove other problematic characters
-                                    clean_text = ''.join(char for char in clean_text if ord(char) >= 32 or char in '\n\r\t')
-                                    text += clean_text + "\n"
-                        
-                        if not text.strip():
-                            response_text += f"Could not extract readable text from {f.name}. The file may contain only images or be corrupted. "
-                            continue
-                            
-                        print(f"Extracted text length: {len(text)}")  # Debug
-                        
-                        # Create document record
-                        doc = Document.objects.create(
-                            title=f.name,
-                            uploaded_by=request.user,
-                            file=f
-                        )
-                        
-                        # Process with RAG
-                        process_document(doc, text)
-                        print(f"Document processed: {doc.id}")  # Debug
-                        
-                    except Exception as pdf_error:
-                        print(f"PDF processing error: {pdf_error}")
-                        response_text += f"Error processing {f.name}: The file may be password-protected or corrupted. Please try a different PDF. "
-                        continue
-            
-            response_text += f"Uploaded and processed {len(files)} document(s). "
+                if not f.name.lower().endswith('.pdf'):
+                    response_text += f"Skipped {f.name}: only PDF files are supported. "
+                    continue
+
+                with stage("upload"):
+                    doc, job, duplicate = upload_document(request.user, f, f.name)
+                if job:
+                    job_ids.append(str(job.id))
+                if duplicate:
+                    response_text += f"{f.name} is already uploaded as '{doc.title}'. "
+                else:
+                    uploaded += 1
+
+            if uploaded:
+                response_text += f"Uploaded {uploaded} document(s); they are being processed in the background. "
         
         # Handle questions
         if message:
-            print(f"Searching for: {message}")  # Debug
-            results = search_similar_chunks(message, request.user.id, top_k=5)
-            print(f"Search results count: {len(results)}")  # Debug
+            results = retrieve_chunks(message, request.user.id, top_k=5)
+            logger.debug("%d result(s) for %r", len(results), message)
             
-            if results:
-                context = "\n".join([result["text"] for result in results])
-                answer = generate_answer(message, context)
+            with stage("context"):
+                context = build_context(results)
+            if context:
+                try:
+                    with stage("llm"):
+                        answer = answer_cache.get_or_generate(
+                            request.user.id, message, results, lambda: generate_answer(message, context)
+                        )
+                except LLMError as e:
+                    return Response({"detail": str(e), "jobs": job_ids}, status=503)
                 response_text += answer
             else:
                 response_text += f"No relevant documents found for '{message}'. Try uploading some documents first."
@@ -205,10 +197,231 @@ def chat_page(request):
         if not response_text:
             response_text = "Please provide a message or upload a file."
             
-        return Response({"answer": response_text})
+        return Response({"answer": response_text, "jobs": job_ids, "timings": get_timings()})
         
     except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return Response({"detail": str(e)}, status=500)
\ No newline at end of file
+        logger.exception("Chat request failed")
+        return Response({"detail": str(e)}, status=500)
+
+
+# ----- STREAMING CHAT VIEW -----
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def chat_stream_page(request):
+    """
+    Server-Sent Events version of the question path of chat_page: emits the
+    retrieved sources first, then the answer token by token, then `done`.
+    If the client disconnects, the generator is closed and the upstream
+    completion is cancelled. Failures after the response has started are
+    sent as an `error` event followed by `done`.
+    """
+    message = request.data.get("message", "").strip()
+    if not message:
+        return Response({"detail": "Message required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_id = request.user.id
+    request_id = get_request_id()
+
+    def events():
+        # runs after the middleware has returned, so it keeps its own stage timings
+        start_request(request_id)
+        try:
+            yield from _answer_events()
+        except Exception as e:
+            # the 200 is already sent: tell the client instead of cutting the stream short
+            logger.exception("Streaming chat request failed")
+            yield _sse("error", {"detail": str(e)})
+            yield _sse("done", {})
+        finally:
+            end_request()
+
+    def _answer_events():
+        results = retrieve_chunks(message, user_id, top_k=5)
+        yield _sse("sources", [
+            {"chunk_id": str(r["chunk_id"]), "document_id": r["document_id"], "chunk_index": r["chunk_index"]}
+            for r in results
+        ])
+        with stage("context"):
+            context = build_context(results)
+        yield _sse("timings", get_timings())
+        if not context:
+            yield _sse("token", {"text": f"No relevant documents found for '{message}'. Try uploading some documents first."})
+            yield _sse("done", {})
+            return
+
+        cached = answer_cache.lookup(user_id, message, results)
+        if cached is not None:
+            yield _sse("token", {"text": cached})
+            yield _sse("done", {"cached": True})
+            return
+
+        tokens = stream_answer(message, context)
+        parts = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield _sse("token", {"text": token})
+        except LLMError as e:
+            yield _sse("error", {"detail": str(e)})
+            yield _sse("done", {})
+            return
+        finally:
+            tokens.close()  # cancels the upstream completion if we stopped early
+        answer_cache.store(user_id, message, results, "".join(parts).strip())
+        yield _sse("done", {})
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+# ----- BATCH CHAT VIEW -----
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def chat_batch_page(request):
+    """
+    Answers a list of questions in one request (evaluation sets, bulk FAQs):
+    {"questions": [...]} -> {"results": [...]} in the same order. Retrieval
+    is batched; answers are generated BATCH_LLM_CONCURRENCY at a time.
+    """
+    questions = request.data.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return Response({"detail": "questions must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(questions) > settings.BATCH_MAX_QUESTIONS:
+        return Response(
+            {"detail": f"At most {settings.BATCH_MAX_QUESTIONS} questions per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not all(isinstance(question, str) and question.strip() for question in questions):
+        return Response({"detail": "Every question must be a non-empty string"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = answer_questions(request.user.id, [question.strip() for question in questions], top_k=5)
+    return Response({"results": results, "timings": get_timings()})
+
+
+# ----- ASYNC CHAT VIEWS (ASGI) -----
+def _jwt_user(request):
+    """
+    DRF doesn't run async views, so the async views check the Bearer token themselves.
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def _read_message(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            data = {}
+    else:
+        data = request.POST
+    return (data.get("message") or "").strip()
+
+
+@csrf_exempt  # token auth, no cookies
+@require_POST
+async def chat_async_page(request):
+    """
+    Question path of chat_page as an async view. Under ASGI (uvicorn) the
+    request holds no thread while it waits on Qdrant or the LLM, so one
+    process can keep hundreds of questions in flight. Uploads stay on chat_page.
+    """
+    user = await sync_to_async(_jwt_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+    message = _read_message(request)
+    if not message:
+        return JsonResponse({"detail": "Message required"}, status=400)
+
+    results = await aretrieve_chunks(message, user.id, top_k=5)
+    with stage("context"):
+        context = build_context(results)
+    if not context:
+        answer = f"No relevant documents found for '{message}'. Try uploading some documents first."
+        return JsonResponse({"answer": answer, "timings": get_timings()})
+
+    try:
+        with stage("llm"):
+            answer = await answer_cache.aget_or_generate(
+                user.id, message, results, lambda: agenerate_answer(message, context)
+            )
+    except LLMError as e:
+        return JsonResponse({"detail": str(e)}, status=503)
+    return JsonResponse({"answer": answer, "timings": get_timings()})
+
+
+@csrf_exempt
+@require_POST
+async def chat_stream_async_page(request):
+    """
+    Async version of chat_stream_page: same events, but the stream is an
+    async generator, so a slow answer doesn't pin a worker thread.
+    """
+    user = await sync_to_async(_jwt_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+    message = _read_message(request)
+    if not message:
+        return JsonResponse({"detail": "Message required"}, status=400)
+    request_id = get_request_id()
+
+    async def events():
+        start_request(request_id)
+        try:
+            async for event in _answer_events():
+                yield event
+        except Exception as e:
+            logger.exception("Streaming chat request failed")
+            yield _sse("error", {"detail": str(e)})
+            yield _sse("done", {})
+        finally:
+            end_request()
+
+    async def _answer_events():
+        results = await aretrieve_chunks(message, user.id, top_k=5)
+        yield _sse("sources", [
+            {"chunk_id": str(r["chunk_id"]), "document_id": r["document_id"], "chunk_index": r["chunk_index"]}
+            for r in results
+        ])
+        with stage("context"):
+            context = build_context(results)
+        yield _sse("timings", get_timings())
+        if not context:
+            yield _sse("token", {"text": f"No relevant documents found for '{message}'. Try uploading some documents first."})
+            yield _sse("done", {})
+            return
+
+        cached = await sync_to_async(answer_cache.lookup, thread_sensitive=False)(user.id, message, results)
+        if cached is not None:
+            yield _sse("token", {"text": cached})
+            yield _sse("done", {"cached": True})
+            return
+
+        tokens = astream_answer(message, context)
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield _sse("token", {"text": token})
+        except LLMError as e:
+            yield _sse("error", {"detail": str(e)})
+            yield _sse("done", {})
+            return
+        finally:
+            await tokens.aclose()  # cancels the upstream completion if we stopped early
+        await sync_to_async(answer_cache.store, thread_sensitive=False)(user.id, message, results, "".join(parts).strip())
+        yield _sse("done", {})
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response